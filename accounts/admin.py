@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 
+from .middleware import clear_approval_cache
+
 User = get_user_model()
 
 
@@ -83,10 +85,20 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Covers both the change form and list_editable on the changelist
+        if change and "is_approved" in form.changed_data:
+            clear_approval_cache([obj.pk])
+
     @admin.action(description="Chấp thuận người dùng đã chọn")
     def approve_users(self, request, queryset):
+        user_ids = list(queryset.values_list("pk", flat=True))
         queryset.update(is_approved=True)
+        clear_approval_cache(user_ids)
 
     @admin.action(description="Bỏ chấp thuận người dùng đã chọn")
     def disapprove_users(self, request, queryset):
+        user_ids = list(queryset.values_list("pk", flat=True))
         queryset.update(is_approved=False)
+        clear_approval_cache(user_ids)
@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.auth import SESSION_KEY, get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.functional import SimpleLazyObject
+
+from accounts.middleware import ApprovalRequiredMiddleware, resolve_url_name
+
+
+class Command(BaseCommand):
+    help = "Đo chi phí mỗi request của ApprovalRequiredMiddleware (không cần dữ liệu thật)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+        parser.add_argument("--path", default="/don-hang/danh-sach/")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        path = options["path"]
+        middleware = ApprovalRequiredMiddleware(lambda request: HttpResponse("ok"))
+        factory = RequestFactory()
+        User = get_user_model()
+
+        approved = User(pk=1, username="approved", is_approved=True)
+        pending = User(pk=2, username="pending", is_approved=False)
+
+        def _attach(request, user, loads):
+            def load():
+                # Stands in for the DB query AuthenticationMiddleware performs
+                loads.append(1)
+                return user or AnonymousUser()
+
+            request.user = SimpleLazyObject(load)
+            return request
+
+        def make_request(user, target=path, warm=False):
+            request = factory.get(target)
+            request.session = SessionBase()
+            loads = []
+            if user is not None:
+                request.session[SESSION_KEY] = str(user.pk)
+                if warm:
+                    middleware(_attach(request, user, loads))
+                    loads.clear()
+
+            return _attach(request, user, loads), loads
+
+        scenarios = [
+            ("anonymous", lambda: make_request(None)),
+            ("approved, first request", lambda: make_request(approved)),
+            ("approved, cached in session", lambda: make_request(approved, warm=True)),
+            ("pending, allowed page", lambda: make_request(pending, target="/cho-duyet/")),
+            ("pending, redirected", lambda: make_request(pending)),
+        ]
+
+        self.stdout.write(f"{'scenario':32} {'µs/request':>12} {'user loads':>11}")
+        for label, build in scenarios:
+            resolve_url_name.cache_clear()
+            requests = [build() for _ in range(iterations)]
+            start = time.perf_counter()
+            for request, _loads in requests:
+                middleware(request)
+            elapsed = time.perf_counter() - start
+            user_loads = sum(len(loads) for _request, loads in requests) / iterations
+            self.stdout.write(f"{label:32} {elapsed / iterations * 1e6:12.2f} {user_loads:11.2f}")
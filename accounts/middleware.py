@@ -1,6 +1,79 @@
+import re
+from functools import lru_cache
+from importlib import import_module
+
 from django.shortcuts import redirect
 from django.urls import resolve, reverse
 from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.http import HttpResponseForbidden
+
+
+# Default list of bot patterns to block (case-insensitive substrings)
+DEFAULT_BOT_PATTERNS = [
+    'bot', 'crawler', 'spider', 'scraper',
+    'amazonbot', 'googlebot', 'bingbot',
+    'slurp', 'duckduckbot', 'baiduspider',
+    'yandexbot', 'facebookexternalhit'
+]
+
+
+def compile_bot_patterns(patterns):
+    """Build one case-insensitive alternation regex from substring patterns."""
+    # Longest first so the alternation reports the most specific match
+    escaped = sorted({re.escape(p.lower()) for p in patterns if p}, key=len, reverse=True)
+    return re.compile("|".join(escaped), re.IGNORECASE)
+
+
+# Session key holding the id of the user whose approval was already checked
+APPROVAL_SESSION_KEY = "_approved_user_id"
+
+# Allowed (app_name, url_name) pairs for unapproved users
+APPROVAL_ALLOWED_NAMES = {
+    ("accounts", "dang-nhap"),
+    ("accounts", "dang-xuat"),
+    ("accounts", "dang-ky"),
+    ("accounts", "cho-duyet"),
+}
+
+
+@lru_cache(maxsize=2048)
+def resolve_url_name(path):
+    """Return (app_name, url_name) for a path, memoised per path. (None, None) if unresolved."""
+    try:
+        resolver_match = resolve(path)
+    except Exception:
+        return None, None
+    return resolver_match.app_name, resolver_match.url_name
+
+
+def clear_approval_cache(user_ids):
+    """
+    Drop the cached approval flag from the sessions of the given users so the
+    next request re-reads ``user.is_approved``. Called from the admin actions.
+
+    Only database-backed session engines can be scanned; other engines keep
+    the flag until the session expires or the user logs out.
+    """
+    if settings.SESSION_ENGINE not in (
+        "django.contrib.sessions.backends.db",
+        "django.contrib.sessions.backends.cached_db",
+    ):
+        return 0
+    from django.contrib.sessions.models import Session
+    from django.utils import timezone
+
+    engine = import_module(settings.SESSION_ENGINE)
+    ids = {str(pk) for pk in user_ids}
+    cleared = 0
+    for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator():
+        if session.get_decoded().get(APPROVAL_SESSION_KEY) not in ids:
+            continue
+        store = engine.SessionStore(session_key=session.session_key)
+        store.pop(APPROVAL_SESSION_KEY, None)
+        store.save()
+        cleared += 1
+    return cleared
 
 
 class ApprovalRequiredMiddleware:
@@ -12,82 +85,84 @@ class ApprovalRequiredMiddleware:
     - Pending approval page
     - Admin (for superusers) and superusers bypass in general
     - Static/media
+
+    Once a user is seen approved, their id is cached in the session so later
+    requests skip loading the user and resolving the URL altogether.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
+        self.static_prefix = settings.STATIC_URL or "/static/"
+        self.media_prefix = getattr(settings, "MEDIA_URL", None)
 
     def __call__(self, request):
         # Allow static and media
         path = request.path
-        if path.startswith(settings.STATIC_URL or "/static/"):
+        if path.startswith(self.static_prefix):
             return self.get_response(request)
-        if getattr(settings, "MEDIA_URL", None) and path.startswith(settings.MEDIA_URL):
+        if self.media_prefix and path.startswith(self.media_prefix):
             return self.get_response(request)
 
+        # Fast path: approval already checked for the logged-in user of this session
+        session = getattr(request, "session", None)
+        if session is not None:
+            approved_id = session.get(APPROVAL_SESSION_KEY)
+            if approved_id is not None and approved_id == session.get(SESSION_KEY):
+                return self.get_response(request)
+
         # Skip for anonymous users
         user = getattr(request, "user", None)
         if not getattr(user, "is_authenticated", False):
             return self.get_response(request)
 
-        # Superusers bypass
-        if getattr(user, "is_superuser", False):
+        # Superusers and approved users bypass; remember it for next requests
+        if getattr(user, "is_superuser", False) or getattr(user, "is_approved", False):
+            if session is not None and session.get(SESSION_KEY) is not None:
+                session[APPROVAL_SESSION_KEY] = session[SESSION_KEY]
             return self.get_response(request)
 
         # Resolve current url name (may be None)
-        try:
-            resolver_match = resolve(path)
-            url_name = resolver_match.url_name
-            app_name = resolver_match.app_name
-        except Exception:
-            url_name = None
-            app_name = None
-
-        # Allowed names for unapproved users
-        allowed_names = {
-            ("accounts", "dang-nhap"),
-            ("accounts", "dang-xuat"),
-            ("accounts", "dang-ky"),
-            ("accounts", "cho-duyet"),
-        }
-
-        if (app_name, url_name) in allowed_names:
+        if resolve_url_name(path) in APPROVAL_ALLOWED_NAMES:
             return self.get_response(request)
 
-        # If not approved, redirect to pending
-        if not getattr(user, "is_approved", False):
-            return redirect("accounts:cho-duyet")
-
-        return self.get_response(request)
+        # Not approved: redirect to pending
+        return redirect("accounts:cho-duyet")
 
 
 class BotBlockingMiddleware:
     """
     Block search engine bots and crawlers from accessing the application.
     This prevents bots from triggering GET requests that modify data.
+
+    The patterns come from ``settings.BOT_BLOCKING_PATTERNS`` and are compiled
+    once into a single regex at startup. Verdicts are memoised per user agent
+    in a bounded LRU cache (``settings.BOT_BLOCKING_CACHE_SIZE``) so repeated
+    requests from the same browser skip the regex entirely.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
+        patterns = getattr(settings, "BOT_BLOCKING_PATTERNS", None) or DEFAULT_BOT_PATTERNS
+        self.bot_regex = compile_bot_patterns(patterns)
+        cache_size = int(getattr(settings, "BOT_BLOCKING_CACHE_SIZE", 1024))
+        self.is_bot = lru_cache(maxsize=cache_size)(self._match)
+        # Counters, readable from a shell or a metrics endpoint
+        self.checked_count = 0
+        self.blocked_count = 0
+
+    def _match(self, user_agent):
+        return self.bot_regex.search(user_agent) is not None
 
     def __call__(self, request):
-        user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-        
-        # List of bot patterns to block
-        bot_patterns = [
-            'bot', 'crawler', 'spider', 'scraper',
-            'amazonbot', 'googlebot', 'bingbot',
-            'slurp', 'duckduckbot', 'baiduspider',
-            'yandexbot', 'facebookexternalhit'
-        ]
-        
-        # Check if user agent contains any bot pattern
-        if any(pattern in user_agent for pattern in bot_patterns):
-            from django.http import HttpResponseForbidden
+        self.checked_count += 1
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+
+        if user_agent and self.is_bot(user_agent):
+            self.blocked_count += 1
             return HttpResponseForbidden(
                 "<h1>403 Forbidden</h1>"
                 "<p>Bot access is not allowed on this application.</p>"
                 "<p>If you believe this is an error, please contact the administrator.</p>"
             )
-        
+
         return self.get_response(request)
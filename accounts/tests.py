@@ -1,3 +1,62 @@
-from django.test import TestCase
+from django.contrib.auth import SESSION_KEY
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .middleware import (
+    APPROVAL_SESSION_KEY,
+    BotBlockingMiddleware,
+    clear_approval_cache,
+    compile_bot_patterns,
+)
+from .models import User
+
+
+class BotBlockingTests(SimpleTestCase):
+    def middleware(self):
+        return BotBlockingMiddleware(lambda request: "ok")
+
+    def get(self, middleware, user_agent):
+        return middleware(RequestFactory().get("/", HTTP_USER_AGENT=user_agent))
+
+    def test_compiled_patterns(self):
+        regex = compile_bot_patterns(["bot", "Googlebot", "", "a.b"])
+        self.assertTrue(regex.search("Mozilla/5.0 (compatible; GOOGLEBOT/2.1)"))
+        self.assertIsNone(regex.search("axb"))  # escaped, not a wildcard
+        self.assertEqual(regex.search("googlebot").group(0), "googlebot")  # longest first
+
+    @override_settings(BOT_BLOCKING_PATTERNS=["crawler"], BOT_BLOCKING_CACHE_SIZE=2)
+    def test_blocks_and_memoises(self):
+        middleware = self.middleware()
+        self.assertEqual(self.get(middleware, "SomeCrawler/1.0").status_code, 403)
+        self.assertEqual(self.get(middleware, "Mozilla/5.0 Firefox"), "ok")
+        self.assertEqual(self.get(middleware, "Mozilla/5.0 Firefox"), "ok")
+        self.assertEqual(self.get(middleware, ""), "ok")
+        info = middleware.is_bot.cache_info()
+        self.assertEqual((info.hits, info.misses, info.maxsize), (1, 2, 2))
+        self.assertEqual((middleware.checked_count, middleware.blocked_count), (4, 1))
+
+
+class ApprovalMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pending = User.objects.create_user(username="pending", password="x", is_approved=False)
+        cls.approved = User.objects.create_user(username="approved", password="x", is_approved=True)
+
+    def test_unapproved_user_is_sent_to_pending_page(self):
+        self.client.force_login(self.pending)
+        self.assertRedirects(self.client.get(reverse("home")), reverse("accounts:cho-duyet"))
+        self.assertEqual(self.client.get(reverse("accounts:cho-duyet")).status_code, 200)
+        self.assertNotIn(APPROVAL_SESSION_KEY, self.client.session)
+
+    def test_approval_is_remembered_in_the_session(self):
+        self.client.force_login(self.approved)
+        self.client.get(reverse("accounts:cho-duyet"))
+        session = self.client.session
+        self.assertEqual(session[APPROVAL_SESSION_KEY], session[SESSION_KEY])
+
+        # Revoking approval is picked up once the session flag is cleared
+        User.objects.filter(pk=self.approved.pk).update(is_approved=False)
+        self.assertEqual(self.client.get(reverse("accounts:cho-duyet")).status_code, 200)
+        self.assertEqual(clear_approval_cache([self.approved.pk]), 1)
+        self.assertNotIn(APPROVAL_SESSION_KEY, self.client.session)
+        self.assertRedirects(self.client.get(reverse("home")), reverse("accounts:cho-duyet"))
@@ -1,3 +1,48 @@
 from django.contrib import admin
+from django.utils.html import format_html
 
-# Register your models here.
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ("short_sql", "last_view", "count", "total_ms_display", "avg_ms_display", "max_ms_display", "last_seen")
+    list_filter = ("database", "last_view")
+    search_fields = ("normalized_sql", "last_view", "fingerprint")
+    ordering = ("-total_ms",)
+    readonly_fields = (
+        "fingerprint", "database", "last_view", "count", "total_ms", "max_ms", "last_ms",
+        "first_seen", "last_seen", "plan_captured_at", "sql_block", "params_block", "plan_block",
+    )
+    exclude = ("normalized_sql", "example_sql", "example_params", "plan")
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="SQL")
+    def short_sql(self, obj):
+        return obj.normalized_sql[:120]
+
+    @admin.display(description="Tổng (ms)", ordering="total_ms")
+    def total_ms_display(self, obj):
+        return f"{obj.total_ms:.0f}"
+
+    @admin.display(description="TB (ms)")
+    def avg_ms_display(self, obj):
+        return f"{obj.avg_ms:.1f}"
+
+    @admin.display(description="Max (ms)", ordering="max_ms")
+    def max_ms_display(self, obj):
+        return f"{obj.max_ms:.1f}"
+
+    @admin.display(description="SQL (ví dụ)")
+    def sql_block(self, obj):
+        return format_html('<pre style="white-space:pre-wrap">{}</pre>', obj.example_sql)
+
+    @admin.display(description="Tham số")
+    def params_block(self, obj):
+        return format_html("<pre>{}</pre>", obj.example_params)
+
+    @admin.display(description="EXPLAIN")
+    def plan_block(self, obj):
+        return format_html("<pre>{}</pre>", obj.plan or "(chưa có)")
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def assets(request):
+    """Lets templates switch between the CDN scripts and the compiled bundle."""
+    return {"USE_COMPILED_ASSETS": getattr(settings, "USE_COMPILED_ASSETS", False)}
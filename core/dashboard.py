@@ -0,0 +1,333 @@
+"""
+Dashboard (trang chủ) aggregates, split into independent groups.
+
+Every group takes the date boundaries computed by ``dashboard_periods()`` and
+returns a dict of template context; groups never read each other's results,
+so ``HomePageView`` can run them one after another while
+``home_async`` runs them concurrently, each on its own thread and DB
+connection.
+"""
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import (
+    BigIntegerField, Case, Count, ExpressionWrapper, F, IntegerField, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, TruncDate
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from customers.models import Customer
+from orders.models import Order
+from products.models import Product
+
+from .templatetags.media_extras import safe_image_url
+
+EXCLUDED_STATUSES = ['reconciled', 'cancelled']
+
+
+def _big(field):
+    return Coalesce(Cast(F(field), BigIntegerField()), Value(0), output_field=BigIntegerField())
+
+
+def order_value_expr():
+    """sale_price * amount - discount, NULLs counted as 0."""
+    return ExpressionWrapper(
+        _big('sale_price') * _big('amount') - _big('discount'),
+        output_field=BigIntegerField(),
+    )
+
+
+def dashboard_periods(params):
+    """Date boundaries for the stat cards and charts; ``params`` is request.GET."""
+    p = {}
+    start_date_str = params.get('start_date', '')
+    end_date_str = params.get('end_date', '')
+
+    custom_start_date = None
+    custom_end_date = None
+    if start_date_str:
+        try:
+            custom_start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            p['start_date'] = start_date_str
+        except ValueError:
+            pass
+    if end_date_str:
+        try:
+            custom_end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+            p['end_date'] = end_date_str
+        except ValueError:
+            pass
+
+    now = timezone.now()
+    today_date = timezone.localdate()
+    start_today = timezone.make_aware(datetime.combine(today_date, datetime.min.time()))
+
+    # Week: assume Monday as start of week
+    weekday = today_date.weekday()  # Monday=0
+    start_week = timezone.make_aware(datetime.combine(today_date - timedelta(days=weekday), datetime.min.time()))
+
+    # Month boundaries
+    start_month = timezone.make_aware(datetime(today_date.year, today_date.month, 1))
+    if today_date.month == 1:
+        prev_month_start_date = datetime(today_date.year - 1, 12, 1)
+    else:
+        prev_month_start_date = datetime(today_date.year, today_date.month - 1, 1)
+
+    # Determine date range for charts based on custom dates or defaults
+    if custom_start_date and custom_end_date:
+        chart_start = timezone.make_aware(datetime.combine(custom_start_date, datetime.min.time()))
+        chart_end = timezone.make_aware(datetime.combine(custom_end_date, datetime.max.time()))
+        date_range_label = f"từ {start_date_str} đến {end_date_str}"
+    elif custom_start_date:
+        chart_start = timezone.make_aware(datetime.combine(custom_start_date, datetime.min.time()))
+        chart_end = now
+        date_range_label = f"từ {start_date_str}"
+    elif custom_end_date:
+        chart_start = start_month  # Default to start of month if only end date provided
+        chart_end = timezone.make_aware(datetime.combine(custom_end_date, datetime.max.time()))
+        date_range_label = f"đến {end_date_str}"
+    else:
+        # Default: last 30 days for timeline, current month for top products/customers
+        chart_start = start_today - timedelta(days=30)
+        chart_end = now
+        date_range_label = "30 ngày qua"
+
+    p.update({
+        'now': now,
+        'start_today': start_today,
+        'start_yesterday': start_today - timedelta(days=1),
+        'end_yesterday': start_today,
+        'start_week': start_week,
+        'prev_week_start': start_week - timedelta(days=7),
+        'prev_week_end': start_week,
+        'start_month': start_month,
+        'prev_month_start': timezone.make_aware(prev_month_start_date),
+        'prev_month_end': start_month,
+        'chart_start': chart_start,
+        'chart_end': chart_end,
+        # Top products/customers and status breakdown: custom range or current month
+        'ranking_start': chart_start if (custom_start_date or custom_end_date) else start_month,
+        'date_range_label': date_range_label,
+    })
+    return p
+
+
+def _in_range(qs, field, start, end=None):
+    qs = qs.filter(**{f"{field}__gte": start})
+    if end is not None:
+        qs = qs.filter(**{f"{field}__lt": end})
+    return qs
+
+
+def _period_windows(p):
+    return {
+        'today': (p['start_today'], None),
+        'yesterday': (p['start_yesterday'], p['end_yesterday']),
+        'this_week': (p['start_week'], None),
+        'last_week': (p['prev_week_start'], p['prev_week_end']),
+        'this_month': (p['start_month'], None),
+        'last_month': (p['prev_month_start'], p['prev_month_end']),
+    }
+
+
+def totals(p):
+    return {
+        'total_customers': Customer.objects.count(),
+        'total_products': Product.objects.count(),
+        'total_orders': Order.objects.count(),
+    }
+
+
+def net_profit(p):
+    # Lãi ròng ước tính
+    # - Loại trừ trạng thái: Đã đối soát (reconciled), Hủy đơn (cancelled)
+    # - Bỏ qua đơn có product.purchase_price = 0
+    # - Lãi thuần mỗi đơn = sale_price * amount - discount - product.purchase_price
+    # - Tổng tất cả đơn hợp lệ
+    orders_qs = (
+        Order.objects
+        .exclude(status__in=EXCLUDED_STATUSES)
+        .select_related('product')
+        .filter(product__purchase_price__gt=0)
+    )
+    profit_expr = ExpressionWrapper(
+        _big('sale_price') * _big('amount') - _big('discount') - _big('product__purchase_price'),
+        output_field=BigIntegerField(),
+    )
+    return {
+        'net_profit': orders_qs.aggregate(
+            total=Coalesce(Sum(profit_expr), Value(0), output_field=BigIntegerField())
+        )['total'],
+    }
+
+
+def customer_stats(p):
+    customers_all = Customer.objects.all()
+    return {
+        'customer_stats': {
+            name: _in_range(customers_all, 'created_at', start, end).count()
+            for name, (start, end) in _period_windows(p).items()
+        },
+    }
+
+
+def product_stats(p):
+    products_all = Product.objects.all()
+    return {
+        'product_stats': {
+            name: _in_range(products_all, 'created_at', start, end).count()
+            for name, (start, end) in _period_windows(p).items()
+        },
+    }
+
+
+def order_stats(p):
+    # Orders (counts and values)
+    orders_all = Order.objects.exclude(status__in=EXCLUDED_STATUSES)
+    value_expr = order_value_expr()
+    stats = {}
+    for name, (start, end) in _period_windows(p).items():
+        qs = _in_range(orders_all, 'created_at', start, end)
+        stats[name] = {
+            'count': qs.count(),
+            'value': qs.aggregate(
+                total=Coalesce(Sum(value_expr), Value(0), output_field=BigIntegerField())
+            )['total'],
+        }
+    return {'order_stats': stats}
+
+
+def _ranking(p, key, name, code):
+    return list(
+        Order.objects
+        .exclude(status__in=EXCLUDED_STATUSES)
+        .filter(created_at__gte=p['ranking_start'], created_at__lte=p['chart_end'])
+        .values(key, name, code)
+        .annotate(
+            order_count=Coalesce(Sum(Case(When(id__isnull=False, then=1), default=0, output_field=IntegerField())), 0),
+            total_amount=Coalesce(Sum('amount'), 0),
+            net_revenue=Coalesce(Sum(order_value_expr()), Value(0), output_field=BigIntegerField()),
+        )
+        .order_by('-net_revenue')[:10]
+    )
+
+
+def top_products(p):
+    # Top-selling products (by net revenue)
+    return {'top_products': _ranking(p, 'product_id', 'product__name', 'product__code')}
+
+
+def top_customers(p):
+    # Top customers (by net revenue)
+    return {'top_customers': _ranking(p, 'customer_id', 'customer__name', 'customer__code')}
+
+
+def status_breakdown(p):
+    rows = (
+        Order.objects
+        .filter(created_at__gte=p['ranking_start'], created_at__lte=p['chart_end'])
+        .values('status')
+        .annotate(
+            order_count=Count('id'),
+            total_revenue=Coalesce(Sum(order_value_expr()), Value(0), output_field=BigIntegerField()),
+        )
+        .order_by('-order_count')
+    )
+    status_map = dict(Order.STATUS_CHOICES)
+    return {
+        'status_breakdown': [
+            {
+                'status': row['status'],
+                'label': status_map.get(row['status'], row['status']),
+                'order_count': row['order_count'],
+                'total_revenue': row['total_revenue'],
+            }
+            for row in rows
+        ],
+    }
+
+
+def revenue_timeline(p):
+    # Revenue timeline (daily) - use custom date range or last 30 days
+    chart_start, chart_end = p['chart_start'], p['chart_end']
+    daily_revenue_qs = (
+        Order.objects
+        .exclude(status__in=EXCLUDED_STATUSES)
+        .filter(created_at__gte=chart_start, created_at__lte=chart_end)
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(
+            order_count=Count('id'),
+            revenue=Coalesce(Sum(order_value_expr()), Value(0), output_field=BigIntegerField()),
+        )
+        .order_by('day')
+    )
+    revenue_by_day = {row['day']: {'count': row['order_count'], 'revenue': row['revenue']} for row in daily_revenue_qs}
+
+    # Fill missing days with 0
+    timeline = []
+    current_day = chart_start.date()
+    end_day = chart_end.date()
+    while current_day <= end_day:
+        data = revenue_by_day.get(current_day, {'count': 0, 'revenue': 0})
+        timeline.append({
+            'day': current_day.strftime('%Y-%m-%d'),
+            'order_count': data['count'],
+            'revenue': data['revenue'],
+        })
+        current_day += timedelta(days=1)
+    return {'revenue_timeline': timeline}
+
+
+# Independent query groups, in the order the synchronous view runs them
+GROUPS = (
+    totals,
+    net_profit,
+    customer_stats,
+    product_stats,
+    order_stats,
+    top_products,
+    top_customers,
+    status_breakdown,
+    revenue_timeline,
+)
+
+
+def base_context(p):
+    context = {
+        'title': 'Bảng điều khiển - NavyBaby',
+        'recent_orders': [],
+        'date_range_label': p['date_range_label'],
+    }
+    for key in ('start_date', 'end_date'):
+        if key in p:
+            context[key] = p[key]
+    return context
+
+
+def add_chart_data(request, context):
+    """JSON blobs for the charts; top products get their image URLs (one query)."""
+    top_products_rows = context['top_products']
+    product_images = Product.objects.only('image').in_bulk([row.get('product_id') for row in top_products_rows])
+    top_products_enriched = []
+    for row in top_products_rows:
+        product_image = ''
+        try:
+            product_obj = product_images.get(row.get('product_id'))
+            if product_obj and getattr(product_obj, 'image', None):
+                image_url = safe_image_url(product_obj.image)
+                if image_url:
+                    product_image = request.build_absolute_uri(image_url)
+        except Exception:
+            pass
+
+        enriched = dict(row)
+        enriched['image'] = product_image
+        top_products_enriched.append(enriched)
+
+    context['top_products_chart'] = mark_safe(json.dumps(top_products_enriched))
+    context['top_customers_chart'] = mark_safe(json.dumps(context['top_customers']))
+    context['status_breakdown_chart'] = mark_safe(json.dumps(context['status_breakdown']))
+    context['revenue_timeline_chart'] = mark_safe(json.dumps(context['revenue_timeline']))
+    return context
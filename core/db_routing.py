@@ -0,0 +1,136 @@
+"""
+Read-replica routing for the heavy read-only pages.
+
+Only code running inside ``use_replica()`` (or a view using
+``ReplicaReadMixin``) reads from the ``replica`` alias; everything else,
+including every write, stays on ``default``. The replica is skipped — and the
+primary used instead — when:
+
+* no ``replica`` alias is configured (``DATABASE_REPLICA_URL`` unset);
+* the same session made a POST/PUT/DELETE in the last ``REPLICA_PIN_SECONDS``
+  (read-your-writes, see ``ReplicaPinMiddleware``);
+* the replica cannot be reached, or on PostgreSQL lags more than
+  ``REPLICA_MAX_LAG_SECONDS`` behind the primary (checked at most every few
+  seconds per process).
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = "replica"
+PIN_SESSION_KEY = "_db_primary_until"
+
+_read_alias = contextvars.ContextVar("navybaby_read_alias", default=None)
+_health = {"checked": 0.0, "ok": True}
+HEALTH_CHECK_INTERVAL = 5
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _replica_lag_seconds(conn):
+    conn.ensure_connection()
+    if conn.vendor != "postgresql":
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+            "ELSE 0 END"
+        )
+        return float(cursor.fetchone()[0] or 0)
+
+
+def replica_healthy():
+    """Cached reachability/lag check so a broken replica costs one attempt per interval."""
+    now = time.monotonic()
+    if now - _health["checked"] < HEALTH_CHECK_INTERVAL:
+        return _health["ok"]
+    _health["checked"] = now
+    try:
+        lag = _replica_lag_seconds(connections[REPLICA_ALIAS])
+        max_lag = getattr(settings, "REPLICA_MAX_LAG_SECONDS", 30)
+        _health["ok"] = lag <= max_lag
+        if not _health["ok"]:
+            logger.warning("replica lags %.1fs behind primary, reading from primary", lag)
+    except DatabaseError:
+        logger.warning("replica unreachable, reading from primary", exc_info=True)
+        _health["ok"] = False
+    return _health["ok"]
+
+
+def pinned_to_primary(request):
+    session = getattr(request, "session", None)
+    if session is None:
+        return False
+    return session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def pin_to_primary(request):
+    session = getattr(request, "session", None)
+    if session is not None:
+        session[PIN_SESSION_KEY] = time.time() + getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+
+def read_alias_for(request=None):
+    """"replica" when it is configured and safe to use for this request, else None."""
+    if not replica_configured():
+        return None
+    if request is not None and pinned_to_primary(request):
+        return None
+    return REPLICA_ALIAS if replica_healthy() else None
+
+
+@contextmanager
+def routed_to(alias):
+    """Send reads in this block to ``alias`` (None = default routing)."""
+    token = _read_alias.set(alias)
+    try:
+        yield alias or "default"
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replica(request=None):
+    """Route reads in this block to the replica when it is configured and safe to use."""
+    return routed_to(read_alias_for(request))
+
+
+class ReplicaReadMixin:
+    """
+    Serve a read-only view from the replica. The response is rendered inside
+    the routing block so lazy querysets evaluated by the template use it too.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replica(request):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+                response.render()
+        return response
+
+
+class ReplicaRouter:
+    """DATABASE_ROUTERS entry: reads follow ``use_replica()``, writes and migrations go to default."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,60 @@
+"""
+Fragment rendering for list pages.
+
+A list page wraps its results (totals, table, pager) in
+``<div id="..." data-fragment="table">`` and marks its filter form with
+``data-fragment-target="#..."``; ``static/js/fragments.js`` then submits
+filters, sorting and pager links with ``?fragment=table`` (or an
+``HX-Request`` header) and swaps in just that HTML.
+
+Views opt in with ``FragmentMixin`` and a ``fragment_templates`` mapping; the
+requested name is available as ``self.fragment`` so ``get_context_data`` can
+skip the work only the full page needs (filter dropdown options, KPI cards...).
+"""
+from django.utils.cache import patch_vary_headers
+
+FRAGMENT_PARAM = "fragment"
+
+
+def requested_fragment(request):
+    """Fragment name asked for by ``?fragment=`` or an htmx request ("table"), else ""."""
+    name = request.GET.get(FRAGMENT_PARAM, "")
+    if not name and request.headers.get("HX-Request") == "true":
+        name = "table"
+    return name
+
+
+def _strip_fragment_param(request):
+    # The fragment is the same page, partially rendered: links, pagers and
+    # "next" fields built from request.GET / get_full_path() must not carry
+    # ?fragment= or following them would land on a bare fragment.
+    if FRAGMENT_PARAM not in request.GET:
+        return
+    params = request.GET.copy()
+    params.pop(FRAGMENT_PARAM, None)
+    request.GET = params
+    request.META["QUERY_STRING"] = params.urlencode()
+
+
+class FragmentMixin:
+    """Render ``fragment_templates[name]`` instead of the page when a fragment is requested."""
+
+    fragment_templates = {}
+    fragment = ""
+
+    def dispatch(self, request, *args, **kwargs):
+        name = requested_fragment(request)
+        self.fragment = name if name in self.fragment_templates else ""
+        _strip_fragment_param(request)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_template_names(self):
+        if self.fragment:
+            return [self.fragment_templates[self.fragment]]
+        return super().get_template_names()
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        # Same URL, different body for htmx requests
+        patch_vary_headers(response, ("HX-Request",))
+        return response
@@ -0,0 +1,64 @@
+import json
+import timeit
+from decimal import Decimal
+
+from django.contrib.humanize.templatetags.humanize import intcomma
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from core.templatetags.number_extras import smart_vnd
+
+
+def legacy_smart_vnd(value):
+    """smart_vnd before the fast path, for comparison."""
+    try:
+        n = float(value)
+    except (TypeError, ValueError):
+        return value
+    sign = "-" if n < 0 else ""
+    return f"{sign}{intcomma(int(round(abs(n), 0)))}đ"
+
+
+def sample_values(count):
+    """Money-like values as the tables see them: Decimal amounts, int totals, a few floats/None."""
+    values = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 6:
+            values.append(Decimal(i * 13_500 % 9_000_000) + Decimal("0.00"))
+        elif kind < 9:
+            values.append(-(i * 7_919) if kind == 8 else i * 7_919)
+        else:
+            values.append(None if i % 20 == 9 else i * 1.5)
+    return values
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark cho filter smart_vnd: so sánh cách cũ (float + intcomma) với bản hiện tại, "
+        "gọi trực tiếp và qua template, in µs/giá trị dưới dạng JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--values", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        values = sample_values(options["values"])
+        mismatches = [v for v in values if str(smart_vnd(v)) != str(legacy_smart_vnd(v))]
+        template = Template("{% load number_extras %}{% for v in values %}{{ v|smart_vnd }}{% endfor %}")
+        context = Context({"values": values})
+
+        def best(fn):
+            runs = timeit.repeat(fn, number=1, repeat=options["repeat"])
+            return round(min(runs) / len(values) * 1_000_000, 3)
+
+        report = {
+            "values": len(values),
+            "mismatches": len(mismatches),
+            "legacy_us": best(lambda: [legacy_smart_vnd(v) for v in values]),
+            "smart_vnd_us": best(lambda: [smart_vnd(v) for v in values]),
+            "template_us": best(lambda: template.render(context)),
+        }
+        report["speedup"] = round(report["legacy_us"] / report["smart_vnd_us"], 1)
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,122 @@
+import json
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from core import perf
+from customers.models import Customer
+from products.models import Product
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy các view chính qua test client N lần và in p50/p95/max (ms) cùng số truy vấn SQL "
+        "dưới dạng JSON để so sánh giữa các commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--username", help="Tài khoản dùng để đăng nhập (mặc định: superuser đầu tiên)")
+        parser.add_argument("--views", nargs="*", help="Chỉ chạy các view có tên này (vd. orders:order_list)")
+        parser.add_argument("--output", help="Ghi kết quả JSON ra file thay vì stdout")
+
+    def targets(self):
+        """(label, url) pairs; detail pages use the customer/product with the most orders."""
+        customer = Customer.objects.annotate(n=Count("orders")).order_by("-n").first()
+        product = Product.objects.annotate(n=Count("orders")).order_by("-n").first()
+        targets = [
+            ("home", reverse("home")),
+            ("orders:order_list", reverse("orders:order_list")),
+            ("orders:order_list?group_by=customer", reverse("orders:order_list") + "?group_by=customer"),
+            ("customers:customer_list", reverse("customers:customer_list")),
+            ("products:product_list", reverse("products:product_list")),
+            ("finance:transactions_list", reverse("finance:transactions_list")),
+        ]
+        if customer:
+            targets += [
+                ("customers:customer_detail", reverse("customers:customer_detail", kwargs={"code": customer.code})),
+                ("customers:customer_report", reverse("customers:customer_report", kwargs={"code": customer.code})),
+                ("customers:customer_bill", reverse("customers:customer_bill", kwargs={"code": customer.code})),
+            ]
+        if product:
+            targets += [
+                ("products:product_detail", reverse("products:product_detail", kwargs={"pk": product.pk})),
+                ("products:product_report", reverse("products:product_report", kwargs={"pk": product.pk})),
+            ]
+        return targets
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        if iterations < 1:
+            raise CommandError("--iterations phải lớn hơn hoặc bằng 1.")
+        User = get_user_model()
+        if options["username"]:
+            user = User.objects.filter(username=options["username"]).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by("pk").first()
+        if user is None:
+            raise CommandError("Không tìm thấy tài khoản để đăng nhập; dùng --username.")
+
+        # localhost is always in ALLOWED_HOSTS; https avoids the SSL redirect when DEBUG=False
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+
+        results = {}
+        for label, url in self.targets():
+            if options["views"] and label.split("?")[0] not in options["views"]:
+                continue
+            # Warm-up request: template loading, session save, connection setup
+            client.get(url, secure=True)
+            timings, queries = [], []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                with perf.collect() as metrics:
+                    response = client.get(url, secure=True)
+                timings.append((time.perf_counter() - start) * 1000)
+                queries.append(metrics.sql_count)
+            timings.sort()
+            results[label] = {
+                "url": url,
+                "status": response.status_code,
+                "p50_ms": round(percentile(timings, 50), 2),
+                "p95_ms": round(percentile(timings, 95), 2),
+                "max_ms": round(timings[-1], 2),
+                "queries": max(queries),
+            }
+            self.stderr.write(f"{label}: p50={results[label]['p50_ms']}ms queries={results[label]['queries']}")
+
+        report = {
+            "commit": self.git_commit(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "iterations": iterations,
+            "results": results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except Exception:
+            return None
@@ -0,0 +1,95 @@
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ICON_ATTR = re.compile(r"""data-lucide=["']([a-z0-9-]+)["']""")
+ICON_BLOCK = re.compile(r"{%\s*block\s+navbar_icon\s*%}\s*([a-z0-9-]+)\s*{%\s*endblock")
+SVG_OPEN = re.compile(r"<svg\b[^>]*>", re.S)
+SVG_CLOSE = re.compile(r"</svg>\s*$", re.S)
+COMMENT = re.compile(r"<!--.*?-->", re.S)
+
+
+def used_icons(paths):
+    """Names of the lucide icons referenced by ``data-lucide`` in the given files."""
+    names = set()
+    for path in paths:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        names.update(ICON_ATTR.findall(text))
+        names.update(ICON_BLOCK.findall(text))
+    return names
+
+
+def build_sprite(names, icons_dir):
+    """``<svg>`` with one ``<symbol id="name">`` per icon; raises CommandError for unknown names."""
+    symbols = []
+    missing = []
+    for name in sorted(names):
+        source = icons_dir / f"{name}.svg"
+        if not source.exists():
+            missing.append(name)
+            continue
+        body = COMMENT.sub("", source.read_text(encoding="utf-8")).strip()
+        body = SVG_CLOSE.sub("", SVG_OPEN.sub("", body, count=1)).strip()
+        body = re.sub(r">\s+<", "><", body)
+        symbols.append(f'<symbol id="{name}" viewBox="0 0 24 24">{body}</symbol>')
+    if missing:
+        raise CommandError(f"Không tìm thấy icon lucide: {', '.join(missing)} (trong {icons_dir})")
+    return (
+        "<!-- lucide-static, ISC License -->"
+        '<svg xmlns="http://www.w3.org/2000/svg" style="display:none">'
+        + "".join(symbols)
+        + "</svg>\n"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Build static/dist/app.css (Tailwind, chỉ các class dùng trong templates, minify) và "
+        "static/dist/icons.svg (sprite các icon lucide đang dùng). Cần `npm install` trước; "
+        "chạy trước collectstatic khi USE_COMPILED_ASSETS=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--skip-css", action="store_true")
+        parser.add_argument("--skip-icons", action="store_true")
+        parser.add_argument("--icons-dir", default=None, help="Mặc định node_modules/lucide-static/icons")
+
+    def handle(self, *args, **options):
+        base = Path(settings.BASE_DIR)
+        out_dir = base / "static" / "dist"
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        if not options["skip_css"]:
+            self.build_css(base, out_dir / "app.css")
+        if not options["skip_icons"]:
+            icons_dir = Path(options["icons_dir"]) if options["icons_dir"] else base / "node_modules" / "lucide-static" / "icons"
+            sources = list((base / "templates").rglob("*.html")) + list((base / "static" / "js").rglob("*.js"))
+            names = used_icons(sources)
+            target = out_dir / "icons.svg"
+            target.write_text(build_sprite(names, icons_dir), encoding="utf-8")
+            self.stdout.write(f"  icons.svg: {len(names)} icon, {target.stat().st_size / 1024:.1f} KB")
+        self.stdout.write(self.style.SUCCESS("Xong. Chạy collectstatic để tạo file có hash."))
+
+    def build_css(self, base, target):
+        local_bin = base / "node_modules" / ".bin" / "tailwindcss"
+        if local_bin.exists():
+            cmd = [str(local_bin)]
+        elif shutil.which("tailwindcss"):
+            # Standalone CLI binary
+            cmd = ["tailwindcss"]
+        else:
+            raise CommandError("Không tìm thấy tailwindcss; chạy `npm install` trước.")
+        cmd += [
+            "-c", str(base / "tailwind.config.js"),
+            "-i", str(base / "assets" / "tailwind.css"),
+            "-o", str(target),
+            "--minify",
+        ]
+        result = subprocess.run(cmd, cwd=base, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise CommandError(f"tailwindcss lỗi:\n{result.stderr}")
+        self.stdout.write(f"  app.css: {target.stat().st_size / 1024:.1f} KB")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products import stats
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại bảng ProductStats từ đơn hàng (sau khi nhập dữ liệu bằng bulk_create/SQL "
+        "hoặc nếu nghi số liệu lệch)."
+    )
+
+    def handle(self, *args, **options):
+        stats.refresh_all()
+        self.stdout.write(self.style.SUCCESS(f"Đã cập nhật thống kê cho {Product.objects.count()} sản phẩm."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.models import Customer
+from core import synthetic
+
+
+class Command(BaseCommand):
+    help = "Sinh dữ liệu giả lập (khách hàng, sản phẩm, đơn hàng, giao dịch) bằng bulk_create để đo hiệu năng."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--orders", type=int, default=50000)
+        parser.add_argument("--transactions", type=int, default=5000)
+        parser.add_argument("--days", type=int, default=365, help="Rải ngày tạo trong N ngày gần nhất")
+        parser.add_argument("--prefix", default="SYN", help="Tiền tố mã; phải khác nhau giữa các lần chạy")
+        parser.add_argument("--seed", type=int, default=None, help="Seed ngẫu nhiên để tái lập dữ liệu")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if Customer.objects.filter(code__startswith=f"KH-{prefix}-").exists():
+            raise CommandError(f"Đã có dữ liệu với tiền tố {prefix}; dùng --prefix khác.")
+
+        result = synthetic.seed(
+            customers=options["customers"],
+            products=options["products"],
+            orders=options["orders"],
+            transactions=options["transactions"],
+            days=options["days"],
+            prefix=prefix,
+            seed_value=options["seed"],
+            batch_size=options["batch_size"],
+            log=lambda message: self.stdout.write(f"  {message}"),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tạo {len(result['customers'])} khách hàng, {len(result['products'])} sản phẩm, "
+            f"{options['orders']} đơn hàng, {options['transactions']} giao dịch."
+        ))
@@ -0,0 +1,261 @@
+"""
+Prometheus-style metrics shared between gunicorn workers.
+
+Each process keeps its counters and histograms in memory and periodically
+dumps them to ``METRICS_DIR/<pid>-<start ms>.json`` (write-then-rename, so
+readers never see half a file); the start time keeps a reused PID from
+overwriting an older worker's file. ``/metrics`` merges every file in the
+directory and renders the Prometheus text exposition format.
+
+When a worker exits, the gunicorn master folds its file into
+``retired.json`` (``retire``, from the ``child_exit`` hook in gunicorn.conf.py)
+and deletes it, so the directory does not grow with restarts while the
+counters stay monotonic. Only the ``navybaby_worker_info`` gauge is limited to
+live processes.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HELP = {
+    "navybaby_request_duration_seconds": ("histogram", "Request wall time by view"),
+    "navybaby_request_queries": ("histogram", "SQL queries per request by view"),
+    "navybaby_requests_total": ("counter", "Requests by view and status code"),
+    "navybaby_cache_hits_total": ("counter", "Cache hits recorded during requests"),
+    "navybaby_cache_misses_total": ("counter", "Cache misses recorded during requests"),
+    "navybaby_orders_created_total": ("counter", "Orders created"),
+    "navybaby_order_status_transitions_total": ("counter", "Order status changes"),
+    "navybaby_worker_info": ("gauge", "One series per live worker process"),
+}
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_worker = {}
+_last_flush = 0.0
+_file_stem = None  # (pid, "<pid>-<start ms>") of the process that owns it
+
+RETIRED = "retired.json"
+
+
+def enabled():
+    return getattr(settings, "METRICS_ENABLED", False)
+
+
+def metrics_dir():
+    return Path(getattr(settings, "METRICS_DIR"))
+
+
+def _labels(**labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    if not amount:
+        return
+    key = (name, _labels(**labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, buckets, **labels):
+    key = (name, _labels(**labels))
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+
+def set_worker_info(**labels):
+    """Remember static facts about this worker (server software, start time...)."""
+    with _lock:
+        _worker.update({k: str(v) for k, v in labels.items()})
+
+
+def record_request(view, status, duration, queries, cache_hits, cache_misses):
+    observe("navybaby_request_duration_seconds", duration, LATENCY_BUCKETS, view=view)
+    observe("navybaby_request_queries", queries, QUERY_BUCKETS, view=view)
+    inc("navybaby_requests_total", view=view, status=status)
+    inc("navybaby_cache_hits_total", cache_hits, view=view)
+    inc("navybaby_cache_misses_total", cache_misses, view=view)
+
+
+def record_order_created(count=1):
+    if enabled():
+        inc("navybaby_orders_created_total", count)
+
+
+def record_status_transition(old, new, count=1):
+    if enabled() and old != new:
+        inc("navybaby_order_status_transitions_total", count, **{"from": old, "to": new})
+
+
+def _snapshot():
+    with _lock:
+        return {
+            "pid": os.getpid(),
+            "worker": dict(_worker),
+            "counters": [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            "histograms": [[name, list(labels), list(series)] for (name, labels), series in _histograms.items()],
+        }
+
+
+def file_stem():
+    """``<pid>-<start ms>`` of this process (recomputed after a fork)."""
+    global _file_stem
+    pid = os.getpid()
+    if _file_stem is None or _file_stem[0] != pid:
+        _file_stem = (pid, f"{pid}-{int(time.time() * 1000)}")
+    return _file_stem[1]
+
+
+def _write(path, data):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def flush(force=False):
+    """Write this process's numbers to its file, at most every METRICS_FLUSH_SECONDS."""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, "METRICS_FLUSH_SECONDS", 5):
+        return
+    _last_flush = now
+    directory = metrics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    _write(directory / f"{file_stem()}.json", _snapshot())
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(counters, histograms, data):
+    for name, labels, value in data.get("counters", []):
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, series in data.get("histograms", []):
+        key = (name, tuple(map(tuple, labels)))
+        merged = histograms.get(key)
+        if merged is None:
+            histograms[key] = list(series)
+        else:
+            histograms[key] = [a + b for a, b in zip(merged, series)]
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def collect():
+    """Merge every worker file into ({(name, labels): value}, {(name, labels): series}, [workers])."""
+    counters, histograms, workers = {}, {}, []
+    directory = metrics_dir()
+    if not directory.exists():
+        return counters, histograms, workers
+    for path in sorted(directory.glob("*.json")):
+        data = _read(path)
+        if data is None:
+            continue
+        _merge(counters, histograms, data)
+        if data.get("pid") and _pid_alive(data["pid"]):
+            workers.append(data)
+    return counters, histograms, workers
+
+
+def retire(pids=None, directory=None):
+    """
+    Fold the files of exited workers into ``retired.json`` and delete them:
+    those of ``pids``, or of every process that is no longer running. Only the
+    gunicorn master calls this, so ``retired.json`` has a single writer.
+    """
+    directory = Path(directory or metrics_dir())
+    if not directory.exists():
+        return
+    if pids is not None:
+        pids = {str(pid) for pid in pids}
+    stale = []
+    for path in directory.glob("*-*.json"):
+        pid = path.stem.split("-", 1)[0]
+        if (pid in pids) if pids is not None else not _pid_alive(int(pid)):
+            stale.append(path)
+    if not stale:
+        return
+    counters, histograms = {}, {}
+    for path in [directory / RETIRED] + stale:
+        data = _read(path)
+        if data is not None:
+            _merge(counters, histograms, data)
+    _write(directory / RETIRED, {
+        "pid": None,
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), series] for (name, labels), series in histograms.items()],
+    })
+    for path in stale:
+        path.unlink(missing_ok=True)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render():
+    """Prometheus text exposition (version 0.0.4) of all workers combined."""
+    counters, histograms, workers = collect()
+    by_name = {}
+    for (name, labels), value in sorted(counters.items()):
+        by_name.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_number(value)}")
+    for (name, labels), series in sorted(histograms.items()):
+        buckets = QUERY_BUCKETS if name == "navybaby_request_queries" else LATENCY_BUCKETS
+        lines = by_name.setdefault(name, [])
+        for bound, count in zip(buckets, series):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {series[-2]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {series[-2]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_number(series[-1])}")
+    for data in workers:
+        labels = _labels(pid=data["pid"], **data.get("worker", {}))
+        by_name.setdefault("navybaby_worker_info", []).append(f"navybaby_worker_info{_format_labels(labels)} 1")
+
+    out = []
+    for name in sorted(by_name):
+        kind, text = HELP.get(name, ("untyped", name))
+        out.append(f"# HELP {name} {text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(by_name[name])
+    return "\n".join(out) + "\n"
@@ -0,0 +1,193 @@
+import atexit
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import db_routing, metrics, perf, profiler, slow_queries
+
+perf_logger = logging.getLogger("navybaby.perf")
+slow_logger = logging.getLogger("navybaby.slow_queries")
+
+
+class PerformanceMiddleware:
+    """
+    Opt-in request instrumentation (``settings.PERF_INSTRUMENTATION``).
+
+    Records wall time, SQL query count/time, template render time and cache
+    hits for each request, returns them in a ``Server-Timing`` header and logs
+    one JSON line per request to the ``navybaby.perf`` logger. Requests slower
+    than ``PERF_SLOW_REQUEST_MS`` are logged as warnings together with their
+    ``PERF_SLOW_QUERY_TOP_N`` slowest queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", 1000)
+        self.top_n = getattr(settings, "PERF_SLOW_QUERY_TOP_N", 5)
+
+    def __call__(self, request):
+        with perf.collect(keep_slowest=self.top_n) as metrics:
+            response = self.get_response(request)
+
+        response["Server-Timing"] = metrics.server_timing()
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "view": getattr(getattr(request, "resolver_match", None), "view_name", None),
+            **metrics.as_dict(),
+        }
+        slow = record["total_ms"] >= self.slow_ms
+        if slow:
+            record["slow"] = True
+            record["top_queries"] = [
+                {"ms": round(duration * 1000, 2), "db": alias, "sql": sql[:2000]}
+                for duration, alias, sql, _params in metrics.slowest_queries()
+            ]
+        perf_logger.log(
+            logging.WARNING if slow else logging.INFO,
+            json.dumps(record, ensure_ascii=False, default=str),
+        )
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    On-demand profiling for staff (``settings.PROFILER_ENABLED``).
+
+    Adding ``?__profile=1`` to any URL runs that request under cProfile and
+    returns the sorted stats plus every SQL query it ran as plain text;
+    ``?__profile=flame`` samples the call stack instead and returns collapsed
+    stacks for a flamegraph; ``?__profile=save`` profiles with cProfile but
+    returns the normal page. In all modes the output is also written to
+    ``PROFILER_OUTPUT_DIR`` (``.prof`` files open in snakeviz / pstats), which
+    keeps the newest ``PROFILER_KEEP`` profiles.
+    Other users and requests without the parameter are passed straight through.
+    """
+
+    MODES = ("1", "flame", "save")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.param = getattr(settings, "PROFILER_QUERY_PARAM", "__profile")
+        self.output_dir = Path(getattr(settings, "PROFILER_OUTPUT_DIR", settings.BASE_DIR / "profiles"))
+        self.sort = getattr(settings, "PROFILER_SORT", "cumulative")
+        self.keep = getattr(settings, "PROFILER_KEEP", 50)
+
+    def __call__(self, request):
+        mode = request.GET.get(self.param)
+        user = getattr(request, "user", None)
+        if mode not in self.MODES or not (user and user.is_authenticated and user.is_staff):
+            return self.get_response(request)
+
+        sort = request.GET.get(f"{self.param}_sort")
+        if sort not in profiler.SORT_KEYS:
+            sort = self.sort
+        with perf.collect(capture=True) as metrics:
+            if mode == "flame":
+                with profiler.StackSampler() as sampler:
+                    response = self.get_response(request)
+                report, prof = sampler.collapsed(), None
+            else:
+                response, prof, report = profiler.run_cprofile(lambda: self.get_response(request), sort=sort)
+        sql = profiler.format_queries(metrics.queries)
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "_", request.path).strip("_") or "root"
+        base = self.output_dir / f"{profiler.timestamp()}-{slug}"
+        if prof is not None:
+            prof.dump_stats(f"{base}.prof")
+        Path(f"{base}.{'collapsed' if mode == 'flame' else 'txt'}").write_text(report, encoding="utf-8")
+        Path(f"{base}.sql.txt").write_text(sql, encoding="utf-8")
+        profiler.prune(self.output_dir, self.keep)
+        perf_logger.info("profiled %s %s -> %s.*", request.method, request.get_full_path(), base)
+
+        if mode == "save":
+            response["X-Profile-File"] = base.name
+            return response
+        summary = (
+            f"{request.method} {request.get_full_path()} -> {response.status_code}\n"
+            f"{json.dumps(metrics.as_dict())}\nsaved: {base}.*\n\n"
+        )
+        body = report if mode == "flame" else summary + report + "\n\n=== SQL ===\n" + sql
+        return HttpResponse(body, content_type="text/plain; charset=utf-8")
+
+
+class MetricsMiddleware:
+    """
+    Feeds ``core.metrics`` (``settings.METRICS_ENABLED``): latency and query
+    histograms, status codes and cache hits per view. Numbers are flushed to
+    the shared metrics directory every ``METRICS_FLUSH_SECONDS``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.set_worker_info(ppid=os.getppid(), started=int(time.time()))
+        # Keep the last few seconds of numbers when gunicorn recycles the worker
+        atexit.register(metrics.flush, force=True)
+
+    def __call__(self, request):
+        with perf.collect() as measured:
+            response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        metrics.record_request(
+            view=match.view_name if match else "unresolved",
+            status=response.status_code,
+            duration=measured.total_time,
+            queries=measured.sql_count,
+            cache_hits=measured.cache_hits,
+            cache_misses=measured.cache_misses,
+        )
+        server = request.META.get("SERVER_SOFTWARE")
+        if server:
+            metrics.set_worker_info(server=server)
+        metrics.flush()
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Hands statements slower than ``SLOW_QUERY_THRESHOLD_MS`` to
+    ``core.slow_queries`` (``settings.SLOW_QUERY_ENABLED``); see the admin
+    "Truy vấn chậm" page for the aggregated results and plans.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 200) / 1000
+        self.per_request = getattr(settings, "SLOW_QUERY_MAX_PER_REQUEST", 10)
+
+    def __call__(self, request):
+        with perf.collect(keep_slowest=self.per_request) as measured:
+            response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        # Not the raw path: 404 probes would each become a separate "view"
+        view = match.view_name if match else "<unresolved>"
+        for duration, alias, sql, params in measured.slowest_queries():
+            if duration < self.threshold:
+                break
+            if "core_slowquery" in sql:
+                continue
+            slow_logger.warning("slow query %.1f ms in %s: %s", duration * 1000, view, slow_queries.normalize(sql)[:500])
+            slow_queries.submit(alias, sql, params, duration * 1000, view)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """After a write request, keep the session's reads on the primary for a while."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            db_routing.pin_to_primary(request)
+        return response
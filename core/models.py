@@ -1,3 +1,32 @@
 from django.db import models
 
-# Create your models here.
+
+class SlowQuery(models.Model):
+    """One row per normalised SQL statement that went over SLOW_QUERY_THRESHOLD_MS."""
+
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField()
+    example_sql = models.TextField()
+    example_params = models.TextField(blank=True)  # strings redacted
+    database = models.CharField(max_length=50, default="default")
+    last_view = models.CharField(max_length=200, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    last_ms = models.FloatField(default=0)
+    plan = models.TextField(blank=True)
+    plan_captured_at = models.DateTimeField(null=True, blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-total_ms"]
+        verbose_name = "Truy vấn chậm"
+        verbose_name_plural = "Truy vấn chậm"
+
+    def __str__(self):
+        return f"{self.fingerprint[:10]} ({self.count}x)"
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.count if self.count else 0
@@ -0,0 +1,169 @@
+"""
+Per-request performance counters.
+
+``collect()`` opens a measuring scope for the current request: every SQL query
+run on this thread is timed through ``connection.execute_wrapper`` and
+``record_cache()`` adds to whatever scopes are active; the row cache and the
+product details cache call it. Template time is the time spent in top-level
+``Template.render`` calls (includes are part of their parent), so
+``render()`` in function views counts as well as TemplateResponse.
+Scopes nest, so the timing middleware, the profiler and the metrics exporter
+can each keep their own numbers for the same request. Work a request hands to
+other threads (the async dashboard) is counted when it runs inside
+``track_queries()``.
+"""
+import contextvars
+import heapq
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_active = contextvars.ContextVar("navybaby_perf_scopes", default=())
+_in_template = contextvars.ContextVar("navybaby_perf_in_template", default=False)
+_template_timer_installed = False
+
+
+class RequestMetrics:
+    def __init__(self, keep_slowest=0, capture=False):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.keep_slowest = keep_slowest
+        # Min-heap of (duration, seq, alias, sql, params) bounded to keep_slowest
+        self._slowest = []
+        # Every query in execution order as (duration, alias, sql, params); profiler only
+        self.queries = [] if capture else None
+        self._lock = threading.Lock()
+
+    def record_query(self, alias, sql, params, duration):
+        with self._lock:
+            self._record_query(alias, sql, params, duration)
+
+    def _record_query(self, alias, sql, params, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        if self.queries is not None:
+            self.queries.append((duration, alias, sql, params))
+        if self.keep_slowest:
+            item = (duration, self.sql_count, alias, sql, params)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, item)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def slowest_queries(self):
+        """Slowest captured queries, slowest first, as (duration, alias, sql, params)."""
+        ordered = sorted(self._slowest, reverse=True)
+        return [(d, alias, sql, params) for d, _seq, alias, sql, params in ordered]
+
+    @property
+    def total_time(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_time * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+    def server_timing(self):
+        """Value for the ``Server-Timing`` response header."""
+        return ", ".join([
+            f'total;dur={self.total_time * 1000:.1f}',
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+        ])
+
+
+class _QueryTimer:
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            for metrics in _active.get():
+                metrics.record_query(self.alias, sql, params, duration)
+
+
+def record_template(duration):
+    for metrics in _active.get():
+        metrics.template_time += duration
+
+
+def _install_template_timer():
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    from django.template.base import Template
+
+    original = Template.render
+
+    def render(self, context):
+        if not _active.get() or _in_template.get():
+            return original(self, context)
+        token = _in_template.set(True)
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            record_template(time.perf_counter() - start)
+            _in_template.reset(token)
+
+    Template.render = render
+    _template_timer_installed = True
+
+
+def record_cache(hit):
+    """Count a cache lookup for the current request (no-op outside ``collect()``)."""
+    for metrics in _active.get():
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+@contextmanager
+def track_queries():
+    """
+    Time this thread's queries for the scopes active in its context. ``collect()``
+    does it for its own thread; worker threads of a request (which inherit the
+    context but have their own connections) need it around their work.
+    """
+    with ExitStack() as stack:
+        if _active.get():
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(_QueryTimer(conn.alias)))
+        yield
+
+
+@contextmanager
+def collect(keep_slowest=0, capture=False):
+    _install_template_timer()
+    metrics = RequestMetrics(keep_slowest=keep_slowest, capture=capture)
+    outer = _active.get()
+    token = _active.set(outer + (metrics,))
+    try:
+        with ExitStack() as stack:
+            # The outermost scope installs the timers; inner scopes are fed by it
+            if not outer:
+                stack.enter_context(track_queries())
+            yield metrics
+    finally:
+        metrics.finished = time.perf_counter()
+        _active.reset(token)
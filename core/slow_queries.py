@@ -0,0 +1,171 @@
+"""
+Slow SQL capture (``settings.SLOW_QUERY_ENABLED``).
+
+``core.middleware.SlowQueryMiddleware`` keeps the slowest queries of each
+request through ``perf.collect()``; those over ``SLOW_QUERY_THRESHOLD_MS`` are
+handed to a background thread which folds them into ``SlowQuery`` rows keyed by a
+fingerprint of the normalised SQL and, at most once per
+``SLOW_QUERY_PLAN_TTL`` seconds per fingerprint, stores an EXPLAIN plan
+(``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` / ``EXPLAIN ANALYZE`` on
+PostgreSQL). The request never waits for the bookkeeping.
+"""
+import datetime
+import decimal
+import hashlib
+import logging
+import queue
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger("navybaby.slow_queries")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """Replace literals and IN-lists so that queries differing only by values match."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode("utf-8")).hexdigest()
+
+
+def redact(params):
+    """Keep numbers, dates and NULLs; hide strings (names, phones, addresses)."""
+    if params is None:
+        return ""
+    if isinstance(params, dict):
+        params = list(params.values())
+    shown = []
+    for value in params:
+        if value is None or isinstance(value, (bool, int, float, decimal.Decimal, datetime.date, datetime.datetime)):
+            shown.append(repr(value))
+        else:
+            shown.append(f"<{type(value).__name__} redacted>")
+    if len(shown) > 50:
+        shown = shown[:50] + [f"... {len(shown) - 50} more"]
+    return "[" + ", ".join(shown) + "]"
+
+
+def is_explainable(sql):
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return head in ("SELECT", "WITH")
+
+
+def explain(alias, sql, params):
+    conn = connections[alias]
+    vendor = conn.vendor
+    if vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif vendor == "postgresql":
+        analyze = getattr(settings, "SLOW_QUERY_EXPLAIN_ANALYZE", False)
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        return ""
+    # ANALYZE runs the statement; roll back so a plan never changes data
+    with transaction.atomic(using=alias):
+        with conn.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        transaction.set_rollback(True, using=alias)
+    if vendor == "sqlite":
+        # (id, parent, notused, detail)
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def record(alias, sql, params, duration_ms, view):
+    """Fold one slow statement into its SlowQuery row; store a plan if missing or stale."""
+    from .models import SlowQuery
+
+    normalized = normalize(sql)
+    key = fingerprint(normalized)
+    row, created = SlowQuery.objects.get_or_create(
+        fingerprint=key,
+        defaults={
+            "normalized_sql": normalized,
+            "example_sql": sql,
+            "example_params": redact(params),
+            "database": alias,
+            "last_view": view or "",
+            "count": 1,
+            "total_ms": duration_ms,
+            "max_ms": duration_ms,
+            "last_ms": duration_ms,
+        },
+    )
+    if not created:
+        updates = {
+            "count": F("count") + 1,
+            "total_ms": F("total_ms") + duration_ms,
+            "last_ms": duration_ms,
+            "last_view": view or "",
+            "last_seen": timezone.now(),
+        }
+        if duration_ms > row.max_ms:
+            updates.update(max_ms=duration_ms, example_sql=sql, example_params=redact(params))
+        SlowQuery.objects.filter(pk=row.pk).update(**updates)
+
+    ttl = getattr(settings, "SLOW_QUERY_PLAN_TTL", 86400)
+    stale = row.plan_captured_at is None or row.plan_captured_at < timezone.now() - timedelta(seconds=ttl)
+    if (created or stale) and is_explainable(sql):
+        try:
+            plan = explain(alias, sql, params)
+        except Exception as exc:
+            plan = f"EXPLAIN failed: {exc}"
+        SlowQuery.objects.filter(pk=row.pk).update(plan=plan, plan_captured_at=timezone.now())
+
+
+class _Recorder:
+    """Single daemon thread draining a bounded queue, started on first use."""
+
+    def __init__(self, maxsize=1000):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, item):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="navybaby-slow-queries", daemon=True)
+                self.thread.start()
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            logger.warning("slow query queue full, dropping %s", item[1][:200])
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                record(*item)
+            except Exception:
+                logger.exception("could not record slow query")
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+_recorder = _Recorder()
+
+
+def submit(alias, sql, params, duration_ms, view):
+    if getattr(settings, "SLOW_QUERY_ASYNC", True):
+        _recorder.submit((alias, sql, params, duration_ms, view))
+    else:
+        record(alias, sql, params, duration_ms, view)
+
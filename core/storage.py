@@ -0,0 +1,75 @@
+"""
+Static files storage for production builds (``USE_COMPILED_ASSETS=True``).
+
+On ``collectstatic`` our own scripts and stylesheets (``static/``, not the
+admin's) are minified in STATIC_ROOT before WhiteNoise hashes them and writes
+``.gz`` / ``.br`` variants, so the hashed names WhiteNoise serves as immutable
+are also the smallest version of each file. Minifying needs ``rjsmin`` /
+``rcssmin``; without them files are only hashed and compressed.
+"""
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+logger = logging.getLogger(__name__)
+
+
+def minify(name, text):
+    """Minified ``text`` for a .js/.css file, or None if there is nothing to do."""
+    if ".min." in name:
+        return None
+    if name.endswith(".js") and rjsmin is not None:
+        return rjsmin.jsmin(text)
+    if name.endswith(".css") and rcssmin is not None:
+        return rcssmin.cssmin(text)
+    return None
+
+
+class StaticStorage(CompressedManifestStaticFilesStorage):
+    def _is_project_file(self, source_storage):
+        location = getattr(source_storage, "location", None)
+        if not location:
+            return False
+        return any(Path(location).resolve() == Path(d).resolve() for d in settings.STATICFILES_DIRS)
+
+    def minify_collected(self, paths):
+        """
+        Minify the copies in STATIC_ROOT and point ``paths`` at them: the
+        manifest step reads from the source storage given there, not from
+        STATIC_ROOT, so it would otherwise hash the original files.
+        """
+        paths = dict(paths)
+        saved = 0
+        for name, (source_storage, _path) in list(paths.items()):
+            if not name.endswith((".js", ".css")) or not self._is_project_file(source_storage):
+                continue
+            target = Path(self.path(name))
+            original = target.read_text(encoding="utf-8")
+            minified = minify(name, original)
+            if minified is None:
+                continue
+            if len(minified) < len(original):
+                target.write_text(minified, encoding="utf-8")
+                saved += len(original) - len(minified)
+            # Unchanged files skipped by collectstatic were minified last run
+            paths[name] = (self, name)
+        if saved:
+            logger.info("minified static files, %.1f KB saved", saved / 1024)
+        return paths
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            paths = self.minify_collected(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
@@ -0,0 +1,194 @@
+"""
+Synthetic data generation shared by the ``seed_synthetic`` command and the
+query-budget tests. Everything is inserted with ``bulk_create`` in batches.
+Orders, the bulk of the rows, are generated and inserted one batch at a time,
+so only the customers and products (and the ids picked from) stay in memory.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from categories.models import Category
+from customers.models import Customer
+from finance.models import FinanceCategory, FinanceTransaction
+from orders.models import Order
+from products import stats as product_stats
+from products.attributes import values_for
+from products.models import AttributeValue, Color, Product, Size, Variant, attribute_key
+from suppliers.models import Supplier
+
+COLOR_NAMES = ["Trắng", "Đen", "Đỏ", "Xanh", "Vàng", "Hồng"]
+SIZE_NAMES = ["S", "M", "L", "XL", "2XL"]
+
+# Same category names the customer/bill views look up
+FINANCE_CATEGORIES = [
+    ("INCOME", "KH thanh toán đơn hàng"),
+    ("INCOME", "KH đặt cọc tiền hàng"),
+    ("EXPENSE", "Khấu trừ khoản tiền đặt cọc"),
+    ("EXPENSE", "Chi phí vận chuyển"),
+]
+
+# Rough real-life mix: most orders end up reconciled, few are cancelled;
+# statuses not listed here get the default weight
+STATUS_MIX = {"cart": 5, "reconciled": 45}
+STATUS_WEIGHTS = {code: STATUS_MIX.get(code, 10) for code, _label in Order.STATUS_CHOICES}
+
+
+def bulk_create_stamped(model, objs, batch_size):
+    """
+    ``bulk_create`` keeping the created_at/updated_at set on ``objs``.
+    auto_now/auto_now_add overwrite them on insert, so they are written back
+    with ``bulk_update`` (which does not touch them).
+    """
+    stamps = [(obj.created_at, obj.updated_at) for obj in objs]
+    objs = model.objects.bulk_create(objs, batch_size=batch_size)
+    for obj, (created_at, updated_at) in zip(objs, stamps):
+        obj.created_at, obj.updated_at = created_at, updated_at
+    model.objects.bulk_update(objs, ["created_at", "updated_at"], batch_size=batch_size)
+    return objs
+
+
+def _random_moment(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def seed(
+    customers=100,
+    products=50,
+    orders=1000,
+    transactions=200,
+    days=365,
+    prefix="SYN",
+    seed_value=None,
+    batch_size=5000,
+    log=None,
+):
+    """
+    Insert a synthetic dataset and return the ids it created.
+
+    Orders (and transactions) pick customers and products from the whole
+    table, existing rows included, so repeated runs make the existing
+    customers/products "heavier" as well. Statuses follow ``STATUS_WEIGHTS``
+    and creation dates are spread over the last ``days`` days.
+    """
+    rng = random.Random(seed_value)
+    now = timezone.now()
+    log = log or (lambda message: None)
+
+    with transaction.atomic():
+        category, _ = Category.objects.get_or_create(code=f"DM-{prefix}", defaults={"name": f"Danh mục {prefix}"})
+        supplier, _ = Supplier.objects.get_or_create(code=f"NCC-{prefix}", defaults={"name": f"Nhà cung cấp {prefix}"})
+
+        product_objs = []
+        for i in range(products):
+            created = _random_moment(rng, now, days)
+            price = rng.randrange(50_000, 1_000_000, 5_000)
+            product_objs.append(Product(
+                code=f"SP-{prefix}-{i:06d}",
+                name=f"Sản phẩm {prefix} {i}",
+                category=category,
+                supplier=supplier,
+                price=price,
+                purchase_price=int(price * rng.uniform(0.4, 0.8)),
+                created_at=created,
+                updated_at=created,
+            ))
+        product_objs = bulk_create_stamped(Product, product_objs, batch_size)
+        keyed = values_for(AttributeValue.COLOR, COLOR_NAMES)
+        color_values = {name: keyed[attribute_key(name)] for name in COLOR_NAMES}
+        keyed = values_for(AttributeValue.SIZE, SIZE_NAMES)
+        size_values = {name: keyed[attribute_key(name)] for name in SIZE_NAMES}
+        picked_colors = [(p, rng.sample(COLOR_NAMES, 2)) for p in product_objs]
+        picked_sizes = [rng.sample(SIZE_NAMES, 3) for _ in product_objs]
+        Color.objects.bulk_create(
+            [Color(product=p, value=color_values[n], name=n) for p, names in picked_colors for n in names],
+            batch_size=batch_size,
+        )
+        Size.objects.bulk_create(
+            [Size(product=p, value=size_values[n], name=n) for (p, _), names in zip(picked_colors, picked_sizes) for n in names],
+            batch_size=batch_size,
+        )
+        Variant.objects.bulk_create(
+            [
+                Variant(product=p, color=color_values[c], size=size_values[s])
+                for (p, colors), sizes in zip(picked_colors, picked_sizes) for c in colors for s in sizes
+            ],
+            batch_size=batch_size,
+        )
+        log(f"{len(product_objs)} products")
+
+        customer_objs = []
+        for i in range(customers):
+            created = _random_moment(rng, now, days)
+            customer_objs.append(Customer(
+                code=f"KH-{prefix}-{i:06d}",
+                name=f"Khách {prefix} {i}",
+                phone_number=f"09{rng.randint(0, 99_999_999):08d}",
+                created_at=created,
+                updated_at=created,
+            ))
+        customer_objs = bulk_create_stamped(Customer, customer_objs, batch_size)
+        log(f"{len(customer_objs)} customers")
+
+        customer_ids = list(Customer.objects.values_list("id", flat=True))
+        product_prices = dict(Product.objects.values_list("id", "price"))
+        product_ids = list(product_prices)
+        colors_by_product, sizes_by_product = {}, {}
+        for color_id, product_id in Color.objects.values_list("id", "product_id"):
+            colors_by_product.setdefault(product_id, []).append(color_id)
+        for size_id, product_id in Size.objects.values_list("id", "product_id"):
+            sizes_by_product.setdefault(product_id, []).append(size_id)
+        statuses = list(STATUS_WEIGHTS)
+        weights = list(STATUS_WEIGHTS.values())
+
+        created_orders = 0
+        while created_orders < orders:
+            batch = []
+            for i in range(created_orders, min(orders, created_orders + batch_size)):
+                product_id = rng.choice(product_ids)
+                created = _random_moment(rng, now, days)
+                colors = colors_by_product.get(product_id)
+                sizes = sizes_by_product.get(product_id)
+                batch.append(Order(
+                    code=f"ĐH-{prefix}-{i:07d}",
+                    customer_id=rng.choice(customer_ids),
+                    product_id=product_id,
+                    color_id=rng.choice(colors) if colors else None,
+                    size_id=rng.choice(sizes) if sizes else None,
+                    amount=rng.randint(1, 4),
+                    sale_price=product_prices[product_id],
+                    discount=rng.choice([0, 0, 0, 5_000, 10_000, 20_000]),
+                    status=rng.choices(statuses, weights)[0],
+                    created_at=created,
+                    updated_at=created + timedelta(hours=rng.randint(0, 72)),
+                ))
+            bulk_create_stamped(Order, batch, batch_size)
+            created_orders += len(batch)
+            log(f"{created_orders}/{orders} orders")
+        # bulk_create skips the order signals; new orders also land on older products
+        product_stats.refresh(product_ids)
+
+        finance_categories = [
+            FinanceCategory.objects.get_or_create(type=kind, name=name)[0]
+            for kind, name in FINANCE_CATEGORIES
+        ]
+        tx_objs = []
+        for _ in range(transactions):
+            created = _random_moment(rng, now, days)
+            tx_objs.append(FinanceTransaction(
+                category=rng.choice(finance_categories),
+                amount=Decimal(rng.randint(1, 200) * 10_000),
+                customer_id=rng.choice(customer_ids),
+                created_at=created,
+                updated_at=created,
+            ))
+        bulk_create_stamped(FinanceTransaction, tx_objs, batch_size)
+        log(f"{len(tx_objs)} finance transactions")
+
+    return {
+        "customers": [c.pk for c in customer_objs],
+        "products": [p.pk for p in product_objs],
+    }
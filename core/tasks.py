@@ -0,0 +1,9 @@
+from jobs.queue import task
+
+from .templatetags import media_extras
+
+
+@task("core.build_thumbnail")
+def build_thumbnail(job, name, width, height):
+    """Local thumbnail queued by ``{% thumbnail %}`` when it was missing or stale."""
+    return {"thumbnail": media_extras.build_local_thumb(name, width, height)}
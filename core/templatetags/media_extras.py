@@ -1,8 +1,95 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
 from django import template
 from django.conf import settings
+from django.utils.html import format_html, format_html_join
 
 register = template.Library()
 
+logger = logging.getLogger(__name__)
+
+# Local thumbnails live under MEDIA_ROOT/<THUMB_DIR>/<w>x<h>/<original name>
+THUMB_DIR = "thumbs"
+
+# Resolved URLs per process, least recently used evicted first. Keys hold
+# everything the URL depends on (Cloudinary public id + version + format, or
+# the media name); a new upload gets a new key, so entries never go stale.
+URL_MEMO_SIZE = 4096
+_url_memo = OrderedDict()
+_memo_lock = threading.Lock()
+# Local thumbnails already handed to the job queue by this process
+_thumbs_queued = set()
+
+
+def _image_key(image_field):
+    public_id = getattr(image_field, "public_id", None)
+    if public_id:
+        return (
+            "cloudinary", public_id, getattr(image_field, "version", None),
+            getattr(image_field, "format", None), getattr(image_field, "type", None),
+            getattr(image_field, "resource_type", None),
+        )
+    name = getattr(image_field, "name", None)
+    if not name and isinstance(image_field, str):
+        name = image_field
+    return ("name", name) if name else None
+
+
+class _Uncached:
+    """A result that must not be memoised: the thumbnail is still being built."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _memoized(kind, image_field, compute, raw=False):
+    key = _image_key(image_field)
+    if key is not None:
+        key = (kind,) + key
+        with _memo_lock:
+            if key in _url_memo:
+                _url_memo.move_to_end(key)
+                return _url_memo[key]
+    value = compute()
+    if isinstance(value, _Uncached):
+        return value if raw else value.value
+    if key is not None:
+        with _memo_lock:
+            _url_memo[key] = value
+            if len(_url_memo) > URL_MEMO_SIZE:
+                _url_memo.popitem(last=False)
+    return value
+
+
+def clear_url_memo():
+    with _memo_lock:
+        _url_memo.clear()
+        _thumbs_queued.clear()
+
+
+def _media_name(image_field):
+    """Relative media name of an ImageField/CloudinaryField value ("" if none)."""
+    name = getattr(image_field, "name", "")
+    if not name and getattr(image_field, "public_id", None):
+        # CloudinaryResource without Cloudinary config (local media, e.g. images
+        # published by products.images offline)
+        fmt = getattr(image_field, "format", None)
+        name = f"{image_field.public_id}.{fmt}" if fmt else image_field.public_id
+    if not name and isinstance(image_field, str):
+        name = image_field
+    return name or ""
+
+
+def _media_url(name):
+    base = getattr(settings, "MEDIA_URL", "/media/")
+    if not base.endswith("/"):
+        base += "/"
+    return f"{base}{name}"
+
+
 @register.filter
 def safe_image_url(image_field):
     """
@@ -10,9 +97,14 @@ def safe_image_url(image_field):
     - If Cloudinary is configured, use the field's url.
     - If not configured or url building fails, fall back to MEDIA_URL + name.
     - Returns empty string if not available.
+    Results are memoised per image (see ``_memoized``).
     """
     if not image_field:
         return ""
+    return _memoized("url", image_field, lambda: _resolve_url(image_field))
+
+
+def _resolve_url(image_field):
     # Try native .url first (works when configured properly)
     try:
         url = image_field.url
@@ -20,13 +112,163 @@ def safe_image_url(image_field):
     except Exception:
         pass
     # Fallback to MEDIA_URL + name
-    name = getattr(image_field, "name", "")
+    name = _media_name(image_field)
     if not name:
         return ""
     # If already a full URL, return as-is
     if isinstance(name, str) and name.startswith("http"):
         return name
-    base = getattr(settings, "MEDIA_URL", "/media/")
-    if not base.endswith("/"):
-        base += "/"
-    return f"{base}{name}"
+    return _media_url(name)
+
+
+def _parse_size(size):
+    """96 -> (96, 96); "120x80" -> (120, 80)."""
+    text = str(size).lower()
+    if "x" in text:
+        width, height = text.split("x", 1)
+        return int(width), int(height)
+    return int(text), int(text)
+
+
+def _cloudinary_thumb(image_field, width, height):
+    # Resize/crop/format conversion happens on Cloudinary's CDN
+    return image_field.build_url(
+        width=width, height=height, crop="fill",
+        quality="auto", fetch_format="auto", secure=True,
+    )
+
+
+def _thumb_paths(name, width, height):
+    """(thumbnail media name, source path, thumbnail path)."""
+    root = str(settings.MEDIA_ROOT)
+    base, ext = os.path.splitext(name)
+    ext = ".png" if ext.lower() == ".png" else ".jpg"
+    thumb_name = f"{THUMB_DIR}/{width}x{height}/{base}{ext}"
+    return thumb_name, os.path.join(root, name), os.path.join(root, thumb_name)
+
+
+def _thumb_fresh(source, target):
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def build_local_thumb(name, width, height):
+    """
+    Write the Pillow thumbnail next to the media files (the
+    ``core.build_thumbnail`` job); rebuilt when the original is newer.
+    Returns its media name.
+    """
+    from PIL import Image, ImageOps
+
+    thumb_name, source, target = _thumb_paths(name, width, height)
+    if _thumb_fresh(source, target):
+        return thumb_name
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        thumb = ImageOps.fit(img, (width, height), Image.LANCZOS)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        if target.endswith(".png"):
+            thumb.save(tmp, format="PNG", optimize=True)
+        else:
+            thumb.convert("RGB").save(tmp, format="JPEG", quality=80, optimize=True, progressive=True)
+        os.replace(tmp, target)
+    return thumb_name
+
+
+def _local_thumb(name, width, height):
+    """
+    Media name of a ready local thumbnail. Otherwise the thumbnail is queued
+    (once per process) and None is returned; rendering never waits for Pillow.
+    """
+    thumb_name, source, target = _thumb_paths(name, width, height)
+    try:
+        if _thumb_fresh(source, target):
+            return thumb_name
+    except OSError:
+        return None
+    key = (name, width, height)
+    with _memo_lock:
+        if key in _thumbs_queued:
+            return None
+        _thumbs_queued.add(key)
+    try:
+        from jobs.queue import enqueue
+
+        enqueue("core.build_thumbnail", args={"name": name, "width": width, "height": height}, priority=-5)
+    except Exception:
+        logger.warning("could not queue thumbnail %s", thumb_name, exc_info=True)
+    return None
+
+
+def _thumb_url(image_field, width, height, raw=False):
+    if not image_field:
+        return ""
+    return _memoized(f"{width}x{height}", image_field, lambda: _resolve_thumb(image_field, width, height), raw)
+
+
+def _resolve_thumb(image_field, width, height):
+    if getattr(settings, "USE_CLOUDINARY", False) and hasattr(image_field, "build_url"):
+        try:
+            return _cloudinary_thumb(image_field, width, height)
+        except Exception:
+            pass
+    name = _media_name(image_field)
+    if name and not name.startswith("http") and os.path.exists(os.path.join(str(settings.MEDIA_ROOT), name)):
+        thumb_name = _local_thumb(name, width, height)
+        if thumb_name:
+            return _media_url(thumb_name)
+        # Being built in the background: the original until it is there
+        return _Uncached(safe_image_url(image_field))
+    # No variant possible: serve the original
+    return safe_image_url(image_field)
+
+
+@register.filter
+def thumbnail_url(image_field, size):
+    """URL of a ``size`` ("96" or "120x80") variant: ``{{ p.image|thumbnail_url:96 }}``."""
+    width, height = _parse_size(size)
+    return _thumb_url(image_field, width, height)
+
+
+@register.simple_tag
+def thumbnail(image_field, size, **attrs):
+    """
+    ``<img>`` sized for a ``size`` CSS-pixel box, with a 2x variant in
+    ``srcset``, ``loading="lazy"`` and explicit width/height so the layout does
+    not jump while images load::
+
+        {% thumbnail p.image 64 alt=p.name class="w-16 h-16 object-cover" %}
+    """
+    if not image_field:
+        return ""
+    width, height = _parse_size(size)
+    sources = _memoized(f"img{width}x{height}", image_field, lambda: _img_sources(image_field, width, height))
+    if not sources:
+        return ""
+    attrs.setdefault("alt", "")
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    return format_html(
+        '<img {} width="{}" height="{}"{}>',
+        sources,
+        width,
+        height,
+        format_html_join("", ' {}="{}"', sorted(attrs.items())),
+    )
+
+
+def _img_sources(image_field, width, height):
+    """Escaped ``src``/``srcset`` attributes, built once per image and size."""
+    src = _thumb_url(image_field, width, height, raw=True)
+    src_2x = _thumb_url(image_field, width * 2, height * 2, raw=True)
+    pending = isinstance(src, _Uncached) or isinstance(src_2x, _Uncached)
+    if pending:
+        src = getattr(src, "value", src)
+        src_2x = getattr(src_2x, "value", src_2x)
+    if not src:
+        html = ""
+    elif src_2x == src:
+        html = format_html('src="{}"', src)
+    else:
+        html = format_html('src="{}" srcset="{} 1x, {} 2x"', src, src, src_2x)
+    return _Uncached(html) if pending else html
@@ -1,6 +1,14 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+from functools import lru_cache
+
 from django import template
 import re
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import formats
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
 from django.contrib.humanize.templatetags.humanize import intcomma
 from django.urls import reverse
 
@@ -8,6 +16,71 @@ register = template.Library()
 
 THRESHOLD = 1_000_000  # compact when abs(value) >= 1M
 
+# smart_vnd runs for every money cell of every table, so the number formatting
+# below avoids intcomma()'s per-call locale lookups: ints and Decimals are
+# rounded without a float round-trip, grouping is done by str.format and the
+# finished SafeStrings are memoised. Output matches the old
+# float()/round()/intcomma() chain (golden tests in core/tests.py,
+# `python manage.py bench_number_format` for timings).
+
+@lru_cache(maxsize=None)
+def _separator_for(lang):
+    grouping = formats.get_format("NUMBER_GROUPING", lang, use_l10n=True)
+    return formats.get_format("THOUSAND_SEPARATOR", lang, use_l10n=True) if grouping == 3 else None
+
+
+@lru_cache(maxsize=None)
+def _language_per_request():
+    return "django.middleware.locale.LocaleMiddleware" in settings.MIDDLEWARE
+
+
+@receiver(setting_changed)
+def _reset_separators(setting, **kwargs):
+    if setting in formats.FORMAT_SETTINGS or setting in ("FORMAT_MODULE_PATH", "LANGUAGE_CODE", "MIDDLEWARE"):
+        _separator_for.cache_clear()
+        _language_per_request.cache_clear()
+
+
+def _thousand_separator():
+    """Separator intcomma() would use, or None when the locale doesn't group by 3."""
+    # Without LocaleMiddleware nothing activates a language, so it is always
+    # LANGUAGE_CODE; skip get_language(), whose asgiref lookup costs more than
+    # the formatting itself.
+    if _language_per_request():
+        return _separator_for(get_language())
+    return _separator_for(settings.LANGUAGE_CODE)
+
+
+def _group(n, sep):
+    """intcomma(n) for an int, given _thousand_separator()."""
+    if sep is None:
+        return intcomma(n)
+    text = f"{n:,}"
+    return text if sep == "," else text.replace(",", sep)
+
+
+def _as_number(value):
+    """int/Decimal as-is (exact), anything else through float() like before; raises TypeError/ValueError."""
+    kind = type(value)
+    if kind is int or (kind is Decimal and value.is_finite()):
+        return value
+    return float(value)
+
+
+def _round_int(n):
+    """int(round(n, 0)): half to even, for the numbers _as_number() returns."""
+    kind = type(n)
+    if kind is int:
+        return n
+    if kind is Decimal:
+        return int(n.to_integral_value(rounding=ROUND_HALF_EVEN))
+    return round(n)
+
+
+@lru_cache(maxsize=8192)
+def _vnd(magnitude, negative, sep):
+    return mark_safe(f"{'-' if negative else ''}{_group(magnitude, sep)}đ")
+
 
 def _compact_number(value, digits=1):
     try:
@@ -30,7 +103,7 @@ def _compact_number(value, digits=1):
         suffix = 'K'
     else:
         # No suffix; return integer with thousands separator
-        return f"{sign}{intcomma(int(round(n, 0)))}"
+        return f"{sign}{_group(round(n), _thousand_separator())}"
 
     fmt = f"{num:.{digits}f}".rstrip('0').rstrip('.')
     return f"{sign}{fmt}{suffix}"
@@ -42,13 +115,13 @@ def smart_compact(value, digits=1):
     - digits: number of decimals to keep when compacting
     """
     try:
-        n = float(value)
+        n = _as_number(value)
     except (TypeError, ValueError):
         return value
 
     if abs(n) >= THRESHOLD:
         return _compact_number(n, digits)
-    return intcomma(int(round(n, 0)))
+    return _group(_round_int(n), _thousand_separator())
 
 
 @register.filter(name='smart_vnd')
@@ -58,11 +131,10 @@ def smart_vnd(value, digits=1):
     - Preserves minus sign for negatives.
     """
     try:
-        n = float(value)
+        n = _as_number(value)
     except (TypeError, ValueError):
         return value
-    sign = '-' if n < 0 else ''
-    return mark_safe(f"{sign}{intcomma(int(round(abs(n), 0)))}đ")
+    return _vnd(abs(_round_int(n)), n < 0, _thousand_separator())
 
 
 @register.filter(name='sub')
@@ -84,26 +156,28 @@ def sub(a, b):
 @register.filter(name='sum_attr')
 def sum_attr(items, attr):
     try:
-        iterable = list(items) if items is not None else []
+        iterable = iter(items) if items is not None else ()
     except TypeError:
-        iterable = []
+        iterable = ()
     total = 0
     for obj in iterable:
-        val = None
         try:
             val = getattr(obj, attr)
         except Exception:
             try:
                 val = obj.get(attr)
             except Exception:
-                val = None
+                continue
+        if type(val) is int:
+            total += val
+            continue
         try:
             total += int(val or 0)
         except Exception:
             try:
                 total += int(float(val))
             except Exception:
-                total += 0
+                pass
     return total
 
 
@@ -0,0 +1,90 @@
+"""
+Per-row fragment cache for long tables::
+
+    {% load row_cache %}
+    {% for order in orders %}
+      {% cacherow order "table" request.user.account_type order.product.updated_at %}
+        <tr>...</tr>
+      {% endcacherow %}
+    {% endfor %}
+
+The key is the object's model, pk and ``updated_at`` plus every extra
+argument, so an edited row (or one whose vary-on values changed) renders again
+and everything else comes from the cache. Pass every related value the row
+shows that can change without touching the object: the related row's
+``updated_at`` where it has a real one, its name otherwise (suppliers and
+categories only stamp ``updated_at`` on creation). Anything left out shows
+up after ``ROW_CACHE_TIMEOUT``.
+
+Inside the block ``{% csrf_token %}`` and ``{{ request_path }}`` (use it for
+"next" fields instead of ``request.get_full_path``) are rendered as markers
+and filled in per request, so cached rows can be shared across users and URLs.
+Off unless ``ROW_CACHE_ENABLED``.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from core import perf
+
+register = template.Library()
+
+CSRF_MARKER = "rowcachecsrftoken0"
+PATH_MARKER = "rowcacherequestpath0"
+
+
+def row_cache_key(obj, vary_on=()):
+    label = obj._meta.label_lower
+    parts = [label, obj.pk, getattr(obj, "updated_at", None), *vary_on]
+    digest = hashlib.md5(
+        "\x1f".join(str(p) for p in parts).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"row:{label}:{obj.pk}:{digest}"
+
+
+class RowCacheNode(template.Node):
+    def __init__(self, nodelist, obj, vary_on):
+        self.nodelist = nodelist
+        self.obj = obj
+        self.vary_on = vary_on
+
+    def render(self, context):
+        request = context.get("request")
+        path = request.get_full_path() if request is not None else ""
+        timeout = getattr(settings, "ROW_CACHE_TIMEOUT", 600)
+        obj = self.obj.resolve(context)
+        if not getattr(settings, "ROW_CACHE_ENABLED", False) or timeout <= 0 or getattr(obj, "pk", None) is None:
+            with context.push(request_path=path):
+                return self.nodelist.render(context)
+
+        cache = caches[getattr(settings, "ROW_CACHE_ALIAS", "default")]
+        key = row_cache_key(obj, [v.resolve(context) for v in self.vary_on])
+        html = cache.get(key)
+        perf.record_cache(html is not None)
+        if html is None:
+            with context.push(csrf_token=CSRF_MARKER, request_path=PATH_MARKER):
+                html = self.nodelist.render(context)
+            cache.set(key, str(html), timeout)
+
+        token = context.get("csrf_token")
+        token = str(token) if token and str(token) != "NOTPROVIDED" else ""
+        return mark_safe(html.replace(CSRF_MARKER, escape(token)).replace(PATH_MARKER, escape(path)))
+
+
+@register.tag
+def cacherow(parser, token):
+    """``{% cacherow obj [vary_on ...] %}...{% endcacherow %}``"""
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' cần ít nhất một đối số (object của dòng).")
+    nodelist = parser.parse(("endcacherow",))
+    parser.delete_first_token()
+    return RowCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(b) for b in bits[2:]],
+    )
@@ -1,3 +1,733 @@
-from django.test import TestCase
+import os
+import tempfile
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.humanize.templatetags.humanize import intcomma
+from django.db import connection
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import translation
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from accounts.models import User
+from customers.models import BillSnapshot, Customer
+from finance.models import FinanceCategory, FinanceTransaction
+from orders.models import Order
+from products.models import Product
+
+from . import db_routing, metrics, perf, synthetic
+from .middleware import PerformanceMiddleware, ProfilerMiddleware, SlowQueryMiddleware
+from .models import SlowQuery
+from .views import HomePageView, home_async
+from .templatetags import media_extras
+from .templatetags.number_extras import smart_compact, smart_vnd, sum_attr
+
+
+def seed_dataset(scale, prefix):
+    """
+    Dataset whose row counts grow linearly with ``scale``. New orders also go
+    to existing customers/products, so the detail pages of the first customer
+    and product get more rows as the dataset grows.
+    """
+    return synthetic.seed(
+        customers=3 * scale,
+        products=4 * scale,
+        orders=20 * scale,
+        transactions=5 * scale,
+        days=90,
+        prefix=prefix,
+        seed_value=1234,
+    )
+
+
+# Maximum number of SQL queries each page may run (GET, seeded dataset).
+# Includes the session and user lookups done by the middleware.
+QUERY_BUDGETS = {
+    "home": 35,
+    "accounts:dang-nhap": 1,
+    "accounts:dang-ky": 2,
+    "accounts:cho-duyet": 2,
+    "accounts:doi-mat-khau": 2,
+    "customers:customer_list": 4,
+    "customers:customer_create": 2,
+    "customers:customer_detail": 12,
+    "customers:customer_report": 11,  # incl. the top products' images, once orders fall in the report range
+    "customers:customer_bill": 13,  # builds and stores the snapshot; 6 when it is reused
+    "customers:customer_update": 3,
+    "categories:category_list": 4,
+    "categories:category_create": 3,
+    "categories:category_update": 4,
+    "categories:category_delete": 4,
+    "suppliers:supplier_list": 4,
+    "suppliers:supplier_create": 3,
+    "suppliers:supplier_update": 4,
+    "suppliers:supplier_delete": 4,
+    "orders:order_list": 6,
+    "orders:order_create": 4,
+    "orders:order_detail": 13,
+    "orders:order_update": 9,
+    "orders:product_details": 6,
+    "orders:products_details": 2,
+    "products:product_list": 8,
+    "products:product_create": 4,
+    "products:attribute_report": 6,
+    "products:product_detail": 13,
+    "products:product_report": 9,
+    "products:product_update": 7,
+    "products:product_delete": 5,
+    "finance:category_list": 4,
+    "finance:category_create": 2,
+    "finance:category_update": 3,
+    "finance:category_delete": 3,
+    "finance:transactions_list": 10,
+    "finance:income_create": 4,
+    "finance:expense_create": 4,
+    "finance:transaction_update": 5,
+    "finance:transaction_delete": 4,
+}
+
+# Routes that are not plain GET pages
+SKIPPED_ROUTES = {
+    "accounts:dang-xuat",  # POST only
+    "customers:customer_delete",  # POST only
+    "customers:payment_qr",  # image file written when a bill is rendered
+    "customers:bill_share",  # public, needs a signed token
+    "customers:bill_share_file",  # public, needs a signed token
+    "finance:income_quick_confirm",  # POST only
+    "orders:update_order_status",  # POST only
+    "orders:bulk_update_order_status",  # POST only
+    "metrics",  # 404 unless METRICS_ENABLED; plain text for Prometheus
+    "jobs:job_status",  # JSON; only the job owner and staff may read it
+    "orders:order_delete",  # confirm template is not part of the UI (deletes are POSTed)
+}
+
+
+def iter_named_routes(patterns=None, namespace=None):
+    """Yield (full url name, [kwarg names]) for every named route outside the admin."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            if entry.namespace == "admin":
+                continue
+            ns = entry.namespace or namespace
+            yield from iter_named_routes(entry.url_patterns, ns)
+        elif isinstance(entry, URLPattern) and entry.name:
+            name = f"{namespace}:{entry.name}" if namespace else entry.name
+            yield name, list(entry.pattern.converters)
+
+
+class AdminTests(TestCase):
+    """The admin's own templates come from django.contrib.admin (APP_DIRS)."""
+
+    def test_login_and_changelists(self):
+        self.assertEqual(self.client.get("/admin/login/").status_code, 200)
+        admin = User.objects.create_superuser(username="root", password="x", is_approved=True)
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(reverse("admin:index")).status_code, 200)
+        for name in ("accounts_user", "core_slowquery", "jobs_job", "customers_billsnapshot"):
+            self.assertEqual(self.client.get(reverse(f"admin:{name}_changelist")).status_code, 200, name)
+
+
+class QueryBudgetTests(TestCase):
+    """Every page stays within its query budget and does not grow with the data."""
+
+    scale = 1
+    growth = 9
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            account_type: User.objects.create_user(
+                username=account_type,
+                password="x",
+                account_type=account_type,
+                is_approved=True,
+                is_staff=account_type == "admin",
+            )
+            for account_type in ("admin", "staff", "viewer")
+        }
+        first = seed_dataset(cls.scale, "a")
+        cls.customer = Customer.objects.get(pk=first["customers"][0])
+        cls.product = Product.objects.select_related("category", "supplier").get(pk=first["products"][0])
+
+    def url_kwargs(self, name, params):
+        app = name.split(":")[0]
+        values = {
+            "customers": {"code": self.customer.code},
+            "categories": {"code": self.product.category.code},
+            "suppliers": {"code": self.product.supplier.code},
+            "orders": {
+                "pk": Order.objects.filter(customer=self.customer).order_by("pk").first().pk,
+                "product_id": self.product.pk,
+            },
+            "products": {"pk": self.product.pk},
+        }.get(app, {})
+        if app == "finance":
+            if name.startswith("finance:category"):
+                values = {"pk": FinanceCategory.objects.order_by("pk").first().pk}
+            else:
+                values = {"pk": FinanceTransaction.objects.order_by("pk").first().pk}
+        return {param: values[param] for param in params}
+
+    def measure_all(self, user):
+        self.client.force_login(user)
+        # First request stores the approval flag in the session; keep it out of the counts
+        self.client.get(reverse("home"))
+        counts = {}
+        for name, params in iter_named_routes():
+            if name in SKIPPED_ROUTES:
+                continue
+            url = reverse(name, kwargs=self.url_kwargs(name, params))
+            # Budgets are for a cold cache, whatever earlier requests stored
+            cache.clear()
+            BillSnapshot.objects.all().delete()
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertLess(response.status_code, 400, f"{name} ({url}) returned {response.status_code}")
+            counts[name] = len(ctx.captured_queries)
+        return counts
+
+    def test_every_route_has_a_budget(self):
+        names = {name for name, _params in iter_named_routes()} - SKIPPED_ROUTES
+        self.assertEqual(sorted(names - set(QUERY_BUDGETS)), [])
+
+    def test_query_budgets(self):
+        for account_type, user in self.users.items():
+            counts = self.measure_all(user)
+            for name, count in counts.items():
+                with self.subTest(account_type=account_type, view=name):
+                    self.assertLessEqual(count, QUERY_BUDGETS[name])
+
+    def test_query_count_independent_of_row_count(self):
+        user = self.users["admin"]
+        small = self.measure_all(user)
+        seed_dataset(self.scale * self.growth, "b")
+        large = self.measure_all(user)
+        for name in small:
+            with self.subTest(view=name):
+                self.assertEqual(large[name], small[name])
+
+
+class SyntheticDataTests(TestCase):
+    def test_seed(self):
+        ids = synthetic.seed(customers=3, products=4, orders=30, transactions=5, days=30, prefix="t", seed_value=1, batch_size=7)
+        self.assertEqual((len(ids["customers"]), len(ids["products"])), (3, 4))
+        self.assertEqual(Order.objects.count(), 30)
+        self.assertLessEqual(set(Order.objects.values_list("status", flat=True)), set(synthetic.STATUS_WEIGHTS))
+        # Timestamps are spread over the window, not "now"
+        self.assertGreater(Order.objects.values("created_at").distinct().count(), 1)
+        self.assertGreater(Customer.objects.values("created_at").distinct().count(), 1)
+        # ...without switching auto_now off for everyone else
+        self.assertTrue(Order._meta.get_field("updated_at").auto_now)
+        self.assertTrue(Order._meta.get_field("created_at").auto_now_add)
+
+    def test_status_weights_follow_order_choices(self):
+        self.assertEqual(list(synthetic.STATUS_WEIGHTS), [code for code, _label in Order.STATUS_CHOICES])
+
+    def test_bench_views_needs_an_iteration(self):
+        from django.core.management import CommandError, call_command
+
+        with self.assertRaises(CommandError):
+            call_command("bench_views", iterations=0)
+
+
+def reference_smart_vnd(value):
+    # The filter as it was before the fast path
+    try:
+        n = float(value)
+    except (TypeError, ValueError):
+        return value
+    sign = "-" if n < 0 else ""
+    return f"{sign}{intcomma(int(round(abs(n), 0)))}đ"
+
+
+class NumberFormatTests(SimpleTestCase):
+    """number_extras output stays byte-for-byte what the intcomma-based filters produced."""
+
+    GOLDEN_VND = [
+        (0, "0đ"),
+        (5, "5đ"),
+        (999, "999đ"),
+        (1000, "1,000đ"),
+        (1234567, "1,234,567đ"),
+        (-1234567, "-1,234,567đ"),
+        (10**12, "1,000,000,000,000đ"),
+        (0.5, "0đ"),
+        (1.5, "2đ"),
+        (2.5, "2đ"),
+        (-2.5, "-2đ"),
+        (-0.4, "-0đ"),
+        (1234.49, "1,234đ"),
+        (Decimal("0"), "0đ"),
+        (Decimal("150000.00"), "150,000đ"),
+        (Decimal("2.5"), "2đ"),
+        (Decimal("3.5"), "4đ"),
+        (Decimal("-1999999.50"), "-2,000,000đ"),
+        (Decimal("-0.40"), "-0đ"),
+        ("250000", "250,000đ"),
+        ("-1e3", "-1,000đ"),
+        (True, "1đ"),
+    ]
+
+    def test_smart_vnd_golden(self):
+        for value, expected in self.GOLDEN_VND:
+            with self.subTest(value=value):
+                self.assertEqual(smart_vnd(value), expected)
+                self.assertEqual(reference_smart_vnd(value), expected)
+
+    def test_smart_vnd_matches_reference(self):
+        values = [n * 7919 + half for n in range(-300, 300) for half in (0, 0.5)]
+        values += [Decimal(n) / 4 for n in range(-2000, 2000, 3)]
+        values += [10**k - 1 for k in range(1, 16)] + [-(10**k) for k in range(1, 16)]
+        for value in values:
+            self.assertEqual(smart_vnd(value), reference_smart_vnd(value), value)
+
+    def test_smart_vnd_passes_through_non_numbers(self):
+        marker = object()
+        for value in (None, "", "abc", marker, Decimal("sNaN")):
+            with self.subTest(value=value):
+                self.assertIs(smart_vnd(value), value)
+
+    def test_smart_vnd_is_safe_in_templates(self):
+        html = Template("{% load number_extras %}{{ v|smart_vnd }}").render(Context({"v": Decimal("-1500.5")}))
+        self.assertEqual(html, "-1,500đ")
+
+    def test_follows_locale(self):
+        # intcomma groups per locale (Vietnamese formats don't group at all)
+        with self.settings(LANGUAGE_CODE="vi"):
+            self.assertEqual(smart_vnd(1234567), reference_smart_vnd(1234567))
+            self.assertEqual(smart_compact(12345), intcomma(12345))
+        with self.settings(LANGUAGE_CODE="de"):
+            self.assertEqual(smart_vnd(1234567), "1.234.567đ")
+        middleware = [*settings.MIDDLEWARE, "django.middleware.locale.LocaleMiddleware"]
+        with self.settings(MIDDLEWARE=middleware), translation.override("de"):
+            self.assertEqual(smart_vnd(1234567), "1.234.567đ")
+        self.assertEqual(smart_vnd(1234567), "1,234,567đ")
+
+    def test_smart_compact_golden(self):
+        cases = [
+            (999, "999"),
+            (-2.5, "-2"),
+            (-0.4, "0"),
+            (Decimal("999999.5"), "1,000,000"),
+            (123456, "123,456"),
+            (1_000_000, "1M"),
+            (1_250_000, "1.2M"),
+            (Decimal("-2500000000"), "-2.5B"),
+            ("abc", "abc"),
+        ]
+        for value, expected in cases:
+            with self.subTest(value=value):
+                self.assertEqual(smart_compact(value), expected)
+        self.assertEqual(smart_compact(1_234_567, 2), "1.23M")
+
+    def test_sum_attr(self):
+        class Row:
+            def __init__(self, amount):
+                self.amount = amount
+
+        rows = [Row(10), Row(Decimal("2.9")), Row(None), Row("7"), Row("1.5"), Row("x"), {"amount": 100}, {}]
+        self.assertEqual(sum_attr(rows, "amount"), 120)
+        self.assertEqual(sum_attr(None, "amount"), 0)
+        self.assertEqual(sum_attr(5, "amount"), 0)
+
+
+class PerfInstrumentationTests(TestCase):
+    """core.perf: template time for any render path, cache hits from the caches that report them."""
+
+    def test_function_view_template_time(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        def view(request):
+            # Plain render as function views do; the include is not counted twice
+            html = Template("{% for i in items %}{% include 'assets_head.html' %}{% endfor %}").render(
+                Context({"items": range(50)})
+            )
+            return HttpResponse(html)
+
+        with perf.collect() as outer:
+            response = PerformanceMiddleware(view)(RequestFactory().get("/"))
+        timing = dict(part.split(";", 1) for part in response["Server-Timing"].split(", "))
+        self.assertGreater(float(timing["tpl"].split("=")[1]), 0)
+        self.assertGreater(outer.template_time, 0)
+        self.assertLessEqual(outer.template_time, outer.total_time)
+
+    def test_row_cache_hits_and_misses(self):
+        product = Product.objects.create(name="P", price=1)
+        template = Template("{% load row_cache %}{% cacherow product %}<tr>{{ product.name }}</tr>{% endcacherow %}")
+        cache.clear()
+        with self.settings(ROW_CACHE_ENABLED=True), perf.collect() as metrics:
+            for _ in range(3):
+                template.render(Context({"product": product}))
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (2, 1))
+        self.assertEqual(metrics.as_dict()["cache_hits"], 2)
+
+
+class ProfilerMiddlewareTests(TestCase):
+    def setUp(self):
+        from django.test import RequestFactory
+
+        self.factory = RequestFactory()
+        self.staff = User.objects.create_user(username="staff", password="x", is_staff=True, is_approved=True)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def profile(self, query, keep=50):
+        from django.http import HttpResponse
+
+        request = self.factory.get("/trang", query)
+        request.user = self.staff
+        with self.settings(PROFILER_OUTPUT_DIR=self.tmp.name, PROFILER_KEEP=keep):
+            middleware = ProfilerMiddleware(lambda request: HttpResponse("ok"))
+        return middleware(request)
+
+    def test_unknown_sort_falls_back(self):
+        response = self.profile({"__profile": "1", "__profile_sort": "no-such-key"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Ordered by: cumulative time", response.content.decode())
+        response = self.profile({"__profile": "1", "__profile_sort": "calls"})
+        self.assertIn("Ordered by: call count", response.content.decode())
+
+    def test_keeps_newest_profiles(self):
+        for name in ("20000101-000000-000-a", "20000101-000000-001-b"):
+            for ext in (".prof", ".txt", ".sql.txt"):
+                open(os.path.join(self.tmp.name, name + ext), "w").close()
+        response = self.profile({"__profile": "save"}, keep=2)
+        names = sorted(os.listdir(self.tmp.name))
+        self.assertEqual({name.split(".", 1)[0] for name in names},
+                         {"20000101-000000-001-b", response["X-Profile-File"]})
+        self.assertEqual(len(names), 6)
+
+
+class MetricsFileTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, stem, pid, value):
+        metrics._write(Path(self.tmp.name) / f"{stem}.json", {
+            "pid": pid, "counters": [["navybaby_orders_created_total", [], value]], "histograms": [],
+        })
+
+    def total(self):
+        with self.settings(METRICS_DIR=self.tmp.name):
+            counters, _histograms, workers = metrics.collect()
+        return counters.get(("navybaby_orders_created_total", ()), 0), len(workers)
+
+    def test_file_keyed_by_pid_and_start(self):
+        with self.settings(METRICS_DIR=self.tmp.name):
+            metrics.flush(force=True)
+        stem = metrics.file_stem()
+        self.assertTrue(stem.startswith(f"{os.getpid()}-"))
+        self.assertEqual(os.listdir(self.tmp.name), [f"{stem}.json"])
+
+    def test_retired_workers_keep_counting(self):
+        # Two generations of the same PID, plus a live worker
+        self.write("999999999-1", 999999999, 3)
+        self.write("999999999-2", 999999999, 4)
+        self.write(f"{os.getpid()}-1", os.getpid(), 5)
+        self.assertEqual(self.total(), (12, 1))
+
+        metrics.retire([999999999], directory=self.tmp.name)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), [f"{os.getpid()}-1.json", metrics.RETIRED])
+        self.assertEqual(self.total(), (12, 1))
+
+        # Sweep of everything not running: the live worker stays
+        self.write("999999999-3", 999999999, 1)
+        metrics.retire(directory=self.tmp.name)
+        self.assertEqual(self.total(), (13, 1))
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_ASYNC=False, SLOW_QUERY_MAX_PER_REQUEST=2)
+class SlowQueryCaptureTests(TestCase):
+    def run_view(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        def view(request):
+            # Three statements with different fingerprints
+            Customer.objects.count()
+            list(Product.objects.filter(name="x"))
+            Order.objects.exists()
+            return HttpResponse("ok")
+
+        SlowQueryMiddleware(view)(RequestFactory().get("/khong-co"))
+
+    def test_keeps_slowest_per_request(self):
+        self.run_view()
+        rows = list(SlowQuery.objects.all())
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertEqual((row.count, row.last_view), (1, "<unresolved>"))
+            self.assertTrue(row.plan)
+        self.run_view()
+        self.assertEqual(sum(SlowQuery.objects.values_list("count", flat=True)), 4)
+
+    def test_fingerprint_ignores_values(self):
+        from . import slow_queries
+
+        first = slow_queries.normalize("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'An'")
+        second = slow_queries.normalize("SELECT *  FROM t WHERE id IN (%s, %s) AND name = %s")
+        self.assertEqual(first, "SELECT * FROM t WHERE id IN (...) AND name = ?")
+        self.assertEqual(slow_queries.fingerprint(first), slow_queries.fingerprint(second))
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        from unittest import mock
+
+        db_routing._health.update(checked=0.0, ok=True)
+        self.addCleanup(db_routing._health.update, checked=0.0, ok=True)
+        for name, value in (("replica_configured", mock.Mock(return_value=True)),
+                            ("connections", {"replica": mock.Mock()})):
+            patcher = mock.patch.object(db_routing, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.router = db_routing.ReplicaRouter()
+
+    def lag(self, **kwargs):
+        from unittest import mock
+
+        return mock.patch.object(db_routing, "_replica_lag_seconds", **kwargs)
+
+    def read_db(self, request=None):
+        with db_routing.use_replica(request):
+            return self.router.db_for_read(Order)
+
+    def test_healthy_replica_serves_reads(self):
+        with self.lag(return_value=0) as lag:
+            self.assertEqual(self.read_db(), "replica")
+            self.assertEqual(self.read_db(), "replica")
+        # Checked once per interval
+        self.assertEqual(lag.call_count, 1)
+        self.assertEqual(self.router.db_for_write(Order), "default")
+        self.assertIsNone(self.router.db_for_read(Order))
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        from django.db import OperationalError
+
+        with self.lag(side_effect=OperationalError("down")), self.assertLogs("core.db_routing", "WARNING"):
+            self.assertIsNone(self.read_db())
+        # Still on the primary until the next check
+        with self.lag(return_value=0) as lag:
+            self.assertIsNone(self.read_db())
+        lag.assert_not_called()
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with self.settings(REPLICA_MAX_LAG_SECONDS=30), self.lag(return_value=120), \
+                self.assertLogs("core.db_routing", "WARNING"):
+            self.assertIsNone(self.read_db())
+
+    def test_recent_write_pins_session_to_primary(self):
+        from django.test import RequestFactory
+
+        request = RequestFactory().get("/")
+        request.session = {}
+        db_routing.pin_to_primary(request)
+        with self.lag(return_value=0):
+            self.assertIsNone(self.read_db(request))
+
+
+class AsyncDashboardTests(TransactionTestCase):
+    # Worker threads use their own connections, so the data must be committed
+
+    def setUp(self):
+        seed_dataset(1, "a")
+        self.user = User.objects.create_user(username="u", password="x", is_approved=True)
+        cache.clear()
+
+    def render_context(self, view):
+        from asgiref.sync import async_to_sync
+        from django.test import RequestFactory
+        from django.test.signals import template_rendered
+
+        request = RequestFactory().get("/", {"start_date": "2020-01-01", "end_date": "2030-12-31"})
+        request.user = self.user
+        request.session = {}
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        contexts = []
+
+        def store(sender, template, context, **kwargs):
+            if template.name == HomePageView.template_name:
+                contexts.append(context.flatten())
+
+        template_rendered.connect(store)
+        try:
+            with perf.collect() as measured:
+                if view is home_async:
+                    async_to_sync(home_async)(request)
+                else:
+                    view(request).render()
+        finally:
+            template_rendered.disconnect(store)
+        return contexts[0], measured
+
+    def test_same_context_as_sync_view(self):
+        sync_context, sync_measured = self.render_context(HomePageView.as_view())
+        async_context, async_measured = self.render_context(home_async)
+        dashboard_keys = set(sync_context) - {"view", "csrf_token", "request", "user", "perms", "messages"}
+        self.assertIn("top_products_chart", dashboard_keys)
+        for key in sorted(dashboard_keys):
+            with self.subTest(key=key):
+                self.assertEqual(async_context[key], sync_context[key])
+        # Queries of the worker threads are counted too
+        self.assertEqual(async_measured.sql_count, sync_measured.sql_count)
+
+
+class FakeCloudinaryImage:
+    public_id = "products/ao"
+    version = 1
+    format = "jpg"
+    type = "upload"
+    resource_type = "image"
+
+    def __bool__(self):
+        return True
+
+    @property
+    def url(self):
+        return "https://cdn.test/products/ao.jpg"
+
+    def build_url(self, width, height, **options):
+        return f"https://cdn.test/w_{width},h_{height},c_{options['crop']}/products/ao.jpg"
+
+
+@override_settings(USE_CLOUDINARY=True)
+class ThumbnailTagTests(SimpleTestCase):
+    def setUp(self):
+        media_extras.clear_url_memo()
+        self.addCleanup(media_extras.clear_url_memo)
+
+    def render(self, source, image):
+        return Template("{% load media_extras %}" + source).render(Context({"image": image}))
+
+    def test_cloudinary_variants(self):
+        html = self.render('{% thumbnail image 64 alt="Áo <1>" class="w-16" %}', FakeCloudinaryImage())
+        self.assertHTMLEqual(html, (
+            '<img src="https://cdn.test/w_64,h_64,c_fill/products/ao.jpg"'
+            ' srcset="https://cdn.test/w_64,h_64,c_fill/products/ao.jpg 1x,'
+            ' https://cdn.test/w_128,h_128,c_fill/products/ao.jpg 2x"'
+            ' width="64" height="64" alt="Áo &lt;1&gt;" class="w-16" decoding="async" loading="lazy">'
+        ))
+        self.assertEqual(
+            self.render("{{ image|thumbnail_url:'120x80' }}", FakeCloudinaryImage()),
+            "https://cdn.test/w_120,h_80,c_fill/products/ao.jpg",
+        )
+
+    def test_no_image(self):
+        self.assertEqual(self.render("{% thumbnail image 64 %}|{{ image|thumbnail_url:64 }}", None), "|")
+
+
+class ImageUrlMemoTests(TestCase):
+    def setUp(self):
+        media_extras.clear_url_memo()
+        self.addCleanup(media_extras.clear_url_memo)
+
+    def test_lru(self):
+        from unittest import mock
+
+        calls = []
+
+        def compute(name):
+            calls.append(name)
+            return f"/m/{name}"
+
+        with mock.patch.object(media_extras, "URL_MEMO_SIZE", 2):
+            for name in ("a", "b", "a", "c", "a", "b"):
+                self.assertEqual(media_extras._memoized("url", name, lambda: compute(name)), f"/m/{name}")
+        # "a" stays as the most recently used; "b" was evicted by "c"
+        self.assertEqual(calls, ["a", "b", "c", "b"])
+        self.assertEqual(list(media_extras._url_memo), [("url", "name", "a"), ("url", "name", "b")])
+
+    def test_local_thumbnail_built_in_background(self):
+        from jobs import queue
+        from jobs.models import Job
+        from PIL import Image
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        os.makedirs(os.path.join(media.name, "products"))
+        Image.new("RGB", (300, 200), "blue").save(os.path.join(media.name, "products", "a.jpg"))
+        template = Template("{% load media_extras %}{% thumbnail image 32 %}")
+
+        with self.settings(MEDIA_ROOT=media.name, MEDIA_URL="/media/", USE_CLOUDINARY=False):
+            # Original while the thumbnails are queued (once)
+            for _ in range(2):
+                html = template.render(Context({"image": "products/a.jpg"}))
+                self.assertHTMLEqual(html, '<img src="/media/products/a.jpg" width="32" height="32" alt=""'
+                                           ' decoding="async" loading="lazy">')
+            self.assertEqual(
+                sorted((job.args["width"], job.args["height"]) for job in Job.objects.filter(name="core.build_thumbnail")),
+                [(32, 32), (64, 64)],
+            )
+            while (job := queue.claim("w1")) is not None:
+                self.assertTrue(queue.run(job))
+
+            html = template.render(Context({"image": "products/a.jpg"}))
+            self.assertInHTML('<img src="/media/thumbs/32x32/products/a.jpg" srcset="/media/thumbs/32x32/products/a.jpg 1x,'
+                              ' /media/thumbs/64x64/products/a.jpg 2x" width="32" height="32" alt=""'
+                              ' decoding="async" loading="lazy">', html)
+            with Image.open(os.path.join(media.name, "thumbs", "64x64", "products", "a.jpg")) as thumb:
+                self.assertEqual(thumb.size, (64, 64))
+
+
+class TailwindContentTests(SimpleTestCase):
+    def test_python_class_sources_are_scanned(self):
+        import glob
+        import re
+
+        config = (settings.BASE_DIR / "tailwind.config.js").read_text(encoding="utf-8")
+        content = re.search(r"content:\s*\[(.*?)\]", config, re.S).group(1)
+        scanned = set()
+        for pattern in re.findall(r"'([^']+)'", content):
+            scanned.update(os.path.normpath(path) for path in glob.glob(str(settings.BASE_DIR / pattern), recursive=True))
+        # Status badges are built in Python, not in templates
+        self.assertIn(os.path.normpath(settings.BASE_DIR / "orders" / "models.py"), scanned)
+        self.assertIn(os.path.normpath(settings.BASE_DIR / "orders" / "views.py"), scanned)
+
+
+class StaticStorageTests(SimpleTestCase):
+    def test_minified_before_hashing(self):
+        import hashlib
+        import json
+
+        from django.contrib.staticfiles import finders
+        from django.core.management import call_command
+
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(source.name, "js"))
+        with open(os.path.join(source.name, "js", "app.js"), "w") as fh:
+            fh.write("function  add ( a , b ) {\n    // cộng\n    return a + b ;\n}\n")
+        with open(os.path.join(source.name, "site.css"), "w") as fh:
+            fh.write("body {\n    color : red ;\n}\n")
+
+        storages = {**settings.STORAGES, "staticfiles": {"BACKEND": "core.storage.StaticStorage"}}
+        with self.settings(STATICFILES_DIRS=[source.name], STATIC_ROOT=root.name, STORAGES=storages,
+                           STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"]):
+            finders.get_finder.cache_clear()
+            self.addCleanup(finders.get_finder.cache_clear)
+            call_command("collectstatic", interactive=False, verbosity=0)
+
+        manifest = json.loads(open(os.path.join(root.name, "staticfiles.json")).read())["paths"]
+        for name, minified in (("js/app.js", "function add(a,b){return a+b;}"), ("site.css", "body{color:red}")):
+            with self.subTest(name=name):
+                hashed = manifest[name]
+                with open(os.path.join(root.name, hashed), encoding="utf-8") as fh:
+                    self.assertEqual(fh.read(), minified)
+                # The hash is of the minified content
+                digest = hashlib.md5(minified.encode()).hexdigest()[:12]
+                self.assertIn(f".{digest}.", hashed)
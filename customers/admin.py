@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Customer, QRCode
+from .models import BillSnapshot, Customer, QRCode
 
 
 @admin.register(Customer)
@@ -13,3 +13,11 @@ class CustomerAdmin(admin.ModelAdmin):
 class QRCodeAdmin(admin.ModelAdmin):
     list_display = ("id", "name", "file", "created_at")
     search_fields = ("name", "file")
+
+
+@admin.register(BillSnapshot)
+class BillSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "customer", "digest", "created_at")
+    search_fields = ("customer__code", "customer__name", "digest")
+    list_select_related = ("customer",)
+    readonly_fields = ("customer", "digest", "source_key", "data", "html", "created_at")
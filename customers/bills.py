@@ -0,0 +1,247 @@
+"""
+Bill snapshots: a customer's bill frozen as data + HTML, shared by signed URL.
+
+``CustomerBillView`` asks ``current_snapshot`` for the bill of the request's
+filters. A ``source_key`` over cheap aggregates (order and transaction counts
+and last ``updated_at``, the products' last edit, the customer row, the query
+and bank settings) finds the snapshot built from the same state without
+recomputing the bill; only when it changed is the bill built again, and a
+bill whose content is unchanged still maps to the same ``digest`` (hash of the
+content) and so to the same snapshot.
+
+``/hoa-don/<token>`` serves the stored HTML, ``/hoa-don/<token>/png`` and
+``/pdf`` a Pillow rendering written once to ``BILL_SNAPSHOT_DIR``. Tokens are
+the digest signed with SECRET_KEY and a timestamp, and stop working after
+``BILL_SHARE_DAYS``. What they point at never changes, so browsers may keep it
+for that long; shared caches may not (``Cache-Control: private``).
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.context_processors import assets
+from core.templatetags.number_extras import smart_vnd
+from finance.models import FinanceTransaction
+from orders.models import Order
+
+from . import payment_qr
+from .models import BillSnapshot
+
+# Bump when the snapshot data or templates change so old states rebuild
+FORMAT_VERSION = 1
+SIGNER_SALT = "customers.bill"
+IMAGE_FORMATS = ("png", "pdf")
+
+# Query parameters that change what the bill shows
+BILL_PARAMS = ("status", "supplier", "q", "sort", "paid_override", "qr_url", "qr_id")
+
+
+def _hash(value):
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def source_key(customer, params):
+    """Fingerprint of everything the bill of ``customer`` for ``params`` is built from."""
+    orders = Order.objects.filter(customer=customer).aggregate(
+        n=Count("id"), changed=Max("updated_at"), products_changed=Max("product__updated_at"),
+    )
+    payments = FinanceTransaction.objects.filter(customer=customer).aggregate(
+        n=Count("id"), changed=Max("updated_at"),
+    )
+    return _hash([
+        FORMAT_VERSION,
+        customer.pk,
+        customer.updated_at,
+        orders,
+        payments,
+        {name: sorted(params.getlist(name)) for name in BILL_PARAMS if name in params},
+        [getattr(settings, name, "") for name in (
+            "PAYMENT_BANK_BIN", "PAYMENT_BANK_NAME", "PAYMENT_BANK_OWNER",
+            "PAYMENT_BANK_ACCOUNT", "CLOUDINARY_QR_URL",
+        )],
+    ])
+
+
+def current_snapshot(customer, params, build):
+    """
+    The snapshot for the current state; ``build()`` (returning the bill data)
+    is only called when the orders, payments or query changed since the last one.
+    """
+    key = source_key(customer, params)
+    snapshot = BillSnapshot.objects.filter(customer=customer, source_key=key).first()
+    if snapshot is not None:
+        return snapshot
+    data = build()
+    digest = _hash(data)
+    snapshot = BillSnapshot(customer=customer, digest=digest, source_key=key, data=data, created_at=timezone.now())
+    snapshot.html = render_html(snapshot, customer)
+    snapshot, created = BillSnapshot.objects.get_or_create(
+        digest=digest,
+        defaults={field: getattr(snapshot, field) for field in ("customer", "source_key", "data", "html", "created_at")},
+    )
+    if not created and snapshot.source_key != key:
+        # Same content from a newer state (an edit that did not change the bill)
+        BillSnapshot.objects.filter(pk=snapshot.pk).update(source_key=key)
+        snapshot.source_key = key
+    return snapshot
+
+
+def share_max_age():
+    """Lifetime of a share link, in seconds."""
+    return getattr(settings, "BILL_SHARE_DAYS", 30) * 86400
+
+
+def share_token(snapshot):
+    return signing.TimestampSigner(salt=SIGNER_SALT).sign(snapshot.digest)
+
+
+def digest_from_token(token):
+    """The digest a share token was signed for, or None (bad or expired token)."""
+    try:
+        return signing.TimestampSigner(salt=SIGNER_SALT).unsign(token, max_age=share_max_age())
+    except signing.BadSignature:
+        return None
+
+
+def qr_data_uri(payload):
+    # Embedded so the shared page needs nothing behind login
+    png = payment_qr.render(payload, "png")
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def render_html(snapshot, customer):
+    data = snapshot.data
+    qr_src = qr_data_uri(data["qr_payload"]) if data.get("qr_payload") else data.get("qr_url", "")
+    context = {
+        **data,
+        **assets(None),
+        "customer": customer,
+        "created_at": snapshot.created_at,
+        "qr_src": qr_src,
+    }
+    return render_to_string("customers/bill_snapshot.html", context)
+
+
+# --- Image / PDF -----------------------------------------------------------
+
+def file_path(snapshot, fmt):
+    return os.path.join(str(settings.BILL_SNAPSHOT_DIR), f"{snapshot.digest}.{fmt}")
+
+
+def image_file(snapshot, fmt):
+    """Path of the PNG/PDF rendering of ``snapshot``, rendered the first time."""
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"Định dạng bill không hỗ trợ: {fmt}")
+    target = file_path(snapshot, fmt)
+    if not os.path.exists(target):
+        image = render_image(snapshot)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        if fmt == "pdf":
+            image.save(tmp, format="PDF", resolution=150)
+        else:
+            image.save(tmp, format="PNG", optimize=True)
+        os.replace(tmp, target)
+    return target
+
+
+def _font(size, bold=False):
+    from PIL import ImageFont
+
+    path = getattr(settings, "BILL_FONT_BOLD_PATH" if bold else "BILL_FONT_PATH", "")
+    try:
+        return ImageFont.truetype(path, size)
+    except (OSError, ValueError):
+        # Pillow's built-in font has no Vietnamese glyphs beyond Latin-1
+        return ImageFont.load_default(size)
+
+
+def render_image(snapshot):
+    """The bill as a white A5-ish Pillow image: header, order table, totals, bank info and QR."""
+    from PIL import Image, ImageDraw
+
+    data = snapshot.data
+    width, pad, row_h = 1240, 60, 80
+    regular, small, bold, title = _font(28), _font(22), _font(28, True), _font(44, True)
+    columns = [pad, 760, 900, 1240 - pad]  # name | unit price | qty | total (right edges after the first)
+    rows = data["orders"] or [None]
+    height = 230 + row_h * (len(rows) + 1) + 210 + 320 + pad
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    line = (209, 213, 219)
+
+    y = pad
+    draw.text((pad, y), "NavyBaby", font=title, fill="black")
+    y += 60
+    draw.text((pad, y), "Hóa đơn", font=regular, fill="black")
+    y += 50
+    draw.text((pad, y), f"Khách hàng: {data['customer_name']}", font=regular, fill="black")
+    stamp = f"Ngày tạo: {timezone.localtime(snapshot.created_at):%d/%m/%Y %H:%M}"
+    draw.text((width - pad, y), stamp, font=regular, fill="black", anchor="ra")
+    y += 60
+
+    # Table
+    draw.rectangle((pad, y, width - pad, y + row_h), fill=(243, 244, 246))
+    for text, x, anchor in (("Tên sản phẩm", columns[0] + 12, "lm"), ("Đơn giá", columns[1], "rm"),
+                            ("SL", columns[2], "rm"), ("Thành tiền", columns[3] - 12, "rm")):
+        draw.text((x, y + row_h // 2), text, font=bold, fill="black", anchor=anchor)
+    y += row_h
+    for row in rows:
+        if row is None:
+            draw.text((width // 2, y + row_h // 2), "Không có sản phẩm.", font=regular, fill=(75, 85, 99), anchor="mm")
+        else:
+            name = row["product_name"]
+            if row["color"] or row["size"]:
+                name += f" ({row['color'] or '-'} / {row['size'] or '-'})"
+            draw.text((columns[0] + 12, y + 8), _clip(draw, name, regular, columns[1] - 200 - columns[0]),
+                      font=regular, fill="black")
+            draw.text((columns[0] + 12, y + row_h - 6), f"Mã ĐH: {row['code']}", font=small,
+                      fill=(75, 85, 99), anchor="ld")
+            draw.text((columns[1], y + row_h // 2), smart_vnd(row["unit_price"]), font=regular, fill="black", anchor="rm")
+            draw.text((columns[2], y + row_h // 2), str(row["amount"]), font=regular, fill="black", anchor="rm")
+            draw.text((columns[3] - 12, y + row_h // 2), smart_vnd(row["total"]), font=bold, fill="black", anchor="rm")
+        y += row_h
+        draw.line((pad, y, width - pad, y), fill=line, width=1)
+    draw.rectangle((pad, y - row_h * (len(rows) + 1), width - pad, y), outline=line, width=2)
+    y += 30
+
+    # Totals
+    for label, value in (("Tổng tiền hàng", data["total_goods"]), ("Đã thanh toán", data["paid_amount"]),
+                         ("Tiền hàng còn lại", data["remaining_amount"])):
+        draw.text((width // 2, y), label, font=regular, fill="black")
+        draw.text((width - pad, y), smart_vnd(value), font=bold, fill="black", anchor="ra")
+        y += 50
+    y += 30
+
+    # Bank info + QR
+    box_top = y
+    draw.text((pad + 24, y + 24), "THÔNG TIN CHUYỂN KHOẢN", font=bold, fill="black")
+    y += 80
+    for text in (f"Ngân hàng {data['bank_name']}", f"Chủ TK: {data['bank_owner']}", f"STK: {data['bank_account']}",
+                 f"Nội dung chuyển khoản: {data['customer_name']}",
+                 f"Số tiền: {smart_vnd(data['remaining_amount'])}"):
+        draw.text((pad + 24, y), text, font=regular, fill="black")
+        y += 44
+    if data.get("qr_payload"):
+        qr = Image.open(io.BytesIO(payment_qr.render(data["qr_payload"], "png"))).convert("RGB")
+        qr = qr.resize((280, 280), Image.NEAREST)
+        image.paste(qr, (width - pad - 24 - 280, box_top + 20))
+    draw.rectangle((pad, box_top, width - pad, box_top + 320), outline=line, width=2)
+    return image
+
+
+def _clip(draw, text, font, max_width):
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
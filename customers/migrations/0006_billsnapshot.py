@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_alter_qrcode_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('source_key', models.CharField(db_index=True, max_length=64)),
+                ('data', models.JSONField()),
+                ('html', models.TextField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bill_snapshots', to='customers.customer')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
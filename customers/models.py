@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 from core.utils import generate_code
 
@@ -37,3 +38,24 @@ class QRCode(models.Model):
             return self.file.url
         except Exception:
             return ''
+
+
+class BillSnapshot(models.Model):
+    """
+    Bill đã chốt (customers/bills.py): dữ liệu, tổng tiền và QR tại một thời
+    điểm, cùng HTML đã render. ``digest`` là hash của nội dung nên không bao
+    giờ đổi; ``source_key`` ghi lại trạng thái đơn hàng/thanh toán đã sinh ra
+    nó để lần mở sau dùng lại mà không tính lại.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='bill_snapshots')
+    digest = models.CharField(max_length=64, unique=True)
+    source_key = models.CharField(max_length=64, db_index=True)
+    data = models.JSONField()
+    html = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Bill {self.customer_id} {self.digest[:12]}"
@@ -0,0 +1,119 @@
+"""
+VietQR payment codes for customer bills, generated in-process.
+
+``vietqr_payload`` builds the EMVCo merchant-presented payload that Vietnamese
+banking apps read (NAPAS 247 transfer to an account: bank BIN, account number,
+optional amount, transfer note, CRC16). ``qr_file`` renders it with ``segno``
+to PNG or SVG under ``PAYMENT_QR_DIR``, named by a hash of the payload, so a
+bill for the same amount and note reuses the file and a wiped disk is simply
+refilled on the next render. Files are served by ``customers:payment_qr``.
+"""
+import hashlib
+import io
+import os
+import re
+import unicodedata
+
+import segno
+from django.conf import settings
+
+FORMATS = ("png", "svg")
+NAME_RE = re.compile(r"^[0-9a-f]{32}\.(png|svg)$")
+
+# NAPAS VietQR: GUID, service code for transfers to an account
+NAPAS_GUID = "A000000727"
+SERVICE_TO_ACCOUNT = "QRIBFTTA"
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), as EMVCo tag 63 requires."""
+    crc = 0xFFFF
+    for byte in data.encode():
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return crc
+
+
+def _tlv(tag, value):
+    if len(value) > 99:
+        raise ValueError(f"Trường {tag} của mã QR quá dài ({len(value)} ký tự).")
+    return f"{tag}{len(value):02d}{value}"
+
+
+def _ascii(text, limit):
+    # Bank apps only carry unaccented ASCII in the transfer note
+    text = unicodedata.normalize("NFD", str(text).replace("đ", "d").replace("Đ", "D"))
+    text = "".join(ch for ch in text if ch.isascii() and (ch.isalnum() or ch in " -._"))
+    return " ".join(text.split())[:limit]
+
+
+def vietqr_payload(bank_bin, account, amount=None, note=""):
+    """
+    EMVCo payload for a transfer of ``amount`` VND (dynamic QR) or of any
+    amount the payer types in (static QR, ``amount`` empty or not positive).
+    """
+    account = re.sub(r"\s+", "", str(account))
+    beneficiary = _tlv("00", str(bank_bin)) + _tlv("01", account)
+    merchant = _tlv("00", NAPAS_GUID) + _tlv("01", beneficiary) + _tlv("02", SERVICE_TO_ACCOUNT)
+    amount = int(amount or 0)
+    parts = [
+        _tlv("00", "01"),
+        _tlv("01", "12" if amount > 0 else "11"),
+        _tlv("38", merchant),
+        _tlv("53", "704"),  # VND
+    ]
+    if amount > 0:
+        parts.append(_tlv("54", str(amount)))
+    parts.append(_tlv("58", "VN"))
+    note = _ascii(note, 50)
+    if note:
+        parts.append(_tlv("62", _tlv("08", note)))
+    body = "".join(parts) + "6304"
+    return f"{body}{crc16(body):04X}"
+
+
+def bill_payload(amount, note):
+    """Payload for the shop's account from the PAYMENT_BANK_* settings."""
+    return vietqr_payload(
+        getattr(settings, "PAYMENT_BANK_BIN", ""),
+        getattr(settings, "PAYMENT_BANK_ACCOUNT", ""),
+        amount,
+        note,
+    )
+
+
+def file_name(payload, fmt="png"):
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:32]
+    return f"{digest}.{fmt}"
+
+
+def file_path(name):
+    return os.path.join(str(settings.PAYMENT_QR_DIR), name)
+
+
+def render(payload, fmt="png"):
+    """QR image bytes for ``payload`` (error correction M, 4-module quiet zone)."""
+    qr = segno.make(payload, error="m", micro=False)
+    out = io.BytesIO()
+    if fmt == "svg":
+        qr.save(out, kind="svg", scale=8, border=4, xmldecl=False)
+    else:
+        qr.save(out, kind="png", scale=8, border=4)
+    return out.getvalue()
+
+
+def qr_file(payload, fmt="png"):
+    """Name of the cached image for ``payload``, rendering it the first time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Định dạng QR không hỗ trợ: {fmt}")
+    name = file_name(payload, fmt)
+    target = file_path(name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(render(payload, fmt))
+        os.replace(tmp, target)
+    return name
@@ -1,3 +1,138 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from finance.models import FinanceCategory, FinanceTransaction
+from orders.models import Order
+from products.models import Product
+
+from . import bills, payment_qr
+from .models import BillSnapshot, Customer
+
+
+class PaymentQrTests(TestCase):
+    """Bills carry a VietQR generated and served locally."""
+
+    def test_payload(self):
+        self.assertEqual(payment_qr.crc16("123456789"), 0x29B1)
+        payload = payment_qr.vietqr_payload("970423", "8937 2282 552", 150000, "KH-0001 Đơn")
+        self.assertTrue(payload.startswith("000201010212"))
+        self.assertIn("38550010A000000727" "01250006970423011189372282552" "0208QRIBFTTA", payload)
+        self.assertIn("5303704" "5406150000" "5802VN" "62150811KH-0001 Don", payload)
+        self.assertEqual(payload[-8:-4], "6304")
+        self.assertEqual(int(payload[-4:], 16), payment_qr.crc16(payload[:-4]))
+        # No amount: static QR the payer fills in
+        static = payment_qr.vietqr_payload("970423", "123", 0)
+        self.assertIn("010211", static)
+        self.assertNotIn("5406", static)
+
+    def test_bill_uses_local_file(self):
+        user = User.objects.create_user(
+            username="admin", password="x", account_type="admin", is_approved=True, is_staff=True
+        )
+        customer = Customer.objects.create(code="KH-QR-001", name="Khách")
+        self.client.force_login(user)
+        with tempfile.TemporaryDirectory() as tmp, self.settings(PAYMENT_QR_DIR=tmp):
+            url = reverse("customers:customer_bill", kwargs={"code": customer.code})
+            qr_url = self.client.get(url).context["qr_url"]
+            self.assertTrue(qr_url.startswith("/khach-hang/qr/"), qr_url)
+            self.assertEqual(self.client.get(url).context["qr_url"], qr_url)
+            response = self.client.get(qr_url)
+            self.assertEqual(response["Content-Type"], "image/png")
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"\x89PNG"))
+            response.close()
+            self.assertEqual(self.client.get("/khach-hang/qr/" + "0" * 32 + ".png").status_code, 404)
+            self.assertEqual(self.client.get("/khach-hang/qr/..%2Fx.png").status_code, 404)
+
+
+class BillSnapshotTests(TestCase):
+    """Bills are frozen into snapshots, reused until orders/payments change, shared by signed URL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="admin", password="x", account_type="admin", is_approved=True, is_staff=True
+        )
+        cls.customer = Customer.objects.create(code="KH-BILL-001", name="Chị Lan")
+        cls.product = Product.objects.create(code="SP-BILL", name="Áo len", price=200000)
+        cls.deposit = FinanceCategory.objects.create(name="KH đặt cọc tiền hàng", type="INCOME")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = self.settings(PAYMENT_QR_DIR=f"{tmp.name}/qr", BILL_SNAPSHOT_DIR=f"{tmp.name}/bills")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.user)
+        self.url = reverse("customers:customer_bill", kwargs={"code": self.customer.code})
+        Order.objects.create(customer=self.customer, product=self.product, amount=2, sale_price=200000, discount=0)
+
+    def open_bill(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        return response.context, len(ctx.captured_queries)
+
+    def test_reused_until_orders_or_payments_change(self):
+        self.client.get(reverse("home"))  # session write stays out of the counts
+        first, cold = self.open_bill()
+        self.assertEqual(first["total_goods"], 400000)
+        again, warm = self.open_bill()
+        self.assertEqual(again["snapshot"].pk, first["snapshot"].pk)
+        self.assertEqual(warm, 6)
+        self.assertLess(warm, cold)
+
+        FinanceTransaction.objects.create(category=self.deposit, amount=150000, customer=self.customer)
+        paid, _ = self.open_bill()
+        self.assertNotEqual(paid["snapshot"].digest, first["snapshot"].digest)
+        self.assertEqual((paid["paid_amount"], paid["remaining_amount"]), (150000, 250000))
+
+        Order.objects.create(customer=self.customer, product=self.product, amount=1, sale_price=100000, discount=0)
+        more, _ = self.open_bill()
+        self.assertEqual(len(more["orders"]), 2)
+        self.assertNotEqual(more["share_url"], paid["share_url"])
+
+        # A write that leaves the content as it was keeps the snapshot (and its links)
+        self.customer.save()
+        same, _ = self.open_bill()
+        self.assertEqual(same["snapshot"].pk, more["snapshot"].pk)
+        self.assertEqual(BillSnapshot.objects.count(), 3)
+
+    def test_shared_links(self):
+        context, _ = self.open_bill()
+        share_url = context["share_url"]
+        self.client.logout()
+
+        response = self.client.get(share_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Chị Lan")
+        self.assertContains(response, "data:image/png;base64,")  # QR embedded, no login needed
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+        self.assertEqual(self.client.get(share_url, headers={"if-none-match": response["ETag"]}).status_code, 304)
+
+        for fmt, magic in (("png", b"\x89PNG"), ("pdf", b"%PDF")):
+            response = self.client.get(f"{share_url}/{fmt}")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b"".join(response.streaming_content).startswith(magic))
+            response.close()
+        self.assertTrue(os.path.exists(bills.file_path(context["snapshot"], "png")))
+
+        self.assertEqual(self.client.get(share_url[:-2] + "xx").status_code, 404)
+        self.assertEqual(self.client.get(f"{share_url}/gif").status_code, 404)
 
-# Create your tests here.
+    def test_shared_links_expire(self):
+        with self.settings(BILL_SHARE_DAYS=7):
+            share_url = self.open_bill()[0]["share_url"]
+            self.assertEqual(self.client.get(share_url).status_code, 200)
+            later = time.time() + 8 * 86400
+            with mock.patch("django.core.signing.time.time", return_value=later):
+                self.assertEqual(self.client.get(share_url).status_code, 404)
+                self.assertEqual(self.client.get(f"{share_url}/pdf").status_code, 404)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import CustomerListView, CustomerCreateView, CustomerDetailView, CustomerUpdateView, DeleteCustomerView, CustomerBillView, CustomerReportView
+from .views import CustomerListView, CustomerCreateView, CustomerDetailView, CustomerUpdateView, DeleteCustomerView, CustomerBillView, CustomerReportView, payment_qr_image, bill_share, bill_share_file
 
 app_name = 'customers'
 
@@ -9,6 +9,9 @@ urlpatterns = [
     path('khach-hang/<slug:code>', CustomerDetailView.as_view(), name='customer_detail'),
     path('khach-hang/<slug:code>/bao-cao', CustomerReportView.as_view(), name='customer_report'),
     path('khach-hang/<slug:code>/bill', CustomerBillView.as_view(), name='customer_bill'),
+    path('khach-hang/qr/<str:name>', payment_qr_image, name='payment_qr'),
+    path('hoa-don/<str:token>', bill_share, name='bill_share'),
+    path('hoa-don/<str:token>/<str:fmt>', bill_share_file, name='bill_share_file'),
     path('khach-hang/<slug:code>/chinh-sua', CustomerUpdateView.as_view(), name='customer_update'),
     path('khach-hang/<slug:code>/xoa', DeleteCustomerView.as_view(), name='customer_delete'),
 ]
@@ -1,18 +1,30 @@
 from decimal import Decimal
 import json
+import logging
 
 from django.views.generic import ListView, CreateView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
-from .models import Customer
+from django.urls import reverse, reverse_lazy
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_http_methods
+from .models import BillSnapshot, Customer, QRCode
+from . import bills, payment_qr
 from django.views.generic.edit import UpdateView
 from django.views import View
 from django.shortcuts import get_object_or_404, redirect
 from orders.models import Order
 from finance.models import FinanceTransaction
+from core.db_routing import ReplicaReadMixin
+from core.fragments import FragmentMixin
+from core.templatetags.media_extras import safe_image_url
 from django.db import models
 from django.utils.safestring import mark_safe
 
+logger = logging.getLogger(__name__)
+
 
 class CustomerListView(LoginRequiredMixin, ListView):
     model = Customer
@@ -121,12 +133,13 @@ class CustomerCreateView(LoginRequiredMixin, CreateView):
         return form
 
 
-class CustomerDetailView(LoginRequiredMixin, DetailView):
+class CustomerDetailView(LoginRequiredMixin, FragmentMixin, DetailView):
     model = Customer
     template_name = 'customers/detail.html'
     context_object_name = 'customer'
     slug_field = 'code'
     slug_url_kwarg = 'code'
+    fragment_templates = {'table': 'customers/_order_results.html'}
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -135,7 +148,7 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
         from django.db.models import F, FloatField, IntegerField, ExpressionWrapper, Sum, Case, When, Value
         from django.db.models.functions import Coalesce, TruncDate
 
-        base_qs = Order.objects.filter(customer=self.object).select_related('product')
+        base_qs = Order.objects.filter(customer=self.object).select_related('product', 'product__supplier', 'color', 'size')
 
         # Filtering by multiple status
         status_list = self.request.GET.getlist('status')
@@ -201,6 +214,35 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
         )
         list_aggs['total_net_profit'] = (list_aggs.get('total_revenue') or 0) - (list_aggs.get('total_discount') or 0)
 
+        if not self.fragment:
+            context.update(self.get_summary_context())
+
+        context['recent_orders'] = recent_orders
+        context['list_totals'] = list_aggs
+        context['order_status_choices'] = Order.STATUS_CHOICES
+        # Suppliers list for filter (not part of the orders fragment)
+        context['suppliers'] = []
+        if not self.fragment:
+            try:
+                from suppliers.models import Supplier
+                context['suppliers'] = Supplier.objects.all()
+            except Exception:
+                pass
+        context['current_filters'] = {
+            'status': status_list,
+            'supplier': supplier_ids,
+            'q': q or '',
+            # Default sort is by latest update
+            'sort': sort or 'updated_desc',
+        }
+        return context
+
+    def get_summary_context(self):
+        """KPI cards and payment summary; not part of the orders fragment."""
+        from django.db.models import F, FloatField, IntegerField, ExpressionWrapper, Sum, Case, When, Value
+        from django.db.models.functions import Coalesce
+
+        summary = {}
         # Stats are always computed from all customer's orders (not filtered), zero-out if cancelled
         stats_qs = (
             Order.objects
@@ -242,7 +284,7 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
             except Exception:
                 return f"{v}đ"
 
-        context['stats'] = {
+        summary['stats'] = {
             'order_count': order_count,
             'total_discount': format_currency(total_discount_val),
             'revenue': format_currency(revenue_val),
@@ -306,7 +348,7 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
         # Update remaining to follow: net_profit - paid(display) - deposit
         remaining_total = net_profit_decimal - reconciled_net_decimal - deposit_total
 
-        context['payment_summary'] = {
+        summary['payment_summary'] = {
             'paid': format_currency(reconciled_net_decimal),
             'deposit': format_currency(deposit_total),
             'remaining': format_currency(remaining_total),
@@ -324,31 +366,15 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
             remaining_int = int(remaining_total)
         except Exception:
             remaining_int = 0
-        context['payment_raw'] = {
+        summary['payment_raw'] = {
             'paid': paid_int,
             'deposit': deposit_int,
             'remaining': remaining_int,
         }
-        context['recent_orders'] = recent_orders
-        context['list_totals'] = list_aggs
-        context['order_status_choices'] = Order.STATUS_CHOICES
-        # Suppliers list for filter
-        try:
-            from suppliers.models import Supplier
-            context['suppliers'] = Supplier.objects.all()
-        except Exception:
-            context['suppliers'] = []
-        context['current_filters'] = {
-            'status': status_list,
-            'supplier': supplier_ids,
-            'q': q or '',
-            # Default sort is by latest update
-            'sort': sort or 'updated_desc',
-        }
-        return context
+        return summary
 
 
-class CustomerReportView(LoginRequiredMixin, DetailView):
+class CustomerReportView(LoginRequiredMixin, ReplicaReadMixin, DetailView):
     model = Customer
     template_name = 'customers/report.html'
     context_object_name = 'customer'
@@ -529,6 +555,8 @@ class CustomerReportView(LoginRequiredMixin, DetailView):
         context['top_products'] = top_products_list
 
         # JSON-friendly data for chart (avoid template logic causing numeric issues)
+        from products.models import Product
+        product_images = Product.objects.only('image').in_bulk([row.get('product_id') for row in top_products_list])
         top_products_chart = []
         for row in top_products_list:
             product_id = row.get('product_id')
@@ -541,15 +569,12 @@ class CustomerReportView(LoginRequiredMixin, DetailView):
             # Get product image (absolute URL so tooltip <img> loads correctly)
             product_image = ''
             try:
-                from products.models import Product
-                product_obj = Product.objects.filter(id=product_id).only('image').first()
+                product_obj = product_images.get(product_id)
                 if product_obj and getattr(product_obj, 'image', None):
-                    try:
-                        # Prefer full URL based on current request (handles MEDIA_URL automatically)
-                        product_image = self.request.build_absolute_uri(product_obj.image.url)
-                    except Exception:
-                        # Fallback: relative path string
-                        product_image = str(product_obj.image)
+                    # Absolute URL based on current request (handles MEDIA_URL automatically)
+                    image_url = safe_image_url(product_obj.image)
+                    if image_url:
+                        product_image = self.request.build_absolute_uri(image_url)
             except Exception:
                 pass
 
@@ -632,6 +657,8 @@ class DeleteCustomerView(LoginRequiredMixin, View):
 
 
 class CustomerBillView(LoginRequiredMixin, DetailView):
+    # Not on the replica: it stores snapshots, and a lagging replica would
+    # serve the bill from before the latest payment
     model = Customer
     template_name = 'customers/bill.html'
     context_object_name = 'customer'
@@ -641,7 +668,26 @@ class CustomerBillView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         customer = self.object
+        # Reuse the snapshot of this state; the bill is only rebuilt when
+        # orders/payments (or the query) changed
+        snapshot = bills.current_snapshot(customer, self.request.GET, lambda: self.build_bill(customer))
+        token = bills.share_token(snapshot)
+        ctx.update(snapshot.data)
+        if snapshot.data.get('qr_payload'):
+            # The QR file may be gone (fresh disk) while the snapshot is reused
+            ctx['qr_url'] = self.local_qr_url(customer, snapshot.data['qr_payload'])
+        ctx.update({
+            'title': f"Bill - {customer.name}",
+            'created_at': snapshot.created_at,
+            'snapshot': snapshot,
+            'share_url': reverse('customers:bill_share', kwargs={'token': token}),
+            'share_days': getattr(settings, 'BILL_SHARE_DAYS', 30),
+            'share_pdf_url': reverse('customers:bill_share_file', kwargs={'token': token, 'fmt': 'pdf'}),
+        })
+        return ctx
 
+    def build_bill(self, customer):
+        """Bill content as plain data (stored in BillSnapshot.data)."""
         from django.db.models import F, FloatField, IntegerField, ExpressionWrapper, Case, When, Value
         from django.db.models.functions import Coalesce
         from django.db import models
@@ -746,70 +792,115 @@ class CustomerBillView(LoginRequiredMixin, DetailView):
 
         remaining = float(total_goods) - float(paid_amount_val or 0)
 
-        # Build QR URL: allow override via GET ?qr_url=..., else generate simple QR with transfer info
-        try:
-            from urllib.parse import quote
-        except Exception:
-            quote = lambda x: x
-        bank_name = 'TPBank'
-        bank_owner = 'QUACH THI PHUONG NGA'
-        bank_account = '8937 2282 552'
-        amount_int = int(remaining)
-        qr_url = self.request.GET.get('qr_url')
-        if not qr_url:
-            # Prefer a default Cloudinary URL if provided via env settings
-            try:
-                from django.conf import settings
-                default_cloud_qr = getattr(settings, 'CLOUDINARY_QR_URL', None) or None
-            except Exception:
-                default_cloud_qr = None
-            if default_cloud_qr:
-                qr_url = default_cloud_qr
-            else:
-                # Fallback: generate a simple QR on-the-fly
-                qr_payload = (
-                    f"Ngân hàng: {bank_name}\n"
-                    f"Chủ TK: {bank_owner}\n"
-                    f"STK: {bank_account}\n"
-                    f"Số tiền: {amount_int}đ\n"
-                    f"Nội dung: {customer.code}"
-                )
-                qr_url = f"https://api.qrserver.com/v1/create-qr-code/?size=220x220&data={quote(qr_payload)}"
-
-        # If admin-uploaded QR selected via ?qr_id, use that instead
-        qr_id = self.request.GET.get('qr_id')
-        if qr_id and str(qr_id).isdigit():
-            try:
-                from .models import QRCode
-                obj = QRCode.objects.filter(id=int(qr_id)).first()
-                if obj and getattr(obj, 'url', ''):
-                    qr_url = obj.url
-            except Exception:
-                pass
-        elif not qr_url:
-            # No explicit QR; prefer a fixed default id=3, then latest uploaded
-            try:
-                from .models import QRCode
-                preferred = QRCode.objects.filter(id=6).first()
-                if preferred and getattr(preferred, 'url', ''):
-                    qr_url = preferred.url
-                else:
-                    latest = QRCode.objects.order_by('-created_at').first()
-                    if latest and getattr(latest, 'url', ''):
-                        qr_url = latest.url
-            except Exception:
-                pass
-
-        ctx.update({
-            'title': f"Bill - {customer.name}",
-            'orders': orders,
+        qr_url, qr_payload = self.get_qr(customer, int(remaining))
+        return {
+            'customer_name': customer.name,
+            'customer_code': customer.code,
+            'orders': [
+                {
+                    'code': o.code,
+                    'product_name': o.product.name,
+                    'color': o.color.name if o.color else '',
+                    'size': o.size.name if o.size else '',
+                    'image_url': safe_image_url(o.product.image),
+                    'unit_price': o.unit_price,
+                    'amount': o.amount_safe,
+                    'total': o.net_profit,
+                }
+                for o in orders
+            ],
             'total_goods': int(total_goods),
             'paid_amount': int(paid_amount_val or 0),
             'remaining_amount': int(remaining),
-            'created_date': models.functions.Now(),
-            'bank_name': bank_name,
-            'bank_owner': bank_owner,
-            'bank_account': bank_account,
+            'bank_name': getattr(settings, 'PAYMENT_BANK_NAME', ''),
+            'bank_owner': getattr(settings, 'PAYMENT_BANK_OWNER', ''),
+            'bank_account': getattr(settings, 'PAYMENT_BANK_ACCOUNT', ''),
             'qr_url': qr_url,
-        })
-        return ctx
+            'qr_payload': qr_payload,
+        }
+
+    def get_qr(self, customer, amount):
+        """(image URL, VietQR payload or '' when the image comes from elsewhere)."""
+        # ?qr_url= / ?qr_id= (uploaded QRCode) override; then a fixed
+        # CLOUDINARY_QR_URL if configured; else a VietQR for this amount
+        qr_url = self.request.GET.get('qr_url')
+        if qr_url:
+            return qr_url, ''
+        qr_id = self.request.GET.get('qr_id')
+        if qr_id and qr_id.isdigit():
+            obj = QRCode.objects.filter(id=int(qr_id)).first()
+            if obj and obj.url:
+                return obj.url, ''
+        default_cloud_qr = getattr(settings, 'CLOUDINARY_QR_URL', None)
+        if default_cloud_qr:
+            return default_cloud_qr, ''
+        if not getattr(settings, 'PAYMENT_BANK_BIN', '') or not getattr(settings, 'PAYMENT_BANK_ACCOUNT', ''):
+            return '', ''
+        payload = payment_qr.bill_payload(amount, customer.code)
+        return self.local_qr_url(customer, payload), payload
+
+    def local_qr_url(self, customer, payload):
+        try:
+            name = payment_qr.qr_file(payload)
+        except OSError:
+            logger.warning('could not write payment QR for %s', customer.code, exc_info=True)
+            return ''
+        return reverse('customers:payment_qr', kwargs={'name': name})
+
+
+@login_required
+@require_http_methods(["GET"])
+def payment_qr_image(request, name):
+    # Names are content hashes: a file never changes once written
+    if not payment_qr.NAME_RE.match(name):
+        raise Http404
+    try:
+        fh = open(payment_qr.file_path(name), 'rb')
+    except FileNotFoundError:
+        raise Http404
+    content_type = 'image/svg+xml' if name.endswith('.svg') else 'image/png'
+    response = FileResponse(fh, content_type=content_type)
+    patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+    return response
+
+
+def _shared_snapshot(token):
+    digest = bills.digest_from_token(token)
+    snapshot = BillSnapshot.objects.filter(digest=digest).first() if digest else None
+    if snapshot is None:
+        raise Http404
+    return snapshot
+
+
+def _immutable(response, snapshot):
+    # Content is addressed by its hash: the same link never shows anything
+    # else, but only the recipient's browser may keep it (no proxies/CDNs)
+    response['ETag'] = f'"{snapshot.digest}"'
+    patch_cache_control(response, private=True, max_age=bills.share_max_age(), immutable=True)
+    response['X-Robots-Tag'] = 'noindex'
+    return response
+
+
+@require_http_methods(["GET"])
+def bill_share(request, token):
+    """Shared bill (no login): the HTML stored with the snapshot."""
+    snapshot = _shared_snapshot(token)
+    if request.headers.get('If-None-Match') == f'"{snapshot.digest}"':
+        return _immutable(HttpResponseNotModified(), snapshot)
+    return _immutable(HttpResponse(snapshot.html), snapshot)
+
+
+@require_http_methods(["GET"])
+def bill_share_file(request, token, fmt):
+    """Shared bill as PNG/PDF, rendered once per snapshot."""
+    if fmt not in bills.IMAGE_FORMATS:
+        raise Http404
+    snapshot = _shared_snapshot(token)
+    if request.headers.get('If-None-Match') == f'"{snapshot.digest}"':
+        return _immutable(HttpResponseNotModified(), snapshot)
+    path = bills.image_file(snapshot, fmt)
+    content_type = 'application/pdf' if fmt == 'pdf' else 'image/png'
+    response = FileResponse(
+        open(path, 'rb'), content_type=content_type, filename=f"bill-{snapshot.data['customer_code']}.{fmt}",
+    )
+    return _immutable(response, snapshot)
@@ -8,10 +8,12 @@ from django.db.models import Q
 from django.db.models import Sum, Case, When, DecimalField, F, Count, Value
 from django.db.models.functions import Coalesce
 from decimal import Decimal
+from django.db import transaction
 
 from .models import FinanceCategory, FinanceTransaction
 from orders.models import Order
 from customers.models import Customer
+from core.fragments import FragmentMixin
 from .forms import FinanceCategoryForm, FinanceTransactionForm
 
 
@@ -113,7 +115,11 @@ class IncomeQuickConfirmView(LoginRequiredMixin, View):
         if q:
             from django.db import models as dj_models
             qs = qs.filter(dj_models.Q(code__icontains=q) | dj_models.Q(product__name__icontains=q))
-        qs.update(status='reconciled')
+        # Saved one by one so orders.signals counts the transitions and refreshes product stats
+        with transaction.atomic():
+            for order in qs:
+                order.status = 'reconciled'
+                order.save(update_fields=['status', 'updated_at'])
         messages.success(request, 'Đã xác nhận thanh toán và tạo giao dịch!')
         return redirect('finance:transactions_list')
 
@@ -140,11 +146,12 @@ class CategoryDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-class TransactionListView(LoginRequiredMixin, ListView):
+class TransactionListView(LoginRequiredMixin, FragmentMixin, ListView):
     model = FinanceTransaction
     template_name = 'finance/transactions_list.html'
     context_object_name = 'transactions'
     paginate_by = 20
+    fragment_templates = {'table': 'finance/_transactions_results.html'}
 
     def get_queryset(self):
         qs = super().get_queryset().select_related('category', 'customer')
@@ -199,13 +206,15 @@ class TransactionListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx['title'] = 'Nhật ký giao dịch - NavyBaby'
-        categories_qs = FinanceCategory.objects.all().order_by('name')
-        ctx['categories'] = categories_qs
         ctx['q'] = self.request.GET.get('q', '')
         ctx['type'] = self.request.GET.get('type', '')
-        raw_cats = self.request.GET.getlist('category')
-        valid_ids = set(categories_qs.values_list('id', flat=True))
-        ctx['category_filter'] = [c for c in raw_cats if c.isdigit() and int(c) in valid_ids]
+        # Category dropdown/chips are outside the results fragment
+        if not self.fragment:
+            categories_qs = FinanceCategory.objects.all().order_by('name')
+            ctx['categories'] = categories_qs
+            raw_cats = self.request.GET.getlist('category')
+            valid_ids = set(categories_qs.values_list('id', flat=True))
+            ctx['category_filter'] = [c for c in raw_cats if c.isdigit() and int(c) in valid_ids]
         ctx['date_from'] = self.request.GET.get('date_from', '')
         ctx['date_to'] = self.request.GET.get('date_to', '')
         ctx['sort'] = self.request.GET.get('sort', 'created_desc')
@@ -0,0 +1,31 @@
+# Gunicorn picks this file up automatically (Procfile: "web: gunicorn").
+# SERVER_MODE=asgi runs navybaby.asgi under uvicorn workers, so async views
+# such as the concurrent dashboard get a real event loop.
+import os
+
+if os.environ.get("SERVER_MODE", "wsgi") == "asgi":
+    wsgi_app = "navybaby.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "navybaby.wsgi:application"
+
+
+def _metrics():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "navybaby.settings")
+    from core import metrics
+
+    return metrics if metrics.enabled() else None
+
+
+def on_starting(server):
+    # Files left by workers of a previous master
+    metrics = _metrics()
+    if metrics:
+        metrics.retire()
+
+
+def child_exit(server, worker):
+    # Fold the exited worker's numbers into retired.json (core.metrics)
+    metrics = _metrics()
+    if metrics:
+        metrics.retire([worker.pid])
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "progress", "attempts", "run_at", "locked_by", "created_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "message", "error")
+    readonly_fields = ("locked_by", "locked_at", "attempts", "created_at", "updated_at", "finished_at")
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Chạy lại các job đã chọn")
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+
+        updated = queryset.exclude(status="running").update(
+            status="queued", attempts=0, run_at=timezone.now(), error="", finished_at=None,
+        )
+        self.message_user(request, f"Đã đưa {updated} job vào hàng đợi.")
@@ -0,0 +1,58 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import queue, tasks
+
+STALE_CHECK_SECONDS = 60
+CLEANUP_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = "Chạy worker xử lý hàng đợi Job (Procfile: worker: python manage.py run_worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sleep", type=float, default=2.0, help="Số giây chờ khi hàng đợi trống")
+        parser.add_argument("--burst", action="store_true", help="Thoát khi hết việc thay vì chờ tiếp")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Thoát sau N job (0 = không giới hạn)")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        worker = queue.worker_id()
+        self.stdout.write(f"Worker {worker} started")
+        processed = 0
+        last_stale_check = last_cleanup = 0.0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_stale_check > STALE_CHECK_SECONDS:
+                requeued, failed = queue.requeue_stale()
+                if requeued or failed:
+                    self.stdout.write(f"Stale jobs: {requeued} requeued, {failed} failed")
+                last_stale_check = time.monotonic()
+            if time.monotonic() - last_cleanup > CLEANUP_SECONDS:
+                # Finished jobs older than JOBS_RETENTION_DAYS
+                tasks.schedule_cleanup()
+                last_cleanup = time.monotonic()
+
+            job = queue.claim(worker)
+            if job is None:
+                if options["burst"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            ok = queue.run(job)
+            processed += 1
+            self.stdout.write(f"{'done' if ok else 'failed'}: {job}")
+            if options["max_jobs"] and processed >= options["max_jobs"]:
+                break
+        self.stdout.write(f"Worker {worker} stopped after {processed} job(s)")
+
+    def stop(self, signum, frame):
+        # Finish the current job, then exit
+        self.stopping = True
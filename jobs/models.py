@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ("queued", "Đang chờ"),
+        ("running", "Đang chạy"),
+        ("done", "Hoàn thành"),
+        ("failed", "Lỗi"),
+    ]
+
+    name = models.CharField(max_length=100)  # registered task name
+    args = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    priority = models.IntegerField(default=0)  # higher runs first
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Claim query: queued jobs, highest priority first, then the most overdue
+            models.Index(fields=["status", "-priority", "run_at"], name="jobs_job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    def set_progress(self, progress, message=""):
+        """Called from inside a task; writes straight to the row so pollers see it."""
+        self.progress = max(0, min(100, int(progress)))
+        self.message = message[:255]
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, message=self.message, updated_at=timezone.now())
+
+    def as_dict(self):
+        return {
+            "id": self.pk,
+            "name": self.name,
+            "status": self.status,
+            "status_display": self.get_status_display(),
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
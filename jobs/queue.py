@@ -0,0 +1,142 @@
+"""
+Database-backed job queue.
+
+Register work with ``@task("name")`` in an app's ``tasks.py`` and queue it from
+a view with ``enqueue("name", args={...}, user=request.user)``; the
+``run_worker`` command (Procfile ``worker:``) executes it. Task functions are
+called as ``func(job, **job.args)`` and may report progress with
+``job.set_progress(pct, message)``; whatever they return (JSON-serialisable)
+is stored in ``job.result``.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database
+supports it (PostgreSQL), so several workers never pick the same job. On
+SQLite the worker claims with a conditional UPDATE instead and simply polls.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register ``func(job, **args)`` under ``name``."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def enqueue(name, args=None, priority=0, run_at=None, max_attempts=None, user=None):
+    if name not in _registry:
+        raise KeyError(f"Unknown task: {name}")
+    return Job.objects.create(
+        name=name,
+        args=args or {},
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or getattr(settings, "JOBS_MAX_ATTEMPTS", 3),
+        created_by=user if getattr(user, "is_authenticated", False) else None,
+    )
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _due():
+    return Job.objects.filter(status="queued", run_at__lte=timezone.now()).order_by("-priority", "run_at", "id")
+
+
+def claim(worker):
+    """Mark the next due job as running for ``worker`` and return it (or None)."""
+    now = timezone.now()
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _due().select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = "running"
+            job.locked_by = worker
+            job.locked_at = now
+            job.attempts += 1
+            job.save(update_fields=["status", "locked_by", "locked_at", "attempts", "updated_at"])
+            return job
+
+    # No row locks (SQLite): whoever flips the status first owns the job
+    for job_id in _due().values_list("id", flat=True)[:5]:
+        claimed = Job.objects.filter(pk=job_id, status="queued").update(
+            status="running", locked_by=worker, locked_at=now, updated_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run(job):
+    """Execute a claimed job and record the outcome (done, retry later, or failed)."""
+    func = get_task(job.name)
+    started = time.monotonic()
+    try:
+        if func is None:
+            raise KeyError(f"Unknown task: {job.name}")
+        result = func(job, **(job.args or {}))
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            # Exponential backoff: 30s, 60s, 120s...
+            delay = getattr(settings, "JOBS_RETRY_DELAY", 30) * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status="queued", run_at=now + timedelta(seconds=delay), locked_by="", locked_at=None,
+                error=error, updated_at=now,
+            )
+            logger.warning("job %s failed (attempt %s/%s), retry in %ss", job, job.attempts, job.max_attempts, delay)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status="failed", error=error, locked_by="", locked_at=None, finished_at=now, updated_at=now,
+            )
+            logger.error("job %s failed permanently:\n%s", job, error)
+        return False
+
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(
+        status="done", result=result, progress=100, locked_by="", locked_at=None, finished_at=now, updated_at=now,
+    )
+    logger.info("job %s done in %.2fs", job, time.monotonic() - started)
+    return True
+
+
+def requeue_stale():
+    """
+    Put back jobs whose worker died mid-run (locked longer than
+    JOBS_LOCK_TIMEOUT); those that used up their attempts fail instead, so a
+    job that kills its worker does not run forever. Returns (requeued, failed).
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, "JOBS_LOCK_TIMEOUT", 1800))
+    stale = Job.objects.filter(status="running", locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", error="Worker stopped while running the job (lock timed out).",
+        locked_by="", locked_at=None, finished_at=now, updated_at=now,
+    )
+    requeued = stale.update(status="queued", locked_by="", locked_at=None, updated_at=now)
+    return requeued, failed
+
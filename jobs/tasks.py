@@ -0,0 +1,26 @@
+"""
+Housekeeping tasks of the job queue itself: old finished jobs are deleted
+after ``JOBS_RETENTION_DAYS``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import enqueue, task
+
+
+@task("jobs.cleanup")
+def cleanup(job, days=7):
+    """Delete finished jobs older than ``days``."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status__in=["done", "failed"], finished_at__lt=cutoff).delete()
+    return {"deleted": deleted}
+
+
+def schedule_cleanup():
+    """Queue ``jobs.cleanup`` unless one is already waiting; ``run_worker`` calls it hourly."""
+    if Job.objects.filter(name="jobs.cleanup", status__in=["queued", "running"]).exists():
+        return None
+    return enqueue("jobs.cleanup", args={"days": getattr(settings, "JOBS_RETENTION_DAYS", 7)}, priority=-10)
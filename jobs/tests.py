@@ -0,0 +1,117 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue, tasks
+from .models import Job
+
+
+@queue.task("tests.ok")
+def ok_task(job, value=None):
+    return {"value": value}
+
+
+@queue.task("tests.boom")
+def boom_task(job):
+    raise RuntimeError("boom")
+
+
+class ClaimTests(TestCase):
+    def setUp(self):
+        past = timezone.now() - timedelta(minutes=5)
+        self.low = queue.enqueue("tests.ok", run_at=past - timedelta(minutes=1))
+        self.high = queue.enqueue("tests.ok", priority=5, run_at=past)
+        self.older_high = queue.enqueue("tests.ok", priority=5, run_at=past - timedelta(minutes=1))
+        self.later = queue.enqueue("tests.ok", priority=9, run_at=timezone.now() + timedelta(hours=1))
+
+    def claim_all(self):
+        claimed = []
+        while (job := queue.claim("w1")) is not None:
+            claimed.append(job)
+        return claimed
+
+    def test_priority_then_run_at(self):
+        claimed = self.claim_all()
+        # Not due yet: left alone
+        self.assertEqual([job.pk for job in claimed], [self.older_high.pk, self.high.pk, self.low.pk])
+        for job in Job.objects.filter(pk__in=[job.pk for job in claimed]):
+            self.assertEqual((job.status, job.locked_by, job.attempts), ("running", "w1", 1))
+
+    def test_row_lock_path_skips_locked_rows(self):
+        original = QuerySet.select_for_update
+        with mock.patch.object(connection.features, "has_select_for_update_skip_locked", True), \
+                mock.patch.object(QuerySet, "select_for_update", autospec=True, side_effect=original) as lock:
+            claimed = self.claim_all()
+        self.assertEqual([job.pk for job in claimed], [self.older_high.pk, self.high.pk, self.low.pk])
+        self.assertTrue(all(call.kwargs == {"skip_locked": True} for call in lock.call_args_list))
+
+
+@override_settings(JOBS_RETRY_DELAY=30)
+class RunTests(TestCase):
+    def test_success(self):
+        job = queue.enqueue("tests.ok", args={"value": 3})
+        self.assertTrue(queue.run(queue.claim("w1")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.progress), ("done", {"value": 3}, 100))
+
+    def test_retry_with_backoff_then_fail(self):
+        job = queue.enqueue("tests.boom", max_attempts=3)
+        for attempt, delay in ((1, 30), (2, 60)):
+            claimed = queue.claim("w1")
+            before = timezone.now()
+            self.assertFalse(queue.run(claimed))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ("queued", attempt))
+            self.assertIn("RuntimeError: boom", job.error)
+            self.assertGreaterEqual(job.run_at, before + timedelta(seconds=delay))
+            self.assertLess(job.run_at, before + timedelta(seconds=delay + 5))
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+        self.assertFalse(queue.run(queue.claim("w1")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(queue.claim("w1"))
+
+
+@override_settings(JOBS_LOCK_TIMEOUT=60)
+class RequeueStaleTests(TestCase):
+    def running(self, attempts, locked_minutes_ago):
+        job = queue.enqueue("tests.ok", max_attempts=3)
+        Job.objects.filter(pk=job.pk).update(
+            status="running", attempts=attempts, locked_by="dead",
+            locked_at=timezone.now() - timedelta(minutes=locked_minutes_ago),
+        )
+        return job
+
+    def test_requeues_or_fails(self):
+        retry = self.running(attempts=1, locked_minutes_ago=5)
+        exhausted = self.running(attempts=3, locked_minutes_ago=5)
+        fresh = self.running(attempts=1, locked_minutes_ago=0)
+        self.assertEqual(queue.requeue_stale(), (1, 1))
+        statuses = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(
+            [statuses[retry.pk], statuses[exhausted.pk], statuses[fresh.pk]],
+            ["queued", "failed", "running"],
+        )
+
+
+class CleanupTests(TestCase):
+    def test_scheduled_once_and_deletes_old_jobs(self):
+        old = queue.enqueue("tests.ok")
+        Job.objects.filter(pk=old.pk).update(status="done", finished_at=timezone.now() - timedelta(days=30))
+        recent = queue.enqueue("tests.ok")
+        Job.objects.filter(pk=recent.pk).update(status="done", finished_at=timezone.now())
+
+        with self.settings(JOBS_RETENTION_DAYS=7):
+            scheduled = tasks.schedule_cleanup()
+        self.assertIsNone(tasks.schedule_cleanup())
+        self.assertEqual(scheduled.args, {"days": 7})
+
+        self.assertTrue(queue.run(queue.claim("w1")))
+        self.assertFalse(Job.objects.filter(pk=old.pk).exists())
+        self.assertTrue(Job.objects.filter(pk=recent.pk).exists())
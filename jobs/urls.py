@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('cong-viec/<int:pk>/', views.job_status, name='job_status'),
+]
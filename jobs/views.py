@@ -0,0 +1,14 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .models import Job
+
+
+@login_required
+def job_status(request, pk):
+    """JSON status/progress for the UI to poll; visible to the job's creator and staff."""
+    job = get_object_or_404(Job, pk=pk)
+    if not (request.user.is_staff or job.created_by_id == request.user.pk):
+        return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
+    return JsonResponse({'success': True, 'job': job.as_dict()})
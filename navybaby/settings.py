@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     "orders",
     "categories",
     "suppliers",
+    "jobs",
     "finance",
 ]
 
@@ -68,9 +69,73 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Bot blocking: substrings matched case-insensitively against the User-Agent.
+# Override with a comma-separated BOT_BLOCKING_PATTERNS env var.
+BOT_BLOCKING_PATTERNS = [
+    p.strip() for p in os.environ.get(
+        "BOT_BLOCKING_PATTERNS",
+        "bot,crawler,spider,scraper,amazonbot,googlebot,bingbot,"
+        "slurp,duckduckbot,baiduspider,yandexbot,facebookexternalhit",
+    ).split(",") if p.strip()
+]
+# Number of distinct User-Agent verdicts kept in the per-process LRU cache
+BOT_BLOCKING_CACHE_SIZE = int(os.environ.get("BOT_BLOCKING_CACHE_SIZE", "1024"))
+
+# === PERFORMANCE INSTRUMENTATION (opt-in) ===
+# PERF_INSTRUMENTATION=True adds Server-Timing headers and a JSON log line per
+# request (logger "navybaby.perf"); slow requests also list their top queries.
+PERF_INSTRUMENTATION = os.environ.get("PERF_INSTRUMENTATION", "False") == "True"
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", "1000"))
+PERF_SLOW_QUERY_TOP_N = int(os.environ.get("PERF_SLOW_QUERY_TOP_N", "5"))
+if PERF_INSTRUMENTATION:
+    # Right after bot blocking so it measures everything else
+    MIDDLEWARE.insert(1, "core.middleware.PerformanceMiddleware")
+
+# On-demand profiler: staff add ?__profile=1 (cProfile report + SQL),
+# ?__profile=flame (collapsed stacks) or ?__profile=save to any page.
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "False") == "True"
+PROFILER_OUTPUT_DIR = Path(os.environ.get("PROFILER_OUTPUT_DIR", BASE_DIR / "profiles"))
+PROFILER_KEEP = int(os.environ.get("PROFILER_KEEP", "50"))  # newest profiles kept on disk
+if PROFILER_ENABLED:
+    # After auth/approval so request.user is known
+    MIDDLEWARE.insert(MIDDLEWARE.index("accounts.middleware.ApprovalRequiredMiddleware") + 1,
+                      "core.middleware.ProfilerMiddleware")
+
+# Prometheus metrics at /metrics: per-view latency/query histograms, cache and
+# order counters. Each worker dumps its numbers into METRICS_DIR (must be shared
+# by all gunicorn workers); the endpoint merges them. Access: staff users, IPs
+# in METRICS_ALLOWED_IPS or "Authorization: Bearer $METRICS_TOKEN".
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "False") == "True"
+METRICS_DIR = Path(os.environ.get("METRICS_DIR", "/tmp/navybaby-metrics"))
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "5"))
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get("METRICS_ALLOWED_IPS", "127.0.0.1").split(",") if ip.strip()]
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(1, "core.middleware.MetricsMiddleware")
+
+# Slow SQL capture: statements over the threshold are aggregated by fingerprint
+# into core.SlowQuery (Django admin) with an EXPLAIN plan taken in a background
+# thread. EXPLAIN ANALYZE re-runs the query (PostgreSQL only), so it is opt-in.
+SLOW_QUERY_ENABLED = os.environ.get("SLOW_QUERY_ENABLED", "False") == "True"
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_EXPLAIN_ANALYZE = os.environ.get("SLOW_QUERY_EXPLAIN_ANALYZE", "False") == "True"
+SLOW_QUERY_PLAN_TTL = int(os.environ.get("SLOW_QUERY_PLAN_TTL", "86400"))
+SLOW_QUERY_MAX_PER_REQUEST = int(os.environ.get("SLOW_QUERY_MAX_PER_REQUEST", "10"))
+if SLOW_QUERY_ENABLED:
+    MIDDLEWARE.insert(1, "core.middleware.SlowQueryMiddleware")
+
 # === URL / WSGI ===
 ROOT_URLCONF = "navybaby.urls"
 WSGI_APPLICATION = "navybaby.wsgi.application"
+ASGI_APPLICATION = "navybaby.asgi.application"
+# Serve "/" with core.views.home_async (dashboard query groups run concurrently)
+ASYNC_DASHBOARD = os.environ.get("ASYNC_DASHBOARD", "False") == "True"
+
+# === BACKGROUND JOBS (jobs app, "python manage.py run_worker") ===
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_RETRY_DELAY = int(os.environ.get("JOBS_RETRY_DELAY", "30"))  # seconds, doubled per attempt
+JOBS_LOCK_TIMEOUT = int(os.environ.get("JOBS_LOCK_TIMEOUT", "1800"))  # requeue jobs of dead workers
+JOBS_RETENTION_DAYS = int(os.environ.get("JOBS_RETENTION_DAYS", "7"))  # jobs.cleanup, queued hourly by run_worker
 
 # === TEMPLATES ===
 TEMPLATES = [
@@ -83,11 +148,32 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "core.context_processors.assets",
             ],
         },
     },
 ]
 
+# === CACHE ===
+# Per-process memory cache; LocMem's default of 300 entries is too small
+# for the row cache on 500-row tables
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", "20000"))},
+    }
+}
+
+# Row fragment cache for order/product tables ({% cacherow %}, core/templatetags/row_cache.py)
+ROW_CACHE_ENABLED = os.environ.get("ROW_CACHE_ENABLED", "False") == "True"
+ROW_CACHE_TIMEOUT = int(os.environ.get("ROW_CACHE_TIMEOUT", "600"))
+
+# Product details API for the order form (products/details.py): server-side
+# entries are checked against Product.updated_at; browsers may reuse a
+# response for PRODUCT_DETAILS_MAX_AGE seconds, then revalidate by ETag
+PRODUCT_DETAILS_CACHE_TIMEOUT = int(os.environ.get("PRODUCT_DETAILS_CACHE_TIMEOUT", "3600"))
+PRODUCT_DETAILS_MAX_AGE = int(os.environ.get("PRODUCT_DETAILS_MAX_AGE", "60"))
+
 # === DATABASE ===
 DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
@@ -101,14 +187,49 @@ if not DATABASE_URL:
 
 CONN_MAX_AGE = int(os.environ.get("CONN_MAX_AGE", "600"))
 
-DATABASES = {
-    "default": dj_database_url.config(
-        default=(DATABASE_URL or f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
-        conn_max_age=CONN_MAX_AGE,
+# Optional psycopg 3 connection pool (Django 5.1+ OPTIONS["pool"]); needs
+# "psycopg[binary,pool]" instead of psycopg2. Pooled connections replace
+# persistent ones, so CONN_MAX_AGE is forced to 0 while the pool is on.
+DB_POOL = os.environ.get("DB_POOL", "False") == "True"
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "4"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+
+def _database_config(url, **extra):
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=0 if DB_POOL else CONN_MAX_AGE,
         ssl_require=not DEBUG,
     )
+    if DB_POOL and config["ENGINE"] == "django.db.backends.postgresql":
+        config.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": DB_POOL_TIMEOUT,
+        }
+    config.update(extra)
+    return config
+
+
+DATABASES = {
+    "default": _database_config(DATABASE_URL or f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
 }
 
+# Read replica for the dashboard/report pages (core.db_routing). Locally two
+# SQLite files work too: copy db.sqlite3 and point DATABASE_REPLICA_URL at it.
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "30"))
+# After a POST/PUT/DELETE the session reads from the primary for this long
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "10"))
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = _database_config(DATABASE_REPLICA_URL, TEST={"MIRROR": "default"})
+    DATABASE_ROUTERS = ["core.db_routing.ReplicaRouter"]
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.contrib.sessions.middleware.SessionMiddleware") + 1,
+        "core.middleware.ReplicaPinMiddleware",
+    )
+
 
 # === PASSWORD VALIDATORS ===
 AUTH_PASSWORD_VALIDATORS = [
@@ -132,22 +253,59 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
+# Front-end: USE_COMPILED_ASSETS=True loads static/dist/app.css + the icon
+# sprite (npm install && python manage.py build_assets, before collectstatic)
+# instead of the Tailwind CDN runtime and unpkg lucide. collectstatic then
+# minifies our JS/CSS and writes hashed names with .gz/.br variants
+# (core.storage.StaticStorage), which WhiteNoise serves with far-future
+# immutable headers.
+USE_COMPILED_ASSETS = os.environ.get("USE_COMPILED_ASSETS", "False") == "True"
+
 # WhiteNoise: fix lỗi admin static và compress ổn định trên Render
-STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "core.storage.StaticStorage"
+            if USE_COMPILED_ASSETS
+            else "whitenoise.storage.CompressedStaticFilesStorage"
+        ),
+    },
+}
 WHITENOISE_USE_FINDERS = True  # giúp tìm admin static khi collectstatic
 
 # === MEDIA FILES (Cloudinary or Local) ===
 CLOUDINARY_URL = os.environ.get("CLOUDINARY_URL", "")
 USE_CLOUDINARY = bool(CLOUDINARY_URL)
 
-if USE_CLOUDINARY:
-    DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
-    MEDIA_URL = "/media/"
-else:
-    DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
-    MEDIA_URL = "/media/"
+# Product images upload through CloudinaryField itself; STORAGES["default"]
+# above stays on the file system for everything else
+MEDIA_URL = "/media/"
+if not USE_CLOUDINARY:
     MEDIA_ROOT = BASE_DIR / "media"
 
+# Payment QR on customer bills (customers/payment_qr.py): VietQR for the
+# remaining amount, rendered locally and cached in PAYMENT_QR_DIR.
+# PAYMENT_BANK_BIN is the NAPAS bank id (TPBank = 970423)
+PAYMENT_BANK_BIN = os.environ.get("PAYMENT_BANK_BIN", "970423")
+PAYMENT_BANK_NAME = os.environ.get("PAYMENT_BANK_NAME", "TPBank")
+PAYMENT_BANK_OWNER = os.environ.get("PAYMENT_BANK_OWNER", "QUACH THI PHUONG NGA")
+PAYMENT_BANK_ACCOUNT = os.environ.get("PAYMENT_BANK_ACCOUNT", "8937 2282 552")
+PAYMENT_QR_DIR = os.environ.get("PAYMENT_QR_DIR", str(BASE_DIR / "media" / "qr"))
+
+# Shared bill snapshots (customers/bills.py): PNG/PDF renderings are written
+# once per snapshot here; the fonts need Vietnamese glyphs (DejaVu on Debian)
+BILL_SHARE_DAYS = int(os.environ.get("BILL_SHARE_DAYS", "30"))  # shared links stop working after this
+BILL_SNAPSHOT_DIR = os.environ.get("BILL_SNAPSHOT_DIR", str(BASE_DIR / "media" / "bills"))
+BILL_FONT_PATH = os.environ.get("BILL_FONT_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+BILL_FONT_BOLD_PATH = os.environ.get("BILL_FONT_BOLD_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+
+# Product images: PRODUCT_IMAGE_ASYNC=True stages uploads and lets the job
+# worker resize/strip EXIF and upload them (Cloudinary, or MEDIA_ROOT offline)
+PRODUCT_IMAGE_ASYNC = os.environ.get("PRODUCT_IMAGE_ASYNC", "False") == "True"
+PRODUCT_IMAGE_MAX_SIZE = int(os.environ.get("PRODUCT_IMAGE_MAX_SIZE", "1600"))
+PRODUCT_IMAGE_QUALITY = int(os.environ.get("PRODUCT_IMAGE_QUALITY", "85"))
+
 # === DEFAULTS ===
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -186,6 +344,8 @@ LOGGING = {
     },
     "loggers": {
         "django": {"handlers": ["console"], "level": LOG_LEVEL, "propagate": True},
+        "navybaby.perf": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "navybaby.slow_queries": {"handlers": ["console"], "level": "WARNING", "propagate": False},
         "": {"handlers": ["console"], "level": LOG_LEVEL},
     },
 }
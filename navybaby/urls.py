@@ -18,11 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from core.views import HomePageView
+from core.views import HomePageView, home_async, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', HomePageView.as_view(), name='home'),
+    path('', home_async if settings.ASYNC_DASHBOARD else HomePageView.as_view(), name='home'),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('accounts.urls')),
     path('', include('customers.urls')),
     path('', include('categories.urls')),
@@ -30,6 +31,7 @@ urlpatterns = [
     path('', include('orders.urls')),
     path('', include('products.urls')),
     path('', include('finance.urls')),
+    path('', include('jobs.urls')),
 ]
 
 if settings.DEBUG or not getattr(settings, "CLOUDINARY_URL", None):
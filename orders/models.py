@@ -35,6 +35,16 @@ class Order(models.Model):
     def __str__(self):
         return f"{self.customer} - {self.product}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Product the row was loaded with, so moving an order to another
+        # product also refreshes the old one's stats (orders.signals)
+        instance._loaded_product_id = instance.__dict__.get("product_id")
+        # Status as stored, for the transition counter (orders.signals)
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.code:
             self.code = generate_code(Order, "ĐH")
@@ -47,6 +57,9 @@ class Order(models.Model):
             except Exception:
                 pass
         super().save(*args, **kwargs)
+        # The saved row is now what from_db would load
+        self._loaded_product_id = self.product_id
+        self._loaded_status = self.status
 
     def get_status_class(self):
         mapping = {
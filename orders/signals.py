@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import metrics
+from products import stats
+
+from .models import Order
+
+
+@receiver(post_save, sender=Order)
+def count_created_order(sender, instance, created, **kwargs):
+    if created:
+        metrics.record_order_created()
+    elif getattr(instance, "_loaded_status", None):
+        metrics.record_status_transition(instance._loaded_status, instance.status)
+
+
+@receiver(post_save, sender=Order)
+def refresh_product_stats(sender, instance, **kwargs):
+    # The order may have moved to another product
+    stats.refresh_on_commit({instance.product_id, getattr(instance, "_loaded_product_id", None)})
+
+
+@receiver(post_delete, sender=Order)
+def refresh_product_stats_on_delete(sender, instance, **kwargs):
+    stats.refresh_on_commit([instance.product_id])
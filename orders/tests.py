@@ -1,3 +1,115 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import User
+from core import metrics
+from customers.models import Customer
+from products.models import AttributeValue, Color, Product
+from suppliers.models import Supplier
+
+from .models import Order
+
+
+@override_settings(METRICS_ENABLED=True)
+class StatusTransitionMetricsTests(TestCase):
+    def setUp(self):
+        metrics._counters.clear()
+        self.addCleanup(metrics._counters.clear)
+        user = User.objects.create_user(username="u", password="x", is_approved=True)
+        self.client.force_login(user)
+        customer = Customer.objects.create(name="K")
+        product = Product.objects.create(name="P", price=100)
+        self.orders = [Order.objects.create(customer=customer, product=product) for _ in range(3)]
+
+    def transitions(self):
+        return {
+            dict(labels)["from"] + ">" + dict(labels)["to"]: value
+            for (name, labels), value in metrics._counters.items()
+            if name == "navybaby_order_status_transitions_total"
+        }
+
+    def test_counted_once_per_change(self):
+        order = self.orders[0]
+        self.client.post(reverse("orders:update_order_status", args=[order.pk]), {"status": "cart"})
+        self.client.post(reverse("orders:update_order_status", args=[order.pk]), {"status": "cart"})
+        self.client.post(reverse("orders:bulk_update_order_status"), {
+            "order_ids": [o.pk for o in self.orders], "status": "purchased",
+        })
+        self.assertEqual(self.transitions(), {"created>cart": 1, "cart>purchased": 1, "created>purchased": 2})
+        self.assertEqual(Order.objects.filter(status="purchased").count(), 3)
+
+    def test_saving_twice_counts_once(self):
+        order = Order.objects.get(pk=self.orders[0].pk)
+        order.status = "cancelled"
+        order.save()
+        order.save()
+        self.assertEqual(self.transitions(), {"created>cancelled": 1})
+
+
+class OrderListFragmentTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="u", password="x", is_approved=True)
+        self.client.force_login(user)
+        customer = Customer.objects.create(name="K")
+        product = Product.objects.create(name="P", price=100)
+        Order.objects.bulk_create([Order(customer=customer, product=product) for _ in range(25)])
+        self.url = reverse("orders:order_list")
+
+    def test_fragment_param_renders_results_only(self):
+        response = self.client.get(self.url, {"fragment": "table", "sort": "created_desc"})
+        self.assertTemplateUsed(response, "orders/_list_results.html")
+        self.assertTemplateNotUsed(response, "orders/list.html")
+        self.assertNotContains(response, "<html")
+        self.assertIn("HX-Request", response["Vary"])
+        # Pager links point at the page, not at the fragment
+        self.assertContains(response, "?sort=created_desc&amp;page=2")
+        self.assertNotContains(response, "fragment=")
+
+    def test_htmx_header_renders_results_only(self):
+        response = self.client.get(self.url, headers={"HX-Request": "true"})
+        self.assertTemplateUsed(response, "orders/_list_results.html")
+        self.assertTemplateNotUsed(response, "orders/list.html")
+
+    def test_full_page_without_fragment(self):
+        for params in ({}, {"fragment": "unknown"}):
+            response = self.client.get(self.url, params)
+            self.assertTemplateUsed(response, "orders/list.html")
+            self.assertContains(response, 'data-fragment="table"')
+            self.assertIn("HX-Request", response["Vary"])
+
+
+@override_settings(ROW_CACHE_ENABLED=True)
+class OrderRowCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user(username="u", password="x", is_approved=True)
+        self.client.force_login(user)
+        self.supplier = Supplier.objects.create(code="NCC1", name="NCC Cũ")
+        product = Product.objects.create(name="P", price=100, supplier=self.supplier)
+        color = Color.objects.create(
+            product=product, name="Đỏ", value=AttributeValue.objects.create(kind="color", name="Đỏ"),
+        )
+        self.customer = Customer.objects.create(name="Khách Cũ")
+        self.order = Order.objects.create(customer=self.customer, product=product, color=color)
+
+    def rows(self, display):
+        return self.client.get(reverse("orders:order_list"), {"fragment": "table", "display": display})
+
+    def test_related_changes_render_again(self):
+        for display in ("table", "card"):
+            self.assertContains(self.rows(display), "NCC Cũ")
+        # Neither touches the order, product or customer row
+        Supplier.objects.filter(pk=self.supplier.pk).update(name="NCC Mới")
+        Color.objects.filter(pk=self.order.color_id).update(name="Xanh")
+        for display in ("table", "card"):
+            response = self.rows(display)
+            self.assertContains(response, "NCC Mới")
+            self.assertContains(response, "Xanh")
+            self.assertNotContains(response, "NCC Cũ")
+
+        self.customer.name = "Khách Mới"
+        self.customer.save()
+        for display in ("table", "card"):
+            self.assertContains(self.rows(display), "Khách Mới")
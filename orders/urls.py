@@ -21,6 +21,7 @@ urlpatterns = [
     
     # AJAX endpoints
     path('don-hang/api/product/<int:product_id>/details/', views.get_product_details, name='product_details'),
+    path('don-hang/api/products/details/', views.get_products_details, name='products_details'),
     path('don-hang/<int:pk>/cap-nhat-trang-thai/', views.update_order_status, name='update_order_status'),
     path('don-hang/cap-nhat-trang-thai-nhieu/', views.bulk_update_order_status, name='bulk_update_order_status'),
 ]
@@ -4,20 +4,27 @@ from django.contrib.auth.decorators import login_required
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect
+from django.db import transaction
 from django.db.models import Q, Sum, F, Count
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.conf import settings
 
 from .models import Order
 from .forms import OrderForm
 from customers.models import Customer
 from products.models import Product, Color, Size
+from products import details as product_details
+from core.fragments import FragmentMixin
 
 
-class OrderListView(LoginRequiredMixin, ListView):
+class OrderListView(LoginRequiredMixin, FragmentMixin, ListView):
     model = Order
     template_name = 'orders/list.html'
+    fragment_templates = {'table': 'orders/_list_results.html'}
     context_object_name = 'orders'
     paginate_by = 20
     
@@ -60,7 +67,7 @@ class OrderListView(LoginRequiredMixin, ListView):
         from django.db.models import F, FloatField, IntegerField, ExpressionWrapper, Case, When, Value
         from django.db.models.functions import Coalesce
 
-        queryset = queryset.select_related('customer', 'product', 'color', 'size')
+        queryset = queryset.select_related('customer', 'product', 'product__supplier', 'color', 'size')
         queryset = queryset.annotate(
             amount_safe=Coalesce(F('amount'), 0, output_field=IntegerField()),
             price_safe=Coalesce(F('sale_price'), 0.0, output_field=FloatField()),
@@ -108,13 +115,14 @@ class OrderListView(LoginRequiredMixin, ListView):
         
         # Add status choices to context for filter dropdown
         context['status_choices'] = dict(Order.STATUS_CHOICES)
-        # Suppliers list for filter
-        try:
-            from suppliers.models import Supplier
-            suppliers_qs = Supplier.objects.all()
-            context['suppliers'] = suppliers_qs
-        except Exception:
-            context['suppliers'] = []
+        # Suppliers list for filter (not part of the results fragment)
+        context['suppliers'] = []
+        if not self.fragment:
+            try:
+                from suppliers.models import Supplier
+                context['suppliers'] = Supplier.objects.all()
+            except Exception:
+                pass
         
         # Add search query to context (prefer 'q')
         context['search_query'] = self.request.GET.get('q', self.request.GET.get('search', ''))
@@ -620,37 +628,58 @@ def update_order_status(request, pk):
     return redirect('orders:order_detail', pk=order.pk)
 
 
+MAX_DETAILS_IDS = 100
+
+
+def _details_response(request, versions, payload):
+    """
+    JsonResponse for product details with ETag/Last-Modified from updated_at;
+    304 when the browser's copy is still current.
+    """
+    etag = product_details.etag_for(versions)
+    last_modified = int(max(versions.values()).timestamp()) if versions else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(payload() if callable(payload) else payload)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Private: behind login; max-age lets the order form reuse it without asking
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'PRODUCT_DETAILS_MAX_AGE', 60))
+    return response
+
+
 @login_required
+@require_http_methods(["GET"])
 def get_product_details(request, product_id):
+    versions = product_details.versions([product_id])
+    if not versions:
+        return JsonResponse({'success': False, 'error': 'Product not found'})
+    return _details_response(
+        request, versions,
+        lambda: {'success': True, **product_details.details_for(versions)[product_id]},
+    )
+
+
+@login_required
+@require_http_methods(["GET"])
+def get_products_details(request):
+    """Details of many products in one call: ?ids=1,2,3 -> {"products": {"1": {...}, ...}}."""
     try:
-        product = Product.objects.get(id=product_id)
-        colors = [{'id': c.id, 'name': c.name} for c in product.colors.all()]
-        sizes = [{'id': s.id, 'name': s.name} for s in product.sizes.all()]
-        # Safe image URL handling for local/dev without Cloudinary config
-        image_url = ''
-        if product.image:
-            try:
-                image_url = product.image.url
-            except Exception:
-                name = getattr(product.image, 'name', '')
-                if name:
-                    from django.conf import settings
-                    base = getattr(settings, 'MEDIA_URL', '/media/')
-                    if not base.endswith('/'):
-                        base += '/'
-                    image_url = f"{base}{name}"
-
-        return JsonResponse({
+        ids = sorted({int(x) for x in request.GET.get('ids', '').split(',') if x.strip()})
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid ids'}, status=400)
+    if len(ids) > MAX_DETAILS_IDS:
+        return JsonResponse({'success': False, 'error': f'At most {MAX_DETAILS_IDS} ids'}, status=400)
+    versions = product_details.versions(ids) if ids else {}
+    # Unknown ids are simply missing from "products"
+    return _details_response(
+        request, versions,
+        lambda: {
             'success': True,
-            'colors': colors,
-            'sizes': sizes,
-            'price': str(product.price),
-            'code': product.code,
-            'supplier': product.supplier.name if product.supplier else '',
-            'image_url': image_url
-        })
-    except Product.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Product not found'})
+            'products': {str(pk): data for pk, data in product_details.details_for(versions).items()},
+        },
+    )
 
 
 @login_required
@@ -674,8 +703,14 @@ def bulk_update_order_status(request):
         messages.error(request, 'Trạng thái không hợp lệ')
         return redirect(return_to or redirect_target)
     try:
-        # Cập nhật cả status và updated_at cho tất cả đơn hàng được chọn
-        updated = Order.objects.filter(id__in=ids).update(status=new_status, updated_at=timezone.now())
+        # Cập nhật cả status và updated_at cho tất cả đơn hàng được chọn; lưu
+        # từng đơn để orders.signals đếm chuyển trạng thái và làm mới thống kê
+        with transaction.atomic():
+            selected = list(Order.objects.filter(id__in=ids))
+            for order in selected:
+                order.status = new_status
+                order.save(update_fields=['status', 'updated_at'])
+        updated = len(selected)
         messages.success(request, f'Đã cập nhật trạng thái {updated} đơn hàng.')
     except Exception:
         messages.error(request, 'Không thể cập nhật trạng thái. Vui lòng thử lại.')
@@ -0,0 +1,121 @@
+"""
+Colours and sizes on top of the shared ``AttributeValue`` dictionary.
+
+A product's ``Color``/``Size`` rows each point at the canonical value for
+their name (``attribute_key``: case- and diacritic-insensitive), so "trắng"
+typed on one product reuses the "Trắng" of another. ``Variant`` holds the
+resulting colour × size matrix per product and is rebuilt from those rows.
+"""
+from itertools import product as cross
+
+from .models import AttributeValue, Variant, attribute_key
+
+
+def values_for(kind, names):
+    """{key: AttributeValue} for ``names``, creating the missing ones (first spelling wins)."""
+    wanted = {}
+    for name in names:
+        name = " ".join(str(name).split())
+        key = attribute_key(name)
+        if key:
+            wanted.setdefault(key, name)
+    if not wanted:
+        return {}
+    found = {v.key: v for v in AttributeValue.objects.filter(kind=kind, key__in=wanted)}
+    missing = [AttributeValue(kind=kind, key=key, name=name) for key, name in wanted.items() if key not in found]
+    if missing:
+        AttributeValue.objects.bulk_create(missing, ignore_conflicts=True)
+        # Re-read: ignore_conflicts leaves pks unset, and another request may have won the race
+        found.update(
+            (v.key, v) for v in AttributeValue.objects.filter(kind=kind, key__in=[m.key for m in missing])
+        )
+    return found
+
+
+def sync_options(product, model, kind, current, names):
+    """
+    Make the product's ``model`` rows (Color or Size) match ``names``: one
+    delete and one insert. ``current`` is the rows already loaded. Returns
+    the value ids the product ends up with.
+    """
+    current_by_key = {attribute_key(row.name): row for row in current}
+    new_keys = {attribute_key(name) for name in names} - {""}
+    removed = [row.pk for key, row in current_by_key.items() if key not in new_keys]
+    if removed:
+        model.objects.filter(pk__in=removed).delete()
+    value_ids = {row.value_id for key, row in current_by_key.items() if key in new_keys}
+    added = [name for name in names if attribute_key(name) not in current_by_key]
+    if added:
+        values = values_for(kind, added).values()
+        model.objects.bulk_create(
+            [model(product=product, value=value, name=value.name) for value in values],
+            ignore_conflicts=True,
+        )
+        value_ids.update(value.pk for value in values)
+    return value_ids
+
+
+def sync_variants(product, color_ids, size_ids):
+    """Rebuild the product's Variant rows as colour × size (None for a missing side)."""
+    wanted = set(cross(sorted(color_ids) or [None], sorted(size_ids) or [None])) - {(None, None)}
+    existing = {
+        (color_id, size_id): pk
+        for pk, color_id, size_id in Variant.objects.filter(product=product).values_list("pk", "color_id", "size_id")
+    }
+    stale = [pk for pair, pk in existing.items() if pair not in wanted]
+    if stale:
+        Variant.objects.filter(pk__in=stale).delete()
+    missing = wanted - existing.keys()
+    if missing:
+        Variant.objects.bulk_create(
+            [Variant(product=product, color_id=c, size_id=s) for c, s in sorted(missing, key=str)],
+            ignore_conflicts=True,
+        )
+
+
+def sales_by_attribute(kind, start=None, end=None):
+    """
+    One row per colour or size value across all products: how many products
+    offer it (Variant) and the non-cancelled orders, quantity and net revenue
+    (amount × sale_price − discount) between the ``start``/``end`` datetimes.
+    Groups on the indexed value ids; names are joined in Python.
+    """
+    from django.db.models import Count, F, IntegerField, Sum
+    from django.db.models.functions import Coalesce
+
+    from orders.models import Order
+
+    orders = Order.objects.exclude(status="cancelled").filter(**{f"{kind}__isnull": False})
+    if start is not None:
+        orders = orders.filter(created_at__gte=start)
+    if end is not None:
+        orders = orders.filter(created_at__lt=end)
+    sales = {
+        row["value_id"]: row
+        for row in orders.values(value_id=F(f"{kind}__value")).annotate(
+            order_count=Count("id"),
+            quantity=Coalesce(Sum("amount"), 0),
+            revenue=Coalesce(
+                Sum(F("amount") * Coalesce("sale_price", 0) - Coalesce("discount", 0), output_field=IntegerField()),
+                0,
+            ),
+        )
+    }
+    offered = dict(
+        Variant.objects.filter(**{f"{kind}__isnull": False})
+        .values_list(kind)
+        .annotate(product_count=Count("product", distinct=True))
+    )
+
+    rows = []
+    for value in AttributeValue.objects.filter(kind=kind):
+        sale = sales.get(value.pk, {})
+        rows.append({
+            "value": value,
+            "product_count": offered.get(value.pk, 0),
+            "order_count": sale.get("order_count", 0),
+            "quantity": sale.get("quantity", 0),
+            "revenue": sale.get("revenue", 0),
+        })
+    rows.sort(key=lambda r: (-r["revenue"], -r["quantity"], r["value"].name))
+    return rows
@@ -0,0 +1,98 @@
+"""
+Product details for the order form (colours, sizes, price, image).
+
+Entries are cached per product under ``product-details:<id>`` together with
+the ``updated_at`` they were built from; an entry is only used while it still
+matches the product's current ``updated_at``, so a saved product never serves
+old details even if the delete in ``signals.py`` was missed (another process,
+a ``QuerySet.update``). Colours and sizes are edited through ``ProductForm``,
+which saves the product in the same transaction; saving a supplier bumps its
+products' ``updated_at`` for the supplier name.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core import perf
+from core.templatetags.media_extras import safe_image_url
+
+from .models import Product
+
+KEY_PREFIX = "product-details:"
+
+
+def _cache():
+    return caches[getattr(settings, "PRODUCT_DETAILS_CACHE_ALIAS", "default")]
+
+
+def cache_key(product_id):
+    return f"{KEY_PREFIX}{product_id}"
+
+
+def invalidate(product_id):
+    _cache().delete(cache_key(product_id))
+
+
+def versions(product_ids):
+    """{id: updated_at} for the existing products among ``product_ids`` (one query)."""
+    return dict(
+        Product.objects.filter(pk__in=product_ids).order_by().values_list("pk", "updated_at")
+    )
+
+
+def etag_for(versions):
+    """Strong ETag over the (id, updated_at) pairs of a response."""
+    raw = ";".join(f"{pk}:{versions[pk].isoformat()}" for pk in sorted(versions))
+    return '"%s"' % hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def build(product):
+    return {
+        "colors": [{"id": c.id, "name": c.name} for c in product.colors.all()],
+        "sizes": [{"id": s.id, "name": s.name} for s in product.sizes.all()],
+        "price": str(product.price),
+        "code": product.code,
+        "supplier": product.supplier.name if product.supplier else "",
+        "image_url": safe_image_url(product.image),
+    }
+
+
+def details_for(versions):
+    """
+    {id: details} for the products in ``versions`` ({id: updated_at}).
+
+    Fresh cache entries are reused; the rest are built in one batch (product,
+    colour and size queries whatever the number of products) and cached.
+    """
+    cache = _cache()
+    timeout = getattr(settings, "PRODUCT_DETAILS_CACHE_TIMEOUT", 3600)
+    keys = {pk: cache_key(pk) for pk in versions}
+    cached = cache.get_many(keys.values()) if timeout > 0 else {}
+
+    result, missing = {}, []
+    for pk, version in versions.items():
+        entry = cached.get(keys[pk])
+        if entry and entry["version"] == version.isoformat():
+            result[pk] = entry["data"]
+        else:
+            missing.append(pk)
+        perf.record_cache(pk in result)
+    if not missing:
+        return result
+
+    products = (
+        Product.objects.filter(pk__in=missing)
+        .select_related("supplier")
+        .prefetch_related("colors", "sizes")
+    )
+    fresh = {}
+    for product in products:
+        data = build(product)
+        result[product.pk] = data
+        # Version from the row just read: if it changed since versions() the
+        # entry is simply rebuilt next time
+        fresh[keys[product.pk]] = {"version": product.updated_at.isoformat(), "data": data}
+    if fresh and timeout > 0:
+        cache.set_many(fresh, timeout)
+    return result
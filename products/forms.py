@@ -1,5 +1,8 @@
 from django import forms
-from .models import Product
+from django.db import transaction
+
+from . import attributes
+from .models import AttributeValue, Color, Product, Size
 
 class ProductForm(forms.ModelForm):
     code = forms.CharField(
@@ -71,10 +74,17 @@ class ProductForm(forms.ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Set initial values for colors and sizes if editing
+        # Rows currently saved; .all() uses the view's prefetch_related and
+        # save() diffs against these instead of querying again
+        self.current_options = {'colors': [], 'sizes': []}
         if self.instance.pk:
-            self.fields['colors'].initial = ', '.join([color.name for color in self.instance.colors.all()])
-            self.fields['sizes'].initial = ', '.join([size.name for size in self.instance.sizes.all()])
+            self.current_options = {
+                'colors': list(self.instance.colors.all()),
+                'sizes': list(self.instance.sizes.all()),
+            }
+            # Set initial values for colors and sizes if editing
+            self.fields['colors'].initial = ', '.join(c.name for c in self.current_options['colors'])
+            self.fields['sizes'].initial = ', '.join(s.name for s in self.current_options['sizes'])
     
     def clean_colors(self):
         colors = self.cleaned_data.get('colors', '')
@@ -89,33 +99,21 @@ class ProductForm(forms.ModelForm):
         return sizes_list
     
     def save(self, commit=True):
-        # Save the product first
-        product = super().save(commit=commit)
-        
-        # Handle colors and sizes
-        if commit:
-            # Update colors
-            current_colors = set(product.colors.values_list('name', flat=True))
-            new_colors = set(self.cleaned_data['colors'])
-            
-            # Remove old colors not in new colors
-            for color in current_colors - new_colors:
-                product.colors.filter(name=color).delete()
-            
-            # Add new colors
-            for color in new_colors - current_colors:
-                product.colors.create(name=color)
-            
-            # Update sizes
-            current_sizes = set(product.sizes.values_list('name', flat=True))
-            new_sizes = set(self.cleaned_data['sizes'])
-            
-            # Remove old sizes not in new sizes
-            for size in current_sizes - new_sizes:
-                product.sizes.filter(name=size).delete()
-            
-            # Add new sizes
-            for size in new_sizes - current_sizes:
-                product.sizes.create(name=size)
-        
+        if not commit:
+            return super().save(commit=False)
+
+        with transaction.atomic():
+            product = super().save()
+            color_ids = self._sync_options(product, 'colors', Color, AttributeValue.COLOR)
+            size_ids = self._sync_options(product, 'sizes', Size, AttributeValue.SIZE)
+            attributes.sync_variants(product, color_ids, size_ids)
         return product
+
+    def _sync_options(self, product, field, model, kind):
+        """Make product.<field> match the submitted names (same value = same colour/size)."""
+        value_ids = attributes.sync_options(
+            product, model, kind, self.current_options[field], self.cleaned_data[field]
+        )
+        # Drop the prefetched rows so later reads see the new set
+        getattr(product, '_prefetched_objects_cache', {}).pop(field, None)
+        return value_ids
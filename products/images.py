@@ -0,0 +1,93 @@
+"""
+Product image pipeline used when ``settings.PRODUCT_IMAGE_ASYNC`` is on.
+
+The view keeps the uploaded file out of ``Product.save()`` (which would
+upload to Cloudinary inside the request), stages the bytes in
+``ProductImageUpload`` and queues ``products.process_image``. The job
+normalises the image with Pillow and publishes it to Cloudinary, or, without
+``CLOUDINARY_URL``, to local MEDIA_ROOT so the flow works offline.
+"""
+import io
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+
+def async_enabled():
+    return getattr(settings, "PRODUCT_IMAGE_ASYNC", False)
+
+
+def take_upload(form):
+    """
+    Detach a newly uploaded image from the form's instance (restoring the
+    current image) so saving the product does not upload it. Returns the file.
+    """
+    if not async_enabled():
+        return None
+    uploaded = form.cleaned_data.get("image")
+    if not isinstance(uploaded, UploadedFile):
+        return None
+    form.instance.image = form.initial.get("image")
+    return uploaded
+
+
+def stage(product, uploaded, user=None):
+    """Store the raw upload and queue the processing job; returns the Job."""
+    from jobs.queue import enqueue
+
+    from .models import ProductImageUpload
+
+    if hasattr(uploaded, "seek"):
+        uploaded.seek(0)
+    staged = ProductImageUpload.objects.create(
+        product=product,
+        filename=os.path.basename(uploaded.name or "image"),
+        content_type=getattr(uploaded, "content_type", "") or "",
+        data=uploaded.read(),
+    )
+    return enqueue("products.process_image", args={"upload_id": staged.pk}, priority=5, user=user)
+
+
+def normalize(data):
+    """
+    Apply the EXIF orientation, drop all metadata and shrink to
+    PRODUCT_IMAGE_MAX_SIZE. Returns (bytes, extension).
+    """
+    max_size = getattr(settings, "PRODUCT_IMAGE_MAX_SIZE", 1600)
+    quality = getattr(settings, "PRODUCT_IMAGE_QUALITY", 85)
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        out = io.BytesIO()
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            # Keep transparency; a fresh image carries no EXIF/ICC/text chunks
+            clean = Image.new("RGBA", img.size)
+            clean.paste(img.convert("RGBA"))
+            clean.save(out, format="PNG", optimize=True)
+            return out.getvalue(), "png"
+        clean = Image.new("RGB", img.size)
+        clean.paste(img.convert("RGB"))
+        clean.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        return out.getvalue(), "jpg"
+
+
+def local_storage():
+    return FileSystemStorage(location=settings.MEDIA_ROOT)
+
+
+def publish(data, ext):
+    """Upload processed bytes; returns the value to store in Product.image."""
+    if getattr(settings, "USE_CLOUDINARY", False):
+        from cloudinary import uploader
+
+        resource = uploader.upload_resource(io.BytesIO(data), type="upload", resource_type="image")
+        return resource.get_prep_value()
+    # Offline stand-in: MEDIA_ROOT/products/<uuid>.<ext>, served via MEDIA_URL
+    name = local_storage().save(f"products/{uuid.uuid4().hex}.{ext}", ContentFile(data))
+    return name
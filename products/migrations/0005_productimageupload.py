@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_purchase_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductImageUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('data', models.BinaryField()),
+                ('status', models.CharField(choices=[('pending', 'Đang xử lý'), ('done', 'Hoàn thành'), ('failed', 'Lỗi')], default='pending', max_length=20)),
+                ('result', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_uploads', to='products.product')),
+            ],
+        ),
+    ]
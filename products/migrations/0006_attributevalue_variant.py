@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_productimageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttributeValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('color', 'Màu sắc'), ('size', 'Kích thước')], max_length=10)),
+                ('key', models.CharField(editable=False, max_length=200)),
+                ('name', models.CharField(max_length=200)),
+            ],
+            options={
+                'ordering': ['kind', 'name'],
+                'unique_together': {('kind', 'key')},
+            },
+        ),
+        migrations.AddField(
+            model_name='color',
+            name='value',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='colors', to='products.attributevalue'),
+        ),
+        migrations.AddField(
+            model_name='size',
+            name='value',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sizes', to='products.attributevalue'),
+        ),
+        migrations.CreateModel(
+            name='Variant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('color', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='color_variants', to='products.attributevalue')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='products.product')),
+                ('size', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='size_variants', to='products.attributevalue')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['color', 'size'], name='products_variant_color_size'), models.Index(fields=['size', 'color'], name='products_variant_size_color')],
+                'unique_together': {('product', 'color', 'size')},
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+"""
+Point every Color/Size at a shared AttributeValue and build the Variant
+matrix. Rows of one product whose names only differ in case, diacritics or
+spacing ("Trắng", "trắng", "Trang") are merged into the oldest one, with
+Order.color/Order.size repointed first; the most common spelling becomes the
+canonical name. Not reversible (merged rows stay merged).
+"""
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import product as cross
+
+from django.db import migrations
+
+BATCH = 500
+
+
+def attribute_key(name):
+    # Frozen copy of products.models.attribute_key
+    text = unicodedata.normalize("NFD", str(name).replace("đ", "d").replace("Đ", "D"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+def chunks(items, size=BATCH):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def link_values(apps, schema_editor):
+    AttributeValue = apps.get_model("products", "AttributeValue")
+    Variant = apps.get_model("products", "Variant")
+    Order = apps.get_model("orders", "Order")
+
+    value_ids = {}
+    for kind, model_name in (("color", "Color"), ("size", "Size")):
+        model = apps.get_model("products", model_name)
+        rows = [
+            (pk, product_id, " ".join(name.split()))
+            for pk, product_id, name in model.objects.order_by("pk").values_list("pk", "product_id", "name")
+        ]
+
+        spellings = defaultdict(Counter)
+        for _pk, _product_id, name in rows:
+            spellings[attribute_key(name)][name] += 1
+        AttributeValue.objects.bulk_create(
+            [AttributeValue(kind=kind, key=key, name=names.most_common(1)[0][0]) for key, names in spellings.items()],
+            batch_size=BATCH,
+        )
+        values = {v.key: v for v in AttributeValue.objects.filter(kind=kind)}
+
+        survivors = {}
+        duplicates = defaultdict(list)
+        for pk, product_id, name in rows:
+            survivor = survivors.setdefault((product_id, attribute_key(name)), pk)
+            if survivor != pk:
+                duplicates[survivor].append(pk)
+        for survivor, pks in duplicates.items():
+            Order.objects.filter(**{f"{kind}_id__in": pks}).update(**{f"{kind}_id": survivor})
+            model.objects.filter(pk__in=pks).delete()
+
+        by_key = defaultdict(list)
+        for (_product_id, key), pk in survivors.items():
+            by_key[key].append(pk)
+        for key, pks in by_key.items():
+            value = values[key]
+            for batch in chunks(pks):
+                model.objects.filter(pk__in=batch).update(value=value, name=value.name)
+
+        value_ids[kind] = defaultdict(set)
+        for (product_id, key) in survivors:
+            value_ids[kind][product_id].add(values[key].pk)
+
+    colors, sizes = value_ids["color"], value_ids["size"]
+    variants = [
+        Variant(product_id=product_id, color_id=color_id, size_id=size_id)
+        for product_id in set(colors) | set(sizes)
+        for color_id, size_id in cross(sorted(colors[product_id]) or [None], sorted(sizes[product_id]) or [None])
+    ]
+    Variant.objects.bulk_create(variants, batch_size=BATCH)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_attributevalue_variant'),
+        ('orders', '0005_order_sale_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_values, migrations.RunPython.noop),
+    ]
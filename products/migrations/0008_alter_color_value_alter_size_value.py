@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_link_attribute_values'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='color',
+            name='value',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='colors', to='products.attributevalue'),
+        ),
+        migrations.AlterField(
+            model_name='size',
+            name='value',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sizes', to='products.attributevalue'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='color',
+            unique_together={('product', 'name'), ('product', 'value')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='size',
+            unique_together={('product', 'name'), ('product', 'value')},
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import BigIntegerField, Count, F, IntegerField, Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductStats = apps.get_model("products", "ProductStats")
+    live = ~Q(orders__status="cancelled")
+    rows = (
+        Product.objects.order_by()
+        .values("pk")
+        .annotate(
+            order_count=Count("orders"),
+            units=Coalesce(Sum("orders__amount", filter=live), 0, output_field=IntegerField()),
+            revenue=Coalesce(
+                Sum(F("orders__amount") * Coalesce("orders__sale_price", 0), filter=live, output_field=BigIntegerField()),
+                0,
+                output_field=BigIntegerField(),
+            ),
+            discount=Coalesce(Sum("orders__discount", filter=live), 0, output_field=BigIntegerField()),
+            last_order_at=Max("orders__created_at"),
+        )
+    )
+    ProductStats.objects.bulk_create(
+        (ProductStats(product_id=row.pop("pk"), **row) for row in rows.iterator()), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_alter_color_value_alter_size_value'),
+        ('orders', '0005_order_sale_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='products.product')),
+                ('order_count', models.IntegerField(db_index=True, default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(db_index=True, default=0)),
+                ('discount', models.BigIntegerField(default=0)),
+                ('last_order_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import unicodedata
+
 from django.db import models
 from cloudinary.models import CloudinaryField
 from core.utils import generate_code
@@ -35,17 +37,123 @@ class Product(models.Model):
         return self.supplier.name if self.supplier else None
 
 
+def attribute_key(name):
+    """Khoá so khớp cho tên màu/size: bỏ dấu, không phân biệt hoa thường ("Trắng", "trắng", "TRANG" -> "trang")."""
+    text = unicodedata.normalize("NFD", str(name).replace("đ", "d").replace("Đ", "D"))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.casefold().split())
+
+
+class AttributeValue(models.Model):
+    """
+    Từ điển màu/size dùng chung cho mọi sản phẩm. Color/Size của từng sản
+    phẩm trỏ về đây nên các cách viết khác nhau của cùng một giá trị gộp làm
+    một, và báo cáo chéo sản phẩm nhóm theo id thay vì theo chuỗi.
+    """
+    COLOR = "color"
+    SIZE = "size"
+    KIND_CHOICES = [
+        (COLOR, "Màu sắc"),
+        (SIZE, "Kích thước"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=200, editable=False)
+    name = models.CharField(max_length=200)
+
+    class Meta:
+        unique_together = ("kind", "key")
+        ordering = ["kind", "name"]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.key = attribute_key(self.name)
+        super().save(*args, **kwargs)
+
+
 class Color(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="colors")
-    name = models.CharField(max_length=200)
+    value = models.ForeignKey(AttributeValue, on_delete=models.PROTECT, related_name="colors")
+    name = models.CharField(max_length=200)  # = value.name
 
     class Meta:
-        unique_together = ("product", "name")
+        unique_together = [("product", "name"), ("product", "value")]
 
 
 class Size(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="sizes")
-    name = models.CharField(max_length=200)
+    value = models.ForeignKey(AttributeValue, on_delete=models.PROTECT, related_name="sizes")
+    name = models.CharField(max_length=200)  # = value.name
+
+    class Meta:
+        unique_together = [("product", "name"), ("product", "value")]
+
+
+class Variant(models.Model):
+    """
+    Một ô của ma trận màu × size của sản phẩm (màu hoặc size để trống khi sản
+    phẩm không có thuộc tính đó). Do products.attributes.sync_variants dựng
+    lại từ Color/Size; dùng cho các truy vấn chéo sản phẩm kiểu "bao nhiêu sản
+    phẩm có size XL".
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="variants")
+    color = models.ForeignKey(
+        AttributeValue, on_delete=models.PROTECT, related_name="color_variants", blank=True, null=True
+    )
+    size = models.ForeignKey(
+        AttributeValue, on_delete=models.PROTECT, related_name="size_variants", blank=True, null=True
+    )
 
     class Meta:
-        unique_together = ("product", "name")
+        unique_together = ("product", "color", "size")
+        indexes = [
+            models.Index(fields=["color", "size"], name="products_variant_color_size"),
+            models.Index(fields=["size", "color"], name="products_variant_size_color"),
+        ]
+
+
+class ProductStats(models.Model):
+    """
+    Số liệu đơn hàng của từng sản phẩm, cập nhật khi đơn được ghi (xem
+    products.stats) để danh sách sản phẩm sắp xếp/lọc theo cột có index thay
+    vì gộp toàn bộ đơn hàng mỗi lần tải trang. Số đơn tính cả đơn hủy; số
+    lượng, doanh thu (amount × sale_price) và chiết khấu thì không.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    order_count = models.IntegerField(default=0, db_index=True)
+    units = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0, db_index=True)
+    discount = models.BigIntegerField(default=0)
+    last_order_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.order_count} đơn"
+
+
+class ProductImageUpload(models.Model):
+    """
+    Ảnh sản phẩm chờ xử lý nền (PRODUCT_IMAGE_ASYNC): bytes gốc được lưu tạm
+    trong DB để web và worker không cần chung ổ đĩa; job products.process_image
+    thu nhỏ, bỏ EXIF, tải lên và gán vào Product.image.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Đang xử lý"),
+        ("done", "Hoàn thành"),
+        ("failed", "Lỗi"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="image_uploads")
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    data = models.BinaryField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    result = models.CharField(max_length=255, blank=True)  # stored image value after processing
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.product} - {self.filename} ({self.status})"
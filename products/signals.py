@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from suppliers.models import Supplier
+
+from . import details, stats
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+def create_product_stats(sender, instance, created, **kwargs):
+    # Every product has a stats row so list sorting never meets NULLs
+    if created:
+        stats.refresh_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def drop_cached_details(sender, instance, **kwargs):
+    # On commit: colours/sizes are synced after the product row in ProductForm.save
+    pk = instance.pk
+    transaction.on_commit(lambda: details.invalidate(pk), using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=Supplier)
+def touch_supplier_products(sender, instance, created, **kwargs):
+    # Product details, list rows and bills show the supplier name and are
+    # versioned by Product.updated_at (Supplier.updated_at never changes)
+    if not created:
+        Product.objects.filter(supplier=instance).update(updated_at=timezone.now())
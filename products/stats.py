@@ -0,0 +1,88 @@
+"""
+Upkeep of ``ProductStats``.
+
+Every order write marks its product(s) for a refresh that runs once, on
+commit, for all products touched by the transaction: one GROUP BY over those
+products' orders and one upsert. Recomputing per product (instead of adding
+deltas) keeps the rows right whatever the write was: status change, product
+change, cascade delete. Writes that bypass ``Order.save()`` (``QuerySet.update``,
+``bulk_create``) call ``refresh_on_commit``/``refresh`` themselves;
+``manage.py rebuild_product_stats`` recomputes everything.
+"""
+import weakref
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, F, IntegerField, Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Product, ProductStats
+
+BATCH = 500
+FIELDS = ["order_count", "units", "revenue", "discount", "last_order_at"]
+
+
+def refresh(product_ids):
+    """Recompute the stats rows of these products from their orders."""
+    ids = sorted({pk for pk in product_ids if pk is not None})
+    for start in range(0, len(ids), BATCH):
+        _refresh_batch(ids[start:start + BATCH])
+
+
+def _refresh_batch(ids):
+    live = ~Q(orders__status="cancelled")
+    # From Product so deleted products drop out and order-less ones get zeros
+    rows = (
+        Product.objects.filter(pk__in=ids)
+        .order_by()
+        .values("pk")
+        .annotate(
+            order_count=Count("orders"),
+            units=Coalesce(Sum("orders__amount", filter=live), 0, output_field=IntegerField()),
+            revenue=Coalesce(
+                Sum(F("orders__amount") * Coalesce("orders__sale_price", 0), filter=live, output_field=BigIntegerField()),
+                0,
+                output_field=BigIntegerField(),
+            ),
+            discount=Coalesce(Sum("orders__discount", filter=live), 0, output_field=BigIntegerField()),
+            last_order_at=Max("orders__created_at"),
+        )
+    )
+    stats = [ProductStats(product_id=row.pop("pk"), **row) for row in rows]
+    if stats:
+        ProductStats.objects.bulk_create(
+            stats, update_conflicts=True, unique_fields=["product"], update_fields=FIELDS + ["updated_at"],
+        )
+
+
+class _PendingRefresh:
+    def __init__(self):
+        self.product_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        refresh(self.product_ids)
+
+
+def refresh_on_commit(product_ids, using=None):
+    """Refresh these products once the current transaction commits (right away outside one)."""
+    ids = {pk for pk in product_ids if pk is not None}
+    if not ids:
+        return
+    connection = transaction.get_connection(using)
+    # One callback per transaction; later writes add their products to it.
+    # The connection only holds a weak reference: a rollback drops the
+    # callback, and with it the pending ids, so the next write queues afresh.
+    ref = getattr(connection, "_product_stats_pending", None)
+    pending = ref() if ref is not None else None
+    if pending is not None and not pending.done and connection.in_atomic_block:
+        pending.product_ids.update(ids)
+        return
+    pending = _PendingRefresh()
+    pending.product_ids.update(ids)
+    connection._product_stats_pending = weakref.ref(pending)
+    transaction.on_commit(pending, using=using)
+
+
+def refresh_all():
+    refresh(Product.objects.values_list("pk", flat=True))
@@ -0,0 +1,29 @@
+from django.utils import timezone
+
+from jobs.queue import task
+
+from . import images
+from .models import Product, ProductImageUpload
+
+
+@task("products.process_image")
+def process_image(job, upload_id):
+    staged = ProductImageUpload.objects.select_related("product").get(pk=upload_id)
+    job.set_progress(10, "Đang xử lý ảnh")
+    try:
+        data, ext = images.normalize(bytes(staged.data))
+        job.set_progress(50, "Đang tải ảnh lên")
+        value = images.publish(data, ext)
+    except Exception as exc:
+        ProductImageUpload.objects.filter(pk=staged.pk).update(status="failed", error=str(exc))
+        raise
+
+    # Only the newest upload for the product may replace its image
+    newest = ProductImageUpload.objects.filter(product_id=staged.product_id).order_by("-pk").values_list("pk", flat=True).first()
+    if newest == staged.pk:
+        Product.objects.filter(pk=staged.product_id).update(image=value, updated_at=timezone.now())
+    # Raw bytes are no longer needed
+    ProductImageUpload.objects.filter(pk=staged.pk).update(
+        status="done", result=value, data=b"", processed_at=timezone.now(),
+    )
+    return {"product_id": staged.product_id, "image": value, "applied": newest == staged.pk}
@@ -1,3 +1,320 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from accounts.models import User
+from customers.models import Customer
+from jobs import queue
+from jobs.models import Job
+from orders.models import Order
+from suppliers.models import Supplier
+
+from . import attributes as product_attributes
+from . import details as product_details
+from . import images
+from . import stats as product_stats
+from .models import AttributeValue, Product, ProductImageUpload, ProductStats, Variant
+
+
+def jpeg_bytes(size=(400, 200), orientation=None):
+    img = Image.new("RGB", size, "red")
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    exif[0x010F] = "Camera"  # Make
+    out = io.BytesIO()
+    img.save(out, format="JPEG", exif=exif.tobytes())
+    return out.getvalue()
+
+
+class ImageUploadJobTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(
+            PRODUCT_IMAGE_ASYNC=True, PRODUCT_IMAGE_MAX_SIZE=100, USE_CLOUDINARY=False, MEDIA_ROOT=media.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media = media.name
+        self.user = User.objects.create_user(username="u", password="x", is_approved=True)
+        self.client.force_login(self.user)
+
+    def test_upload_is_processed_by_the_worker(self):
+        upload = SimpleUploadedFile("anh.jpg", jpeg_bytes(orientation=6), content_type="image/jpeg")
+        response = self.client.post(reverse("products:product_create"), {
+            "name": "Áo", "price": 100000, "purchase_price": 50000, "image": upload,
+        })
+        self.assertEqual(response.status_code, 302)
+
+        # The request only stages the file and queues the job
+        product = Product.objects.get(name="Áo")
+        self.assertFalse(product.image)
+        staged = ProductImageUpload.objects.get(product=product)
+        self.assertEqual((staged.status, staged.filename), ("pending", "anh.jpg"))
+        job = Job.objects.get(name="products.process_image")
+        self.assertEqual((job.args, job.created_by), ({"upload_id": staged.pk}, self.user))
+
+        self.assertTrue(queue.run(queue.claim("w1")))
+        product.refresh_from_db()
+        staged.refresh_from_db()
+        self.assertEqual((staged.status, bytes(staged.data)), ("done", b""))
+        self.assertEqual(product.image.format, "jpg")
+        name = f"{product.image.public_id}.jpg"
+        self.assertTrue(name.startswith("products/"), name)
+        with Image.open(os.path.join(self.media, name)) as stored:
+            # Rotated by the EXIF orientation, shrunk, metadata dropped
+            self.assertEqual(stored.size, (50, 100))
+            self.assertEqual(len(stored.getexif()), 0)
+
+    def test_only_newest_upload_is_applied(self):
+        product = Product.objects.create(name="P", price=1)
+        older = images.stage(product, SimpleUploadedFile("a.jpg", jpeg_bytes()))
+        newer = images.stage(product, SimpleUploadedFile("b.png", jpeg_bytes()))
+        self.assertEqual(newer.priority, 5)
+
+        self.assertTrue(queue.run(Job.objects.get(pk=newer.pk)))
+        applied = str(Product.objects.get(pk=product.pk).image)
+        self.assertTrue(queue.run(Job.objects.get(pk=older.pk)))
+        self.assertEqual(str(Product.objects.get(pk=product.pk).image), applied)
+        self.assertEqual(Job.objects.get(pk=older.pk).result["applied"], False)
+
+
+class ProductVariantSyncTests(TestCase):
+    """Editing a product's colours/sizes runs the same queries however many there are."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="admin", password="x", account_type="admin", is_approved=True, is_staff=True
+        )
+
+    def edit(self, product, colors, sizes):
+        url = reverse("products:product_update", kwargs={"pk": product.pk})
+        data = {"code": product.code, "name": product.name, "price": 100, "purchase_price": 0,
+                "colors": ", ".join(colors), "sizes": ", ".join(sizes)}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        return len(ctx.captured_queries)
+
+    def names(self, product):
+        return (sorted(product.colors.values_list("name", flat=True)),
+                sorted(product.sizes.values_list("name", flat=True)))
+
+    def test_sync_and_query_count(self):
+        self.client.force_login(self.user)
+        counts = []
+        for n in (5, 30):
+            product = Product.objects.create(name=f"P{n}", price=100)
+            old = [f"C{i:02}" for i in range(n)]
+            self.assertLess(self.edit(product, old, old), 30)
+            new = old[n // 2:] + [f"N{i:02}" for i in range(n)]
+            counts.append(self.edit(product, new, new[:3]))
+            self.assertEqual(self.names(product), (sorted(new), sorted(new[:3])))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_spellings_share_one_value(self):
+        self.client.force_login(self.user)
+        first = Product.objects.create(name="A", price=100)
+        second = Product.objects.create(name="B", price=100)
+        self.edit(first, ["Trắng", "Đỏ"], ["XL"])
+        self.edit(second, ["trắng ", "TRANG", "đỏ"], [])
+        self.assertEqual(self.names(second), (["Trắng", "Đỏ"], []))
+        colors = AttributeValue.objects.filter(kind=AttributeValue.COLOR)
+        self.assertEqual(sorted(colors.values_list("name", flat=True)), ["Trắng", "Đỏ"])
+        self.assertEqual(Variant.objects.filter(product=first).count(), 2)
+        self.assertEqual(
+            set(Variant.objects.filter(product=second).values_list("color__name", "size")),
+            {("Trắng", None), ("Đỏ", None)},
+        )
+        self.edit(first, ["Trắng"], [])
+        self.assertEqual(list(Variant.objects.filter(product=first).values_list("color__name", "size")), [("Trắng", None)])
+
+
+class ProductStatsTests(TestCase):
+    """ProductStats follows every kind of order write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="admin", password="x", account_type="admin", is_approved=True, is_staff=True
+        )
+        cls.customer = Customer.objects.create(code="KH-TEST-001", name="Khách")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a = Product.objects.create(name="A", price=100)
+            self.b = Product.objects.create(name="B", price=50)
+
+    def committed(self):
+        # Stats are refreshed on commit
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def snapshot(self):
+        return {
+            s.product_id: (s.order_count, s.units, s.revenue, s.discount, s.last_order_at)
+            for s in ProductStats.objects.order_by("product_id")
+        }
+
+    def assertFresh(self):
+        kept = self.snapshot()
+        product_stats.refresh_all()
+        self.assertEqual(kept, self.snapshot())
+        return kept
+
+    def test_follows_order_writes(self):
+        self.assertEqual(self.assertFresh()[self.a.pk], (0, 0, 0, 0, None))
+        with self.committed():
+            first = Order.objects.create(customer=self.customer, product=self.a, amount=2, sale_price=90, discount=5)
+            Order.objects.create(customer=self.customer, product=self.a, amount=1)
+        stats = self.assertFresh()
+        self.assertEqual(stats[self.a.pk][:4], (2, 3, 280, 5))
+
+        # Moving an order to another product refreshes both
+        first = Order.objects.get(pk=first.pk)
+        first.product = self.b
+        with self.committed():
+            first.save()
+        stats = self.assertFresh()
+        self.assertEqual(stats[self.a.pk][:3], (1, 1, 100))
+        self.assertEqual(stats[self.b.pk][:3], (1, 2, 180))
+
+        # Bulk status change: cancelled orders keep counting but earn nothing
+        with self.committed():
+            self.client.post(reverse("orders:bulk_update_order_status"), {
+                "order_ids": list(Order.objects.values_list("pk", flat=True)), "status": "cancelled",
+            })
+        stats = self.assertFresh()
+        self.assertEqual(stats[self.b.pk][:4], (1, 0, 0, 0))
+
+        with self.committed() as callbacks:
+            self.customer.delete()
+        self.assertEqual(len(callbacks), 1)  # one refresh for the whole cascade
+        self.assertEqual(self.assertFresh()[self.a.pk], (0, 0, 0, 0, None))
+
+    def test_moving_a_just_saved_order(self):
+        order = Order(customer=self.customer, product=self.a, amount=1)
+        with self.committed():
+            order.save()
+        # Same instance, never loaded from the database
+        order.product = self.b
+        with self.committed():
+            order.save()
+        stats = self.assertFresh()
+        self.assertEqual((stats[self.a.pk][0], stats[self.b.pk][0]), (0, 1))
+
+    def test_rolled_back_write_does_not_swallow_the_next(self):
+        with self.committed() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Order.objects.create(customer=self.customer, product=self.a)
+                raise RuntimeError
+            Order.objects.create(customer=self.customer, product=self.b)
+            Order.objects.create(customer=self.customer, product=self.b)
+        self.assertEqual(len(callbacks), 1)
+        stats = self.assertFresh()
+        self.assertEqual((stats[self.a.pk][0], stats[self.b.pk][0]), (0, 2))
+
+    def test_list_sorts_by_stats(self):
+        with self.committed():
+            Order.objects.create(customer=self.customer, product=self.b, amount=5)
+            Order.objects.create(customer=self.customer, product=self.a, amount=1)
+            Order.objects.create(customer=self.customer, product=self.a, amount=1)
+        url = reverse("products:product_list")
+        by_revenue = self.client.get(url, {"sort": "revenue_desc"}).context["products"]
+        self.assertEqual([p.pk for p in by_revenue], [self.b.pk, self.a.pk])
+        self.assertEqual([p.total_revenue for p in by_revenue], [250, 200])
+        by_orders = self.client.get(url, {"sort": "orders_desc"}).context["products"]
+        self.assertEqual([p.order_count for p in by_orders], [2, 1])
+        recent = self.client.get(url, {"sold_within": "7"}).context["products"]
+        self.assertEqual(len(recent), 2)
+
+
+class ProductDetailsApiTests(TestCase):
+    """The order form's product details: batched, cached per product, revalidated by ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="admin", password="x", account_type="admin", is_approved=True, is_staff=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.products = [Product.objects.create(code=f"SP{i}", name=f"P{i}", price=100 + i) for i in range(5)]
+        red, = product_attributes.values_for(AttributeValue.COLOR, ["Đỏ"]).values()
+        for product in self.products:
+            product.colors.create(name="Đỏ", value=red)
+        self.url = reverse("orders:products_details")
+        self.ids = ",".join(str(p.pk) for p in self.products)
+
+    def get(self, ids, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, {"ids": ids}, headers=headers)
+        return response, len(ctx.captured_queries)
+
+    def test_batched_and_cached(self):
+        self.get("")  # session write on the first request stays out of the counts
+        response, cold = self.get(self.ids + ",999999")
+        payload = response.json()["products"]
+        self.assertEqual(sorted(payload), sorted(str(p.pk) for p in self.products))
+        first = self.products[0]
+        self.assertEqual(payload[str(first.pk)]["colors"][0]["name"], "Đỏ")
+        self.assertEqual(payload[str(first.pk)]["price"], str(first.price))
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("max-age", response["Cache-Control"])
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        # Warm: only the updated_at check besides session/user
+        again, warm = self.get(self.ids + ",999999")
+        self.assertEqual(again.json()["products"], payload)
+        self.assertEqual(again["ETag"], response["ETag"])
+        self.assertEqual(cold - warm, 3)
+
+        not_modified, _ = self.get(self.ids + ",999999", if_none_match=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        # The single-product endpoint shares the entries
+        single = self.client.get(reverse("orders:product_details", kwargs={"product_id": first.pk}))
+        self.assertEqual(single.json(), {"success": True, **payload[str(first.pk)]})
+
+    def test_saving_a_product_invalidates(self):
+        response, _ = self.get(self.ids)
+        product = self.products[2]
+        product.price = 999
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertIsNone(cache.get(product_details.cache_key(product.pk)))
+        fresh, _ = self.get(self.ids, if_none_match=response["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh["ETag"], response["ETag"])
+        self.assertEqual(fresh.json()["products"][str(product.pk)]["price"], "999")
+
+    def test_renaming_the_supplier_invalidates(self):
+        supplier = Supplier.objects.create(code="NCC1", name="NCC Cũ")
+        product = self.products[1]
+        product.supplier = supplier
+        product.save()
+        response, _ = self.get(self.ids)
+        self.assertEqual(response.json()["products"][str(product.pk)]["supplier"], "NCC Cũ")
+
+        supplier.name = "NCC Mới"
+        supplier.save()
+        fresh, _ = self.get(self.ids, if_none_match=response["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()["products"][str(product.pk)]["supplier"], "NCC Mới")
+
+    def test_rejects_bad_ids(self):
+        self.assertEqual(self.get("1,x")[0].status_code, 400)
+        self.assertEqual(self.get(",".join(str(i) for i in range(1, 200)))[0].status_code, 400)
+        self.assertEqual(self.get("")[0].json(), {"success": True, "products": {}})
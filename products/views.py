@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
@@ -7,9 +7,15 @@ from django.db.models import Q, Count, Sum, F, FloatField, IntegerField, Express
 from django.db.models.functions import Coalesce, Cast
 from django.core.paginator import Paginator
 
-from .models import Product, Category, Supplier
+from .models import AttributeValue, Product, Category, Supplier
 from orders.models import Order
+from core.db_routing import ReplicaReadMixin
+from core.fragments import FragmentMixin
 from .forms import ProductForm
+from . import attributes, images
+
+
+SOLD_WITHIN_CHOICES = {'7': '7 ngày', '30': '30 ngày', '90': '90 ngày'}
 
 
 class ProductListView(LoginRequiredMixin, ListView):
@@ -19,32 +25,16 @@ class ProductListView(LoginRequiredMixin, ListView):
     paginate_by = 20
     
     def get_queryset(self):
+        # Order count / revenue come from ProductStats (kept up to date on
+        # order writes), so sorting by them is an indexed lookup instead of
+        # aggregating every order on each page load
         queryset = (
             Product.objects
             .select_related('category', 'supplier')
             .prefetch_related('colors', 'sizes')
             .annotate(
-                order_count=Coalesce(Count('orders'), 0, output_field=IntegerField()),
-            )
-        )
-        # Exclude cancelled orders from revenue aggregation
-        from django.db.models import Case, When, Value
-        revenue_term = ExpressionWrapper(
-            Cast(F('orders__amount'), FloatField()) * Cast(F('price'), FloatField()),
-            output_field=FloatField(),
-        )
-        queryset = queryset.annotate(
-            total_revenue=Coalesce(
-                Sum(
-                    Case(
-                        When(orders__status='cancelled', then=Value(0.0)),
-                        default=revenue_term,
-                        output_field=FloatField(),
-                    ),
-                    output_field=FloatField(),
-                ),
-                0.0,
-                output_field=FloatField(),
+                order_count=Coalesce(F('stats__order_count'), 0),
+                total_revenue=Coalesce(F('stats__revenue'), 0),
             )
         )
         
@@ -67,6 +57,14 @@ class ProductListView(LoginRequiredMixin, ListView):
         if supplier_id:
             queryset = queryset.filter(supplier_id=supplier_id)
         
+        # Sold within the last N days
+        sold_within = self.request.GET.get('sold_within')
+        if sold_within in SOLD_WITHIN_CHOICES:
+            from datetime import timedelta
+            from django.utils import timezone
+            since = timezone.now() - timedelta(days=int(sold_within))
+            queryset = queryset.filter(stats__last_order_at__gte=since)
+        
         # Sorting
         sort = self.request.GET.get('sort')
         if sort == 'created_asc':
@@ -76,13 +74,15 @@ class ProductListView(LoginRequiredMixin, ListView):
         elif sort == 'price_desc':
             queryset = queryset.order_by('-price', '-created_at')
         elif sort == 'orders_asc':
-            queryset = queryset.order_by('order_count', '-created_at')
+            queryset = queryset.order_by('stats__order_count', '-created_at')
         elif sort == 'orders_desc':
-            queryset = queryset.order_by('-order_count', '-created_at')
+            queryset = queryset.order_by('-stats__order_count', '-created_at')
         elif sort == 'revenue_asc':
-            queryset = queryset.order_by('total_revenue', '-created_at')
+            queryset = queryset.order_by('stats__revenue', '-created_at')
         elif sort == 'revenue_desc':
-            queryset = queryset.order_by('-total_revenue', '-created_at')
+            queryset = queryset.order_by('-stats__revenue', '-created_at')
+        elif sort == 'last_order_desc':
+            queryset = queryset.order_by(F('stats__last_order_at').desc(nulls_last=True), '-created_at')
         else:
             queryset = queryset.order_by('-created_at')
         
@@ -118,6 +118,8 @@ class ProductListView(LoginRequiredMixin, ListView):
         context['selected_supplier'] = sel_sup
         context['display'] = self.request.GET.get('display', 'table')
         context['sort'] = self.request.GET.get('sort', 'created_desc')
+        context['sold_within'] = self.request.GET.get('sold_within', '')
+        context['sold_within_choices'] = SOLD_WITHIN_CHOICES.items()
         # Placeholder: profit could be computed if cost fields exist; keep None for now
         context['has_profit'] = False
         return context
@@ -136,8 +138,12 @@ class ProductCreateView(LoginRequiredMixin, CreateView):
         return context
     
     def form_valid(self, form):
+        new_image = images.take_upload(form)
         response = super().form_valid(form)
         messages.success(self.request, 'Sản phẩm đã được thêm thành công!')
+        if new_image:
+            images.stage(self.object, new_image, self.request.user)
+            messages.info(self.request, 'Ảnh sản phẩm đang được xử lý và sẽ hiển thị sau ít phút.')
         return response
     
     def form_invalid(self, form):
@@ -150,6 +156,9 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
     form_class = ProductForm
     template_name = 'products/create.html'
     
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related('colors', 'sizes')
+    
     def get_success_url(self):
         return reverse_lazy('products:product_detail', kwargs={'pk': self.object.pk})
     
@@ -160,8 +169,12 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
         return context
     
     def form_valid(self, form):
+        new_image = images.take_upload(form)
         response = super().form_valid(form)
         messages.success(self.request, 'Thông tin sản phẩm đã được cập nhật!')
+        if new_image:
+            images.stage(self.object, new_image, self.request.user)
+            messages.info(self.request, 'Ảnh sản phẩm đang được xử lý và sẽ hiển thị sau ít phút.')
         return response
     
     def form_invalid(self, form):
@@ -169,51 +182,54 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
         return super().form_invalid(form)
 
 
-class ProductDetailView(LoginRequiredMixin, DetailView):
+class ProductDetailView(LoginRequiredMixin, FragmentMixin, DetailView):
     model = Product
     template_name = 'products/detail.html'
     context_object_name = 'product'
+    fragment_templates = {'table': 'products/_order_results.html'}
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = f'{self.object.name} - Chi tiết sản phẩm - NavyBaby'
 
-        # Stats for this product (zero-out cancelled)
         from django.db.models import F, FloatField, IntegerField, ExpressionWrapper, Case, When, Value
         from django.db.models.functions import Coalesce
-        total_orders = Order.objects.filter(product=self.object).count()
-        stats_qs = (
-            Order.objects.filter(product=self.object)
-            .annotate(
-                amount_safe=Coalesce(F('amount'), 0, output_field=IntegerField()),
-                price_safe=Coalesce(F('sale_price'), 0.0, output_field=FloatField()),
-            )
-            .annotate(
-                discount_raw=Coalesce(F('discount'), 0.0, output_field=FloatField()),
-                revenue_raw=ExpressionWrapper(F('amount_safe') * F('price_safe'), output_field=FloatField()),
+
+        # Stats for this product (zero-out cancelled); not part of the orders fragment
+        if not self.fragment:
+            total_orders = Order.objects.filter(product=self.object).count()
+            stats_qs = (
+                Order.objects.filter(product=self.object)
+                .annotate(
+                    amount_safe=Coalesce(F('amount'), 0, output_field=IntegerField()),
+                    price_safe=Coalesce(F('sale_price'), 0.0, output_field=FloatField()),
+                )
+                .annotate(
+                    discount_raw=Coalesce(F('discount'), 0.0, output_field=FloatField()),
+                    revenue_raw=ExpressionWrapper(F('amount_safe') * F('price_safe'), output_field=FloatField()),
+                )
+                .annotate(
+                    discount_safe=Case(
+                        When(status='cancelled', then=Value(0.0)),
+                        default=F('discount_raw'),
+                        output_field=FloatField(),
+                    ),
+                    revenue=Case(
+                        When(status='cancelled', then=Value(0.0)),
+                        default=F('revenue_raw'),
+                        output_field=FloatField(),
+                    ),
+                )
             )
-            .annotate(
-                discount_safe=Case(
-                    When(status='cancelled', then=Value(0.0)),
-                    default=F('discount_raw'),
-                    output_field=FloatField(),
-                ),
-                revenue=Case(
-                    When(status='cancelled', then=Value(0.0)),
-                    default=F('revenue_raw'),
-                    output_field=FloatField(),
-                ),
+            stats_agg = stats_qs.aggregate(
+                total_discount=Coalesce(Sum('discount_safe'), 0.0),
+                total_revenue=Coalesce(Sum('revenue'), 0.0),
             )
-        )
-        stats_agg = stats_qs.aggregate(
-            total_discount=Coalesce(Sum('discount_safe'), 0.0),
-            total_revenue=Coalesce(Sum('revenue'), 0.0),
-        )
-        context['stats'] = {
-            'order_count': total_orders,
-            'total_discount': stats_agg.get('total_discount') or 0,
-            'revenue': stats_agg.get('total_revenue') or 0,
-        }
+            context['stats'] = {
+                'order_count': total_orders,
+                'total_discount': stats_agg.get('total_discount') or 0,
+                'revenue': stats_agg.get('total_revenue') or 0,
+            }
 
         # Recent orders for this product with search/filter/sort (mirroring orders list behavior)
         # Base queryset
@@ -330,7 +346,7 @@ class ProductDeleteView(LoginRequiredMixin, DeleteView):
         return response
 
 
-class ProductReportView(LoginRequiredMixin, DetailView):
+class ProductReportView(LoginRequiredMixin, ReplicaReadMixin, DetailView):
     model = Product
     template_name = 'products/report.html'
     context_object_name = 'product'
@@ -541,3 +557,64 @@ class ProductReportView(LoginRequiredMixin, DetailView):
         context['top_customers_chart'] = mark_safe(json.dumps(top_customers_chart))
 
         return context
+
+
+class AttributeSalesReportView(LoginRequiredMixin, ReplicaReadMixin, TemplateView):
+    """Doanh số theo size (?kind=size) hoặc màu (?kind=color) trên mọi sản phẩm."""
+    template_name = 'products/attribute_report.html'
+
+    def get_context_data(self, **kwargs):
+        from datetime import datetime, time, timedelta
+        from django.utils import timezone
+
+        context = super().get_context_data(**kwargs)
+        kind = self.request.GET.get('kind')
+        if kind not in dict(AttributeValue.KIND_CHOICES):
+            kind = AttributeValue.SIZE
+
+        # Date range: default last 90 days; empty start = all time
+        date_format = '%Y-%m-%d'
+        today = timezone.localdate()
+        start_date = today - timedelta(days=89)
+        end_date = today
+        start_param = self.request.GET.get('start')
+        end_param = self.request.GET.get('end')
+        if start_param is not None:
+            try:
+                start_date = datetime.strptime(start_param, date_format).date()
+            except ValueError:
+                start_date = None
+        if end_param:
+            try:
+                end_date = datetime.strptime(end_param, date_format).date()
+            except ValueError:
+                pass
+        if start_date and start_date > end_date:
+            start_date, end_date = end_date, start_date
+
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(start_date, time.min), tz) if start_date else None
+        end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+        rows = attributes.sales_by_attribute(kind, start, end)
+        total_revenue = sum(r['revenue'] for r in rows)
+        for r in rows:
+            r['share'] = r['revenue'] * 100 / total_revenue if total_revenue else 0
+
+        context.update({
+            'title': 'Doanh số theo màu / size - NavyBaby',
+            'kind': kind,
+            'kind_label': dict(AttributeValue.KIND_CHOICES)[kind],
+            'rows': rows,
+            'totals': {
+                'order_count': sum(r['order_count'] for r in rows),
+                'quantity': sum(r['quantity'] for r in rows),
+                'revenue': total_revenue,
+            },
+            'date_range': {
+                'start': start_date,
+                'end': end_date,
+                'start_str': start_date.strftime(date_format) if start_date else '',
+                'end_str': end_date.strftime(date_format),
+            },
+        })
+        return context
@@ -0,0 +1,147 @@
+/*
+ * Fragment navigation for list pages (see core/fragments.py).
+ *
+ *   <form method="get" data-fragment-target="#results">...</form>
+ *   <div id="results" data-fragment="table">...</div>
+ *
+ * Submitting the form, changing one of its <select>s or following a "?..."
+ * link inside the results fetches ?...&fragment=table and replaces only the
+ * results; the address bar, "next" inputs, [data-checked-count] labels,
+ * [data-filter-chips] and [data-sync-query] links are updated to match.
+ * Any failure falls back to a normal page load. A "fragment:loaded" event
+ * bubbles from the results element after each swap.
+ */
+(function () {
+  function currentPath() {
+    return window.location.pathname + window.location.search;
+  }
+
+  function formFor(target) {
+    return document.querySelector('form[data-fragment-target="#' + target.id + '"]');
+  }
+
+  function syncCounts(form) {
+    form.querySelectorAll('[data-checked-count]').forEach(function (el) {
+      var name = el.getAttribute('data-checked-count');
+      var n = form.querySelectorAll('input[name="' + name + '"]:checked').length;
+      el.textContent = el.getAttribute('data-label') + (n ? ' (' + n + ')' : '');
+    });
+  }
+
+  function syncChips(form) {
+    var selector = form.getAttribute('data-fragment-target');
+    document.querySelectorAll('[data-filter-chips="' + selector + '"]').forEach(function (box) {
+      var chipClass = box.getAttribute('data-chip-class') || '';
+      box.innerHTML = '';
+      form.querySelectorAll('input[type="checkbox"][name]:checked').forEach(function (cb) {
+        var label = cb.closest('label');
+        var span = document.createElement('span');
+        span.className = chipClass;
+        span.textContent = label ? label.textContent.trim() : cb.value;
+        box.appendChild(span);
+      });
+      box.classList.toggle('hidden', !box.children.length);
+    });
+  }
+
+  function syncLinks(url) {
+    document.querySelectorAll('a[data-sync-query]').forEach(function (a) {
+      var href = new URL(a.getAttribute('href'), window.location.href);
+      var extra = a.getAttribute('data-sync-query');
+      href.search = url.search.replace(/^\?/, '') + (extra ? (url.search.length > 1 ? '&' : '') + extra : '');
+      a.setAttribute('href', href.pathname + (href.search ? href.search : ''));
+    });
+  }
+
+  function load(target, url, push) {
+    var name = target.getAttribute('data-fragment');
+    var pageUrl = new URL(url, window.location.href);
+    pageUrl.searchParams.delete('fragment');
+    var fetchUrl = new URL(pageUrl);
+    fetchUrl.searchParams.set('fragment', name);
+    var previous = currentPath();
+
+    target.setAttribute('aria-busy', 'true');
+    target.classList.add('opacity-60');
+    return fetch(fetchUrl, { credentials: 'same-origin', headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then(function (res) {
+        if (!res.ok || res.redirected) throw new Error('HTTP ' + res.status);
+        return res.text();
+      })
+      .then(function (html) {
+        target.innerHTML = html;
+        if (push) window.history.pushState({ fragment: '#' + target.id }, '', pageUrl);
+        var now = currentPath();
+        document.querySelectorAll('input[name="next"]').forEach(function (inp) {
+          if (inp.value === previous) inp.value = now;
+        });
+        var form = formFor(target);
+        if (form) {
+          syncCounts(form);
+          syncChips(form);
+        }
+        syncLinks(pageUrl);
+        if (window.lucide) { try { window.lucide.createIcons(); } catch (e) {} }
+        target.dispatchEvent(new CustomEvent('fragment:loaded', { bubbles: true }));
+      })
+      .catch(function () {
+        window.location.href = pageUrl;
+      })
+      .finally(function () {
+        target.removeAttribute('aria-busy');
+        target.classList.remove('opacity-60');
+      });
+  }
+
+  function targetOf(form) {
+    var selector = form.getAttribute('data-fragment-target');
+    var target = selector ? document.querySelector(selector) : null;
+    return target && target.hasAttribute('data-fragment') ? target : null;
+  }
+
+  function submit(form) {
+    var target = targetOf(form);
+    if (!target) return false;
+    var params = new URLSearchParams(new FormData(form));
+    var action = form.getAttribute('action') || window.location.pathname;
+    load(target, action + '?' + params.toString(), true);
+    return true;
+  }
+
+  document.addEventListener('submit', function (e) {
+    var form = e.target;
+    if (!form.hasAttribute('data-fragment-target') || (form.method || 'get').toLowerCase() !== 'get') return;
+    if (submit(form)) e.preventDefault();
+  });
+
+  // Sorting / single-choice filters apply immediately
+  document.addEventListener('change', function (e) {
+    var el = e.target;
+    if (el.tagName !== 'SELECT' || !el.form || !el.form.hasAttribute('data-fragment-target')) return;
+    submit(el.form);
+  });
+
+  // Pager and sort links inside the results
+  document.addEventListener('click', function (e) {
+    if (e.defaultPrevented || e.button !== 0 || e.metaKey || e.ctrlKey || e.shiftKey || e.altKey) return;
+    var link = e.target.closest && e.target.closest('a[href^="?"]');
+    var target = link && link.closest('[data-fragment]');
+    if (!target) return;
+    e.preventDefault();
+    load(target, link.getAttribute('href'), true).then(function () {
+      target.scrollIntoView({ block: 'start', behavior: 'smooth' });
+    });
+  });
+
+  // Back/forward: the filter form is not part of the fragment, so reload the
+  // page to bring both back in line with the URL
+  window.addEventListener('popstate', function (e) {
+    if (e.state && e.state.fragment) window.location.reload();
+  });
+
+  // Mark the initial entry so back/forward between fragment states is handled
+  var initial = document.querySelector('[data-fragment][id]');
+  if (initial && !window.history.state) {
+    window.history.replaceState({ fragment: '#' + initial.id }, '', window.location.href);
+  }
+})();
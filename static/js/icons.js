@@ -0,0 +1,48 @@
+/*
+ * Drop-in replacement for the lucide UMD bundle when USE_COMPILED_ASSETS is on.
+ * lucide.createIcons() swaps every [data-lucide] element for an <svg> that
+ * references the self-hosted sprite (static/dist/icons.svg, built by
+ * `python manage.py build_assets` with only the icons the templates use).
+ * The sprite URL comes from the script tag's data-sprite attribute.
+ */
+(function () {
+  var script = document.currentScript;
+  var sprite = script ? script.getAttribute('data-sprite') : '';
+  var NS = 'http://www.w3.org/2000/svg';
+  var DEFAULTS = {
+    width: '24',
+    height: '24',
+    viewBox: '0 0 24 24',
+    fill: 'none',
+    stroke: 'currentColor',
+    'stroke-width': '2',
+    'stroke-linecap': 'round',
+    'stroke-linejoin': 'round'
+  };
+
+  function replace(el) {
+    var name = el.getAttribute('data-lucide');
+    if (!name) return;
+    var svg = document.createElementNS(NS, 'svg');
+    var key;
+    for (key in DEFAULTS) svg.setAttribute(key, DEFAULTS[key]);
+    for (var i = 0; i < el.attributes.length; i++) {
+      var attr = el.attributes[i];
+      if (attr.name !== 'data-lucide' && attr.name !== 'class') svg.setAttribute(attr.name, attr.value);
+    }
+    var extra = el.getAttribute('class');
+    svg.setAttribute('class', 'lucide lucide-' + name + (extra ? ' ' + extra : ''));
+    svg.setAttribute('aria-hidden', 'true');
+    var use = document.createElementNS(NS, 'use');
+    use.setAttribute('href', sprite + '#' + name);
+    svg.appendChild(use);
+    el.parentNode.replaceChild(svg, el);
+  }
+
+  function createIcons() {
+    var nodes = document.querySelectorAll('[data-lucide]');
+    for (var i = 0; i < nodes.length; i++) replace(nodes[i]);
+  }
+
+  window.lucide = { createIcons: createIcons };
+})();
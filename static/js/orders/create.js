@@ -0,0 +1,571 @@
+// Order entry page (orders/create.html). The template passes
+// data-multi="1" on the script tag in multi-line mode (?multi=1).
+const multiMode = document.currentScript && document.currentScript.dataset.multi === '1';
+
+// Product details (colours, sizes, price, image) from
+// /don-hang/api/products/details/?ids=...: ids asked for in the same tick go
+// out as one request, and each product is fetched once per page.
+const productDetails = (function() {
+  const known = new Map();
+  let queued = new Map();
+
+  function flush() {
+    const batch = queued;
+    queued = new Map();
+    const ids = Array.from(batch.keys());
+    fetch(`/don-hang/api/products/details/?ids=${ids.join(',')}`, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then(res => res.json())
+      .then(data => {
+        const products = (data && data.success && data.products) || {};
+        batch.forEach((resolve, id) => resolve(products[id] ? { success: true, ...products[id] } : { success: false }));
+      })
+      .catch(err => {
+        // Let a later selection try again
+        ids.forEach(id => known.delete(id));
+        batch.forEach(resolve => resolve({ success: false, error: String(err) }));
+      });
+  }
+
+  return function(productId) {
+    const id = String(productId);
+    if (!known.has(id)) {
+      if (!queued.size) setTimeout(flush, 0);
+      known.set(id, new Promise(resolve => queued.set(id, resolve)));
+    }
+    return known.get(id);
+  };
+})();
+
+// Initialize Lucide icons
+lucide.createIcons();
+
+// Dynamic form behavior
+document.addEventListener('DOMContentLoaded', function() {
+  // Ensure all selects are full width
+  document.querySelectorAll('select').forEach(s => s.classList.add('w-full'));
+
+  // Auto-format price inputs
+  // Enforce non-negative only for quantity fields (allow negative discounts)
+  const amountInputs = document.querySelectorAll('input.item-amount, input[name="amount"]');
+  amountInputs.forEach(input => {
+    input.addEventListener('input', function() {
+      if (Number(this.value) < 1) this.value = 1;
+    });
+  });
+
+  // Product change handler: fetch details and populate color/size
+  const productSelect = document.getElementById('id_product');
+  const customerSelect = document.getElementById('id_customer');
+  const colorSelect = document.getElementById('id_color');
+  const sizeSelect = document.getElementById('id_size');
+  const salePriceInput = document.getElementById('id_sale_price');
+  const discountInput = document.getElementById('id_discount');
+  const discountDisplay = document.getElementById('discount_display');
+  const productThumb = document.getElementById('product-thumb');
+  const customerMeta = document.getElementById('customer-meta');
+
+  // Currency formatter (VND)
+  function formatVND(value) {
+    if (value === null || value === undefined || value === '') return '';
+    const n = Number(String(value).replace(/[^0-9.-]/g, ''));
+    if (isNaN(n)) return '';
+    return n.toLocaleString('vi-VN') + ' ₫';
+  }
+
+  // Initialize discount formatted display
+  if (discountInput && discountDisplay) {
+    const updateDiscountDisplay = () => {
+      discountDisplay.textContent = formatVND(discountInput.value || 0) || '0 ₫';
+    };
+    discountInput.addEventListener('input', updateDiscountDisplay);
+    updateDiscountDisplay();
+  }
+
+  // Debug: log changes for color/size
+  if (colorSelect) {
+    colorSelect.addEventListener('change', function() {
+      const opt = this.options[this.selectedIndex];
+      console.log('Color changed:', { value: this.value, label: opt ? opt.text : '' });
+    });
+  }
+  if (sizeSelect) {
+    sizeSelect.addEventListener('change', function() {
+      const opt = this.options[this.selectedIndex];
+      console.log('Size changed:', { value: this.value, label: opt ? opt.text : '' });
+    });
+  }
+
+  // Initialize Select2 for Customer with custom templates; search is inside dropdown
+  if (customerSelect && window.jQuery && window.jQuery.fn && window.jQuery.fn.select2) {
+    // enrich option dataset from label (Name — [CODE] — PHONE)
+    Array.from(customerSelect.options).forEach(opt => {
+      if (!opt.value) return;
+      const text = opt.text || '';
+      const parts = text.split('—').map(s => s.trim());
+      const name = parts[0] || text;
+      const codeMatch = text.match(/\[(.*?)\]/);
+      const code = codeMatch ? codeMatch[1] : '';
+      const phone = parts.length >= 3 ? parts[2] : '';
+      opt.dataset.name = name;
+      opt.dataset.code = code;
+      opt.dataset.phone = phone;
+      opt.text = name;
+    });
+    const $cust = window.jQuery(customerSelect);
+    $cust.select2({
+      width: '100%',
+      allowClear: true,
+      placeholder: '— Chọn khách hàng —',
+      minimumResultsForSearch: 0,
+      templateResult: function(customer) {
+        if (!customer.id) return customer.text;
+        const el = customer.element;
+        const name = el?.dataset?.name || customer.text || '';
+        const code = el?.dataset?.code || '';
+        const phone = el?.dataset?.phone || '';
+        const $opt = window.jQuery(
+          '<div class="py-1">\
+             <div class="block font-medium text-gray-100 name"></div>\
+             <div class="block text-xs text-gray-400 code"></div>\
+             <div class="block text-xs text-gray-400 flex items-center gap-1 phone">\
+               <i data-lucide="phone" class="w-3 h-3"></i><span class="phone-text"></span>\
+             </div>\
+           </div>'
+        );
+        $opt.find('.name').text(name);
+        $opt.find('.code').text(code ? `#${code}` : '');
+        const tel = phone ? `${phone}` : '';
+        $opt.find('.phone-text').text(tel);
+        return $opt;
+      },
+      templateSelection: function(customer) {
+        if (!customer.id) return customer.text;
+        const el = customer.element;
+        const name = el?.dataset?.name || customer.text || '';
+        const code = el?.dataset?.code || '';
+        const phone = el?.dataset?.phone || '';
+        return `${name}${code ? '  #' + code : ''}${phone ? '  · SĐT: ' + phone : ''}`;
+      }
+    });
+    // Render lucide icons inside dropdown when opened/updated
+    $cust.on('select2:open select2:select', function() { lucide.createIcons(); });
+  }
+
+  // Initialize Select2 for Color and Size (simple, no custom templates)
+  function initSelect2ForColorSize() {
+    console.log('initSelect2ForColorSize', { colorSelect, sizeSelect, jQuery: !!window.jQuery, select2Fn: !!(window.jQuery && window.jQuery.fn && window.jQuery.fn.select2) });
+    if (colorSelect && window.jQuery && window.jQuery.fn && window.jQuery.fn.select2) {
+      if (window.jQuery(colorSelect).data('select2')) {
+        window.jQuery(colorSelect).select2('destroy');
+      }
+      window.jQuery(colorSelect).select2({
+        width: '100%',
+        allowClear: true,
+        placeholder: '— Chọn màu sắc —'
+      });
+      console.log('Select2 initialized for color');
+    }
+    if (sizeSelect && window.jQuery && window.jQuery.fn && window.jQuery.fn.select2) {
+      if (window.jQuery(sizeSelect).data('select2')) {
+        window.jQuery(sizeSelect).select2('destroy');
+      }
+      window.jQuery(sizeSelect).select2({
+        width: '100%',
+        allowClear: true,
+        placeholder: '— Chọn kích thước —'
+      });
+      console.log('Select2 initialized for size');
+    }
+  }
+
+  async function onProductChange() {
+    const productId = productSelect && productSelect.value;
+    console.log('onProductChange', { productId });
+    // Preserve current selections
+    const currentColorId = colorSelect ? colorSelect.value : '';
+    const currentSizeId = sizeSelect ? sizeSelect.value : '';
+    if (!productId) {
+      // Reset placeholders
+      if (colorSelect) {
+        colorSelect.innerHTML = '<option value="">Chọn màu</option>';
+      }
+      if (sizeSelect) {
+        sizeSelect.innerHTML = '<option value="">Chọn kích thước</option>';
+      }
+      if (salePriceInput) salePriceInput.value = '';
+      if (productThumb) {
+        productThumb.innerHTML = '<i data-lucide="image" class="w-5 h-5"></i>';
+      }
+      return;
+    }
+    try {
+      console.log('Fetching details', productId);
+      const data = await productDetails(productId);
+      console.log('API response', data);
+      if (data && data.success) {
+        console.table({
+          colors_count: (data.colors || []).length,
+          sizes_count: (data.sizes || []).length,
+          price: data.price,
+          code: data.code,
+          supplier: data.supplier
+        });
+      }
+      if (!data.success) return;
+
+      // Update sale price (raw number for editable input)
+      if (salePriceInput) salePriceInput.value = (data.price || 0);
+
+      // Populate colors (simple select, no Select2)
+      if (colorSelect) {
+        colorSelect.innerHTML = '<option value="">Chọn màu</option>';
+        data.colors.forEach(c => {
+          const opt = document.createElement('option');
+          opt.value = c.id;
+          opt.textContent = c.name;
+          if (c.id == currentColorId) opt.selected = true;
+          colorSelect.appendChild(opt);
+        });
+        // Debug: list populated color options
+        console.log('Populated color options:', Array.from(colorSelect.options).map(o => ({ value: o.value, text: o.text, hidden: o.hidden })));
+      }
+
+      // Populate sizes (simple select, no Select2)
+      if (sizeSelect) {
+        sizeSelect.innerHTML = '<option value="">Chọn kích thước</option>';
+        data.sizes.forEach(s => {
+          const opt = document.createElement('option');
+          opt.value = s.id;
+          opt.textContent = s.name;
+          if (s.id == currentSizeId) opt.selected = true;
+          sizeSelect.appendChild(opt);
+        });
+        // Debug: list populated size options
+        console.log('Populated size options:', Array.from(sizeSelect.options).map(o => ({ value: o.value, text: o.text, hidden: o.hidden })));
+      }
+
+      // Debug: current selections after populate
+      console.log('After populate selections:', {
+        color: colorSelect ? colorSelect.value : null,
+        size: sizeSelect ? sizeSelect.value : null
+      });
+
+      // Update product thumbnail next to product field
+      if (productThumb) {
+        if (data.image_url) {
+          productThumb.innerHTML = '';
+          const img = document.createElement('img');
+          img.src = data.image_url;
+          img.alt = 'Thumb';
+          img.className = 'w-10 h-10 object-cover';
+          productThumb.appendChild(img);
+        } else {
+          productThumb.innerHTML = '<i data-lucide="image" class="w-5 h-5"></i>';
+        }
+      }
+      lucide.createIcons();
+    } catch (e) {
+      console.error('onProductChange error', e);
+    }
+  }
+
+  if (productSelect) {
+    productSelect.addEventListener('change', onProductChange);
+    // Trigger once on load if value exists (edit form)
+    if (productSelect.value) onProductChange();
+  }
+
+  // Select2 for Color/Size is disabled to remove search boxes
+
+  // Update customer meta (code + phone) when selection changes
+  function onCustomerChange() {
+    const opt = customerSelect ? customerSelect.options[customerSelect.selectedIndex] : null;
+    if (!opt) {
+      customerMeta.textContent = '';
+      return;
+    }
+    const code = opt.dataset.code || '';
+    const phone = opt.dataset.phone || '';
+    customerMeta.textContent = `${code ? 'Mã: ' + code + ' · ' : ''}${phone || ''}` || ' ';
+  }
+
+  if (customerSelect) {
+    customerSelect.addEventListener('change', onCustomerChange);
+    if (customerSelect.value) onCustomerChange();
+  }
+
+  // Initialize Select2 for Product with simple custom templates
+  if (productSelect && window.jQuery && window.jQuery.fn && window.jQuery.fn.select2) {
+    const $prod = window.jQuery(productSelect);
+    // try to parse parts from option text: Name — [CODE] — SUPPLIER
+    Array.from(productSelect.options).forEach(opt => {
+      if (!opt.value) return;
+      const text = opt.text || '';
+      const parts = text.split('—').map(s => s.trim());
+      const name = parts[0] || text;
+      const codeMatch = text.match(/\[(.*?)\]/);
+      const code = codeMatch ? codeMatch[1] : '';
+      opt.dataset.name = name;
+      opt.dataset.code = code;
+    });
+    $prod.select2({
+      width: '100%',
+      allowClear: true,
+      placeholder: '— Chọn sản phẩm —',
+      minimumResultsForSearch: 0,
+      templateResult: function(product) {
+        if (!product.id) return product.text;
+        const el = product.element;
+        const name = el?.dataset?.name || product.text || '';
+        const code = el?.dataset?.code || '';
+        const $opt = window.jQuery(
+          '<div class="py-1 flex items-center gap-2">\
+             <div class="thumb w-10 h-10 rounded bg-[#1e1e1e] border border-gray-800 flex items-center justify-center overflow-hidden">\
+               <i class="lucide-image w-5 h-5 text-gray-500"></i>\
+             </div>\
+             <div class="min-w-0">\
+               <div class="block font-medium text-gray-100 name truncate"></div>\
+               <div class="block text-xs text-gray-400 code"></div>\
+             </div>\
+           </div>'
+        );
+        $opt.find('.name').text(name);
+        $opt.find('.code').text(code ? `#${code}` : '');
+        return $opt;
+      },
+      templateSelection: function(product) {
+        if (!product.id) return product.text;
+        const el = product.element;
+        const name = el?.dataset?.name || product.text || '';
+        const code = el?.dataset?.code || '';
+        return `${name}${code ? '  #' + code : ''}`;
+      }
+    });
+    $prod.on('select2:open select2:select', function() { lucide.createIcons(); });
+    // Ensure product change handler runs for Select2 selections
+    $prod.on('select2:select change select2:clear', function() {
+      onProductChange();
+    });
+  }
+
+  // Simple client-side filtering for product select (customer uses Select2 search)
+  function filterSelect(selectEl, query) {
+    const q = (query || '').toLowerCase();
+    Array.from(selectEl.options).forEach(opt => {
+      if (!opt.value) return; // keep placeholder
+      const show = (opt.text || '').toLowerCase().includes(q);
+      opt.hidden = !show;
+    });
+  }
+  const searchProduct = document.getElementById('search-product');
+  if (searchProduct && productSelect) {
+    searchProduct.addEventListener('input', () => filterSelect(productSelect, searchProduct.value));
+  }
+});
+
+// Multi-line mode scripts
+if (multiMode) {
+  document.addEventListener('DOMContentLoaded', function() {
+    const itemsContainer = document.getElementById('items-container');
+    const addBtn = document.getElementById('btn-add-item');
+    const rowTpl = document.getElementById('item-row-template');
+    const formEl = document.querySelector('form');
+    const countEl = document.getElementById('items-count-input');
+
+    function formatVND(value) {
+      if (value === null || value === undefined || value === '') return '';
+      const n = Number(String(value).replace(/[^0-9.-]/g, ''));
+      if (isNaN(n)) return '';
+      return n.toLocaleString('vi-VN') + ' ₫';
+    }
+
+    async function populateRowOptions(rowEl, productId) {
+      const colorSel = rowEl.querySelector('.item-color');
+      const sizeSel = rowEl.querySelector('.item-size');
+      const thumbEl = rowEl.querySelector('.item-thumb');
+      const priceEl = rowEl.querySelector('.item-saleprice');
+      if (!productId) {
+        colorSel.innerHTML = '<option value="">Chọn màu</option>';
+        sizeSel.innerHTML = '<option value="">Chọn kích thước</option>';
+        if (priceEl) priceEl.value = '';
+        if (thumbEl) thumbEl.innerHTML = '<i data-lucide="image" class="w-5 h-5 text-gray-500"></i>';
+        return;
+      }
+      try {
+        const data = await productDetails(productId);
+        if (!data.success) return;
+        // colors
+        colorSel.innerHTML = '<option value="">Chọn màu</option>';
+        (data.colors || []).forEach(c => {
+          const opt = document.createElement('option');
+          opt.value = c.id;
+          opt.textContent = c.name;
+          colorSel.appendChild(opt);
+        });
+        // sizes
+        sizeSel.innerHTML = '<option value="">Chọn kích thước</option>';
+        (data.sizes || []).forEach(s => {
+          const opt = document.createElement('option');
+          opt.value = s.id;
+          opt.textContent = s.name;
+          sizeSel.appendChild(opt);
+        });
+        // price (raw number for editable input)
+        if (priceEl) priceEl.value = (data.price || 0);
+        // thumb
+        if (thumbEl) {
+          if (data.image_url) {
+            thumbEl.innerHTML = '';
+            const img = document.createElement('img');
+            img.src = data.image_url;
+            img.alt = 'Thumb';
+            img.className = 'w-10 h-10 object-cover';
+            thumbEl.appendChild(img);
+          } else {
+            thumbEl.innerHTML = '<i data-lucide="image" class="w-5 h-5 text-gray-500"></i>';
+          }
+        }
+      } catch (e) {
+        console.error('populateRowOptions error', e);
+      }
+    }
+
+    function bindRowHandlers(rowEl) {
+      const prodSel = rowEl.querySelector('.item-product');
+      const removeBtn = rowEl.querySelector('.btn-remove-item');
+      const discountInput = rowEl.querySelector('.item-discount');
+      const discountDisplay = rowEl.querySelector('.item-discount-display');
+      prodSel.addEventListener('change', () => populateRowOptions(rowEl, prodSel.value));
+      removeBtn.addEventListener('click', () => {
+        rowEl.remove();
+        renumberRows();
+      });
+      // Discount live display
+      if (discountInput && discountDisplay) {
+        const update = () => { discountDisplay.textContent = formatVND(discountInput.value || 0) || '0 ₫'; };
+        discountInput.addEventListener('input', update);
+        discountInput.addEventListener('change', update);
+        update();
+      }
+      // Initialize Select2 for product with image/name/code (like single form)
+      if (window.jQuery && window.jQuery.fn && window.jQuery.fn.select2 && prodSel) {
+        const $prod = window.jQuery(prodSel);
+        // parse option label to enrich dataset
+        Array.from(prodSel.options).forEach(opt => {
+          if (!opt.value) return;
+          if (!opt.dataset.name || !opt.dataset.code) {
+            const raw = opt.dataset.originalText || opt.text || '';
+            const parts = raw.split('—').map(s => s.trim());
+            const name = opt.dataset.name || parts[0] || raw;
+            const codeMatch = raw.match(/\[(.*?)\]/);
+            const code = opt.dataset.code || (codeMatch ? codeMatch[1] : '');
+            opt.dataset.name = name;
+            opt.dataset.code = code;
+          }
+        });
+        $prod.select2({
+          width: '100%',
+          allowClear: true,
+          placeholder: '— Chọn sản phẩm —',
+          minimumResultsForSearch: 0,
+          templateResult: function(product) {
+            if (!product.id) return product.text;
+            const el = product.element;
+            const name = el?.dataset?.name || product.text || '';
+            const code = el?.dataset?.code || '';
+            const $opt = window.jQuery(
+              '<div class="py-1 flex items-center gap-2>\
+                 <div class="thumb w-8 h-8 rounded bg-[#1e1e1e] border border-gray-800 flex items-center justify-center overflow-hidden">\
+                   <i class="lucide-image w-4 h-4 text-gray-500"></i>\
+                 </div>\
+                 <div class="min-w-0">\
+                   <div class="block font-medium text-gray-100 name truncate"></div>\
+                   <div class="block text-xs text-gray-400 code"></div>\
+                 </div>\
+               </div>'
+            );
+            $opt.find('.name').text(name);
+            $opt.find('.code').text(code ? `#${code}` : '');
+            return $opt;
+          },
+          templateSelection: function(product) {
+            if (!product.id) return product.text;
+            const el = product.element;
+            const name = el?.dataset?.name || product.text || '';
+            const code = el?.dataset?.code || '';
+            return `${name}${code ? '  #' + code : ''}`;
+          }
+        });
+        // Set tooltip on the rendered selection so long names are visible on hover
+        function setSelectionTitle() {
+          const selEl = $prod.next('.select2').find('.select2-selection__rendered');
+          const opt = prodSel.options[prodSel.selectedIndex];
+          if (!opt) return;
+          const name = opt?.dataset?.name || opt?.text || '';
+          const code = opt?.dataset?.code || '';
+          selEl.attr('title', code ? `${name}  #${code}` : name);
+        }
+        setSelectionTitle();
+
+        // ensure change triggers populate and preview, and update tooltip
+        $prod.on('select2:select change select2:clear', function() {
+          populateRowOptions(rowEl, prodSel.value);
+          setSelectionTitle();
+        });
+      }
+    }
+
+    function addRow() {
+      const node = document.importNode(rowTpl.content, true);
+      const wrapper = node.firstElementChild;
+      itemsContainer.appendChild(wrapper);
+      bindRowHandlers(wrapper);
+      renumberRows();
+    }
+
+    function getRows() {
+      return Array.from(itemsContainer.children).filter(el => el.classList && el.classList.contains('p-3'));
+    }
+
+    function renumberRows() {
+      const rows = getRows();
+      rows.forEach((row, idx) => {
+        const prod = row.querySelector('.item-product');
+        const saleprice = row.querySelector('.item-saleprice');
+        const discount = row.querySelector('.item-discount');
+        const amount = row.querySelector('.item-amount');
+        const color = row.querySelector('.item-color');
+        const size = row.querySelector('.item-size');
+        if (prod) prod.setAttribute('name', `items-${idx}-product`);
+        if (saleprice) saleprice.setAttribute('name', `items-${idx}-sale_price`);
+        if (discount) discount.setAttribute('name', `items-${idx}-discount`);
+        if (amount) amount.setAttribute('name', `items-${idx}-amount`);
+        if (color) color.setAttribute('name', `items-${idx}-color`);
+        if (size) size.setAttribute('name', `items-${idx}-size`);
+      });
+      if (countEl) countEl.value = String(rows.length);
+    }
+
+    if (addBtn) addBtn.addEventListener('click', addRow);
+    // Add first row by default
+    addRow();
+
+    // Ensure count is up to date and set defaults before submit
+    if (formEl) {
+      formEl.addEventListener('submit', function() {
+        const rows = getRows();
+        rows.forEach(row => {
+          const discount = row.querySelector('.item-discount');
+          const amount = row.querySelector('.item-amount');
+          if (discount && (discount.value === '' || isNaN(Number(discount.value)))) {
+            discount.value = '0';
+          }
+          if (amount && (amount.value === '' || Number(amount.value) < 1)) {
+            amount.value = '1';
+          }
+        });
+        renumberRows();
+      });
+    }
+  });
+}
@@ -0,0 +1,19 @@
+/** @type {import('tailwindcss').Config} */
+// Same defaults as the cdn.tailwindcss.com runtime (Tailwind v3), but only the
+// classes found in these files end up in static/dist/app.css.
+module.exports = {
+  content: [
+    './templates/**/*.html',
+    './static/js/**/*.js',
+    // Classes set in Python: form widgets, template tags, status badges
+    // (Order.get_status_class) and view-built markup
+    './*/forms.py',
+    './*/models.py',
+    './*/views.py',
+    './core/templatetags/*.py',
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};